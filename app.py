@@ -1,184 +1,342 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Blueprint, current_app, render_template, request, jsonify, Response, url_for, g
+import hmac
 import os
+import time
 from werkzeug.utils import secure_filename
-from parsers.pdf_parser import parse_pdf
-from parsers.bik_parser import parse_bik_report
-from parsers.bik_llm_parser import parse_bik_with_llm
+from metrics import HTTP_REQUEST_SECONDS, render_metrics, stage_timer
+from parsers.extraction import get_backend
+from services.parse_pool import default_workers
+from services.parse_cache import get_parse_cache
+from services.uploads import UploadRequest, spool_max_bytes
+from services.transactions import parse_confirmations, parse_confirmations_as_completed, group_transactions
+from services.transaction_index import get_transaction_index
+from services.bik import analyze_bik, analyze_bik_batch
+from services.bik_store import SECTIONS, get_bik_store
+from services.jobs import get_job_manager, sse_events
+from services.warmup import warm_up, warmup_enabled
 from dotenv import load_dotenv
 
 load_dotenv()
-import pandas as pd
 
 from flask_cors import CORS
 
-app = Flask(__name__)
-CORS(app)  # Enable CORS for all routes (required for frontend on different domain)
-UPLOAD_FOLDER = 'uploads'
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+# Heavy libraries (pdfminer, pypdfium2, openai) are imported on first use, not here -
+# see services/warmup.py for loading them at boot instead
+bp = Blueprint('main', __name__)
+# Stored BIK analyses hold personal data: token-protected and left out of CORS
+bik_store_bp = Blueprint('bik_store', __name__, url_prefix='/bik')
 
-@app.route('/')
+def create_app():
+    """
+    App factory. Nothing here forks or opens pools/databases, so it is safe
+    to run in the gunicorn master (--preload); with WARMUP=1 the parsers are
+    warmed up before the first request.
+    """
+    app = Flask(__name__)
+    app.request_class = UploadRequest  # keep uploads in memory instead of uploads/
+    # Enable CORS for all routes except the stored-report queries (required for frontend on different domain)
+    CORS(app, resources={r"^(?!/bik/).*": {}})
+    app.config['UPLOAD_SPOOL_MAX_BYTES'] = spool_max_bytes()
+    app.config['PDF_PARSE_WORKERS'] = default_workers()
+    # Text extraction backend per route (parsers.extraction.BACKENDS): confirmations
+    # only need label/value lines, BIK reports keep pdfplumber's layout analysis
+    app.config['PDF_BACKEND_UPLOAD_PDFS'] = get_backend(os.getenv('PDF_BACKEND_UPLOAD_PDFS', 'pdfium')).name
+    app.config['PDF_BACKEND_UPLOAD_BIK'] = get_backend(os.getenv('PDF_BACKEND_UPLOAD_BIK', 'pdfplumber')).name
+    app.before_request(_start_timer)
+    app.after_request(_record_request_time)
+    app.register_blueprint(bp)
+    app.register_blueprint(bik_store_bp)
+    if warmup_enabled():
+        warm_up([app.config['PDF_BACKEND_UPLOAD_PDFS'], app.config['PDF_BACKEND_UPLOAD_BIK']])
+    return app
+
+def _start_timer():
+    g.request_start = time.perf_counter()
+
+def _record_request_time(response):
+    if request.url_rule is not None and 'request_start' in g:
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - g.request_start, route=request.url_rule.rule,
+                                     method=request.method, status=response.status_code)
+    return response
+
+def _receive_uploads(pipeline):
+    """request.files, timing the multipart parse (uploads are spooled while it runs)."""
+    with stage_timer(pipeline, "upload_receive"):
+        return request.files
+
+@bp.route('/')
 def index():
     return render_template('index.html')
 
-@app.route('/upload_pdfs', methods=['POST'])
+@bp.route('/metrics')
+def metrics():
+    # Prometheus text format; per process - each gunicorn worker serves its own values
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+def _wants_stream():
+    # ?stream=1 or "Accept: application/x-ndjson"
+    return bool(request.args.get('stream', 0, type=int)) or \
+        request.accept_mimetypes.best == 'application/x-ndjson'
+
+@bp.route('/upload_pdfs', methods=['POST'])
 def upload_pdfs():
-    if 'files[]' not in request.files:
+    received = _receive_uploads("upload_pdfs")
+    if 'files[]' not in received:
         return jsonify({"error": "No file part"}), 400
+    if _wants_stream():
+        return _stream_upload_pdfs()
     
-    files = request.files.getlist('files[]')
-    results = []
-    
-    # Deduplication set
-    seen_transactions = set()
-    unique_results = []
-    
-    # Pre-scan to map Account -> Canonical Name
-    # Priority: if we have "Julia Latko" and "Julia Kuczyńska" for same account, 
-    # we ideally want the latest one or similar.
-    # For simplicity, we'll store all names seen for an account and pick one (e.g. longest or sorted).
-    account_names_map = {} # { "1234...": set(["Julia Latko", "Julia Kuczyńska"]) }
+    files = received.getlist('files[]')
     
+    # Files stay in memory (SpooledUpload) - nothing is written to uploads/
+    uploads = []
     for file in files:
         if file.filename == '': continue
         if file:
-            filename = secure_filename(file.filename)
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(filepath)
-            
-            data = parse_pdf(filepath)
-            
-            # Deduplication
-            if data['status'] == 'success':
-                sig = (data.get('date'), data.get('amount'), data.get('title'), data.get('sender'))
-                if sig in seen_transactions:
-                    data['status'] = 'duplicate'
-                    continue
-                seen_transactions.add(sig)
-                
-                # Account mapping
-                acc = data.get('account')
-                name = data.get('recipient')
-                if acc and acc != "Brak Numeru Konta" and name and name != "Nieznany Odbiorca":
-                    if acc not in account_names_map:
-                        account_names_map[acc] = set()
-                    account_names_map[acc].add(name)
-            
-            unique_results.append(data)
+            uploads.append((secure_filename(file.filename), file.stream))
     
-    # Resolve Canonical Names for Accounts
-    # Heuristic: Pick the name that appears most often? Or just sort and pick last?
-    # Let's pick the longest name as it might be most complete? Or just alphabetical.
-    resolved_account_names = {}
-    for acc, names in account_names_map.items():
-        # Clean names (strip whitespace)
-        valid_names = [n for n in names if len(n) > 3]
-        if valid_names:
-            # Sort valid names to have deterministic output. 
-            # If we wanted "latest", we'd need parsing order which is random-ish here without dates.
-            # Let's just pick one.
-            resolved_account_names[acc] = sorted(valid_names)[0] 
-        else:
-            resolved_account_names[acc] = "Nieznany Właściciel"
-
-    # Grouping Logic
-    grouped_data = {}
+    # Per-file parsing runs in the process pool (cache hits skip it), results come back in upload order
+    # Files/transactions the client already sent in an earlier batch come back flagged previously_uploaded
+    results = parse_confirmations(uploads, workers=current_app.config['PDF_PARSE_WORKERS'], cache=get_parse_cache(),
+                                  backend=current_app.config['PDF_BACKEND_UPLOAD_PDFS'], index=_client_index())
+    final_structure = group_transactions(results)
     
-    for item in unique_results:
-        recipient = item.get('recipient', 'Nieznany Odbiorca')
-        acc = item.get('account')
-        
-        # Override recipient name IF we have a resolved name for this account
-        if acc in resolved_account_names:
-            # We append the account number for clarity in UI?
-            # Or just use the resolved name. User wants to merge them.
-            canonical_name = resolved_account_names[acc]
-            # Let's format it: "NAME (Account...)" to be sure
-            # short_acc = acc[-4:] if len(acc) > 4 else acc
-            # recipient = f"{canonical_name} (....{short_acc})"
-            recipient = canonical_name
-        
-        if item.get('status') == 'error':
-            recipient = 'Pliki Nieprzetworzone'
+    with stage_timer("upload_pdfs", "serialize"):
+        return jsonify(final_structure)
 
-        date = item.get('date', '')
-        month_key = "Nieznana Data"
-        if date and len(date) >= 7:
-            month_key = date[:7] # 2024-12
-        
-        if recipient not in grouped_data:
-            grouped_data[recipient] = {}
-        
-        if month_key not in grouped_data[recipient]:
-            grouped_data[recipient][month_key] = []
-        
-        # Add the account info to item display if needed, already in item['account']
-        grouped_data[recipient][month_key].append(item)
+def _client_index():
+    """
+    The transaction index scoped to the client the batch is for (form field
+    client_id or X-Client-Id header); None when the index is off or the
+    request names no client - the batch is then checked on its own.
+    """
+    index = get_transaction_index()
+    owner = (request.form.get('client_id') or request.headers.get('X-Client-Id', '')).strip()
+    if index is None or not owner:
+        return None
+    return index.for_owner(owner)
 
-    # Sort Recipients
-    sorted_recipients = sorted(grouped_data.keys())
+def _stream_upload_pdfs():
+    """
+    NDJSON mode of /upload_pdfs: one {"type": "transaction", "index", "result"} line per
+    file as soon as it is parsed (completion order), then {"type": "summary", "result"}
+    with the same grouped structure the non-streaming response returns.
+    Each upload is released as soon as its line is out.
+    """
+    uploads = _keep_uploads('files[]')
+    workers = current_app.config['PDF_PARSE_WORKERS']
+    backend = current_app.config['PDF_BACKEND_UPLOAD_PDFS']
+    index = _client_index()
+    json = current_app.json  # the generator runs after the app context is gone
     
-    # Sort Months
-    final_structure = {}
-    for rec in sorted_recipients:
-        months = grouped_data[rec]
-        sorted_months = sorted(months.keys(), reverse=True)
-        final_structure[rec] = {m: months[m] for m in sorted_months}
+    def records():
+        try:
+            results = [None] * len(uploads)
+            for position, data in parse_confirmations_as_completed(uploads, workers=workers, cache=get_parse_cache(),
+                                                                   backend=backend, index=index):
+                uploads[position][1].discard()
+                with stage_timer("upload_pdfs_stream", "serialize"):
+                    line = json.dumps({"type": "transaction", "index": position, "result": data})
+                results[position] = data
+                yield line + "\n"
+            # Grouping runs in upload order, like the non-streaming response
+            final_structure = group_transactions(results)
+            with stage_timer("upload_pdfs_stream", "serialize"):
+                line = json.dumps({"type": "summary", "result": final_structure})
+            yield line + "\n"
+        finally:
+            for _, upload in uploads:
+                upload.discard()
     
-    return jsonify(final_structure)
+    return Response(records(), mimetype='application/x-ndjson', headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
-@app.route('/upload_bik', methods=['POST'])
+@bp.route('/upload_bik', methods=['POST'])
 def upload_bik():
-    if 'file' not in request.files:
+    received = _receive_uploads("upload_bik")
+    if 'file' not in received:
         return jsonify({"error": "No file part"}), 400
         
-    file = request.files['file']
+    file = received['file']
     if file.filename == '':
         return jsonify({"error": "No selected file"}), 400
         
     if file:
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], secure_filename(file.filename))
-        file.save(filepath)
-        
-        # PARSER SELECTION: Native Parser (No LLM, No Token Cost)
-        print("--- Using NATIVE Parser ---")
-        import pdfplumber
-        from parsers.bik_native_parser import parse_bik_native
-        
-        try:
-            full_text = ""
-            with pdfplumber.open(filepath) as pdf:
-                for page in pdf.pages:
-                    full_text += (page.extract_text() or "") + "\n"
-            
-            # Debug: Save extracted text
-            try:
-                with open("debug_pdf_text.txt", "w") as tf: 
-                    tf.write(full_text)
-            except: pass
-            
-            # Native Parser
-            analysis = parse_bik_native(full_text)
-            
-            # Verify minimum data was extracted
-            if not analysis.get("active_liabilities") and not analysis.get("closed_liabilities"):
-                raise Exception("Native parser found no liabilities, falling back to regex")
-            
-            return jsonify(analysis)
-            
-        except Exception as e:
-            print(f"Native Parser Failed: {e}")
-            # Fallback to old Regex parser
-            analysis = parse_bik_report(filepath)
-            analysis["parser_type"] = "REGEX_FALLBACK"
+        upload = file.stream  # SpooledUpload: in memory, spilled to a temp file only when large
+        analysis = analyze_bik(upload.source, upload.digest, cache=get_parse_cache(),
+                               backend=current_app.config['PDF_BACKEND_UPLOAD_BIK'], store=get_bik_store(),
+                               filename=secure_filename(file.filename))
+        with stage_timer("upload_bik", "serialize"):
             return jsonify(analysis)
 
     return jsonify({"error": "Upload failed"}), 500
 
+@bp.route('/upload_bik_batch', methods=['POST'])
+def upload_bik_batch():
+    # Several reports (files[]): parsed in the process pool, each analysis is streamed
+    # back as one NDJSON line ({"index", "filename", "analysis"}) as soon as it is ready
+    _receive_uploads("upload_bik_batch")
+    uploads = _keep_uploads('files[]') + _keep_uploads('file')
+    if not uploads:
+        return jsonify({"error": "No file part"}), 400
+    workers = current_app.config['PDF_PARSE_WORKERS']
+    backend = current_app.config['PDF_BACKEND_UPLOAD_BIK']
+    json = current_app.json  # the generator runs after the app context is gone
+    
+    def records():
+        try:
+            for position, filename, analysis in analyze_bik_batch(uploads, workers=workers, cache=get_parse_cache(),
+                                                                  backend=backend, store=get_bik_store()):
+                with stage_timer("upload_bik_batch", "serialize"):
+                    line = json.dumps({"index": position, "filename": filename, "analysis": analysis})
+                yield line + "\n"
+        finally:
+            for _, upload in uploads:
+                upload.discard()
+    
+    return Response(records(), mimetype='application/x-ndjson', headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+# --- Stored BIK analyses (services.bik_store) ---
+
+@bik_store_bp.before_request
+def _require_store_token():
+    # Authorization: Bearer <BIK_STORE_API_TOKEN>; without a configured token the queries are off
+    token = os.getenv('BIK_STORE_API_TOKEN', '')
+    if not token:
+        return jsonify({"error": "BIK store queries disabled (BIK_STORE_API_TOKEN)"}), 403
+    sent = request.headers.get('Authorization', '').removeprefix('Bearer ')
+    if not hmac.compare_digest(sent.encode(), token.encode()):
+        return jsonify({"error": "Unauthorized"}), 401
+
+def _bik_store_or_error():
+    store = get_bik_store()
+    if store is None:
+        return None, (jsonify({"error": "BIK store disabled (BIK_STORE_PATH)"}), 503)
+    return store, None
+
+def _valid_pesel(pesel):
+    return len(pesel) == 11 and pesel.isdigit()
+
+@bik_store_bp.route('/clients/<pesel>/latest', methods=['GET'])
+def bik_latest_report(pesel):
+    store, error = _bik_store_or_error()
+    if error:
+        return error
+    if not _valid_pesel(pesel):
+        return jsonify({"error": "Invalid PESEL"}), 400
+    analysis = store.latest(pesel)
+    if analysis is None:
+        return jsonify({"error": "No stored report"}), 404
+    return jsonify(analysis)
+
+@bik_store_bp.route('/clients/<pesel>/reports', methods=['GET'])
+def bik_report_history(pesel):
+    store, error = _bik_store_or_error()
+    if error:
+        return error
+    if not _valid_pesel(pesel):
+        return jsonify({"error": "Invalid PESEL"}), 400
+    return jsonify({"pesel": pesel, "reports": store.history(pesel)})
+
+@bik_store_bp.route('/lenders/<lender>/clients', methods=['GET'])
+def bik_lender_clients(lender):
+    # Clients whose latest stored report has a liability at the lender (?section=active|closed|statistical)
+    store, error = _bik_store_or_error()
+    if error:
+        return error
+    section = request.args.get('section', 'active')
+    if section not in SECTIONS:
+        return jsonify({"error": f"Unknown section: {section}"}), 400
+    return jsonify({"lender": lender, "section": section, "clients": store.clients_with_lender(lender, section)})
+
+
+# --- Background jobs (large batches) ---
+
+def _keep_uploads(field):
+    """Uploads that must outlive the request; the job (or streamed response) discards them when done."""
+    uploads = []
+    for file in request.files.getlist(field):
+        if file and file.filename != '':
+            uploads.append((secure_filename(file.filename), file.stream.keep_open()))
+    return uploads
+
+def _job_accepted(job):
+    return jsonify({
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": url_for('.job_status', job_id=job.id),
+        "events_url": url_for('.job_events', job_id=job.id)
+    }), 202
+
+@bp.route('/jobs/upload_pdfs', methods=['POST'])
+def submit_upload_pdfs_job():
+    if 'files[]' not in _receive_uploads("jobs_upload_pdfs"):
+        return jsonify({"error": "No file part"}), 400
+    
+    uploads = _keep_uploads('files[]')
+    workers = current_app.config['PDF_PARSE_WORKERS']
+    backend = current_app.config['PDF_BACKEND_UPLOAD_PDFS']
+    index = _client_index()
+    
+    def work(job):
+        try:
+            results = []
+            for data in parse_confirmations(uploads, workers=workers, cache=get_parse_cache(), backend=backend,
+                                            index=index):
+                results.append(data)
+                job.add_partial(dict(data))
+            return group_transactions(results)
+        finally:
+            for _, upload in uploads:
+                upload.discard()
+    
+    return _job_accepted(get_job_manager().submit("upload_pdfs", len(uploads), work))
+
+@bp.route('/jobs/upload_bik', methods=['POST'])
+def submit_upload_bik_job():
+    # Accepts several reports (files[]) or a single one (file)
+    _receive_uploads("jobs_upload_bik")
+    uploads = _keep_uploads('files[]') + _keep_uploads('file')
+    if not uploads:
+        return jsonify({"error": "No file part"}), 400
+    backend = current_app.config['PDF_BACKEND_UPLOAD_BIK']
+    
+    def work(job):
+        try:
+            reports = []
+            for filename, upload in uploads:
+                analysis = analyze_bik(upload.source, upload.digest, cache=get_parse_cache(), backend=backend,
+                                       store=get_bik_store(), filename=filename)
+                report = {"filename": filename, "analysis": analysis}
+                reports.append(report)
+                job.add_partial(report)
+            return reports
+        finally:
+            for _, upload in uploads:
+                upload.discard()
+    
+    return _job_accepted(get_job_manager().submit("upload_bik", len(uploads), work))
+
+@bp.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = get_job_manager().get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    # ?since=N returns only partial results after the first N (use "next" from the previous poll)
+    return jsonify(job.to_dict(since=request.args.get('since', 0, type=int)))
+
+@bp.route('/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    job = get_job_manager().get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    return Response(sse_events(job), mimetype='text/event-stream', headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 
 
 
 
+app = create_app()  # gunicorn app:app (or 'app:create_app()')
 
 if __name__ == '__main__':
     app.run(debug=True, port=5001)
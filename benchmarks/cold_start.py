@@ -0,0 +1,70 @@
+"""
+Cold start benchmark: time from process start to the first successful
+response of a fresh app process.
+
+    python -m benchmarks.cold_start               # with and without WARMUP=1
+    python -m benchmarks.cold_start --runs 5
+
+Each run starts a new interpreter that imports app (create_app) and posts
+a confirmation to /upload_pdfs and a report to /upload_bik through the
+test client (no parse pool, no cache), printing seconds since the parent
+started the process: "boot" (app ready), "first_pdfs" / "first_bik"
+(first successful response of each route). Median of --runs is reported.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.corpus import ROOT
+
+
+CHILD = r"""
+import io, json, sys, time
+start = float(sys.argv[1])
+import app as app_module
+from benchmarks.corpus import load_fixture_text, render_pdf, split_pages, synthesize_confirmation_text
+timings = {"boot": time.monotonic() - start}
+confirmation = render_pdf([synthesize_confirmation_text(1).split("\n")])
+report = render_pdf([page.split("\n") for page in split_pages(load_fixture_text("debug_pdf_text.txt"))[:2]])
+client = app_module.app.test_client()
+begin = time.monotonic()
+response = client.post("/upload_pdfs", data={"files[]": [(io.BytesIO(confirmation), "c.pdf")]})
+assert response.status_code == 200, response.status_code
+timings["first_pdfs"] = timings["boot"] + time.monotonic() - begin
+begin = time.monotonic()
+response = client.post("/upload_bik", data={"file": (io.BytesIO(report), "r.pdf")})
+assert response.status_code == 200, response.status_code
+timings["first_bik"] = timings["boot"] + time.monotonic() - begin
+print(json.dumps(timings))
+"""
+
+
+def run_once(warmup):
+    env = dict(os.environ, WARMUP="1" if warmup else "0", PDF_PARSE_WORKERS="1",
+               PARSE_CACHE_DIR="", TRANSACTION_INDEX_PATH="", DEBUG_CAPTURE_SAMPLE_RATE="0")
+    start = time.monotonic()
+    out = subprocess.run([sys.executable, "-c", CHILD, str(start)], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    print(f"{'mode':<10} {'boot':>8} {'first_pdfs':>11} {'first_bik':>10}")
+    for warmup in (False, True):
+        runs = [run_once(warmup) for _ in range(args.runs)]
+        median = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+        print(f"{'warmup' if warmup else 'cold':<10} {median['boot']:>7.2f}s {median['first_pdfs']:>10.2f}s "
+              f"{median['first_bik']:>9.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""
+Benchmark / test corpora.
+
+- fixture texts: the captured reports in the repo root (debug_pdf_text.txt, debug_beata.txt)
+- synthesize_bik_text(): BIK report text with N liabilities and M history rows each
+- synthesize_confirmation_text(): mBank / Pekao transfer confirmation text
+- render_pdf(): minimal text PDF writer, so the PDF stages can be measured
+  without shipping binary fixtures
+"""
+
+import os
+import random
+import zlib
+from datetime import date, timedelta
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FIXTURE_TEXTS = ["debug_pdf_text.txt", "debug_beata.txt"]
+
+
+def load_fixture_text(name):
+    with open(os.path.join(ROOT, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def split_pages(text, lines_per_page=70):
+    """Splits report text into page texts (roughly what extract_text() returns per page)."""
+    lines = text.split("\n")
+    return ["\n".join(lines[i:i + lines_per_page]) for i in range(0, len(lines), lines_per_page)]
+
+
+# --- Synthetic BIK reports ---
+
+BANKS = [
+    "ALIOR BANK", "SANTANDER CONSUMER BANK", "ING BANK ŚLĄSKI S.A.", "PKO BP 1 O.GDYNIA",
+    "MBANK WYDZIAŁ BANKOWOŚCI", "BANK MILLENNIUM", "NEST BANK", "CITI HANDLOWY",
+    "ALLEGRO PAY SP. Z O.O.", "TWISTO POLSKA SP. Z O.O.", "PROVIDENT POLSKA S.A.",
+]
+
+CREDIT_TYPES = [
+    "Kredyt gotówkowy, pożyczka bankowa", "Kredyt na zakup towarów i usług",
+    "Kredyt odnawialny", "Karta kredytowa", "Kredyt mieszkaniowy",
+]
+
+
+def _d(day):
+    return day.strftime("%d.%m.%Y")
+
+
+def _pln(value):
+    return f"{value:,}".replace(",", ".") + " PLN"
+
+
+def synthesize_bik_text(n_liabilities=10, m_history=24, seed=0, report_date=date(2025, 6, 11)):
+    """
+    BIK report text in the layout pdfplumber produces for real reports:
+    summary tables, detailed sections with repayment history, statistical
+    section and inquiries. n_liabilities of each kind (active / closed / statistical),
+    m_history history rows per liability.
+    """
+    rnd = random.Random(seed)
+    out = [
+        f"{_d(report_date)} | 10:31",
+        "Wskaźnik BIK",
+        "Jan Testowy",
+        "PESEL: 86080818085",
+        "Płacę bez opóźnień",
+        "Ocena punktowa BIK",
+        f"{rnd.randint(20, 99)}/ 100",
+        "Zobowiązania finansowe - w trakcie spłaty",
+        "Zawarcie Pierwotna Pozostało Kwota Suma Historia Ostatnia",
+        "Typ umowy kwota do spłaty raty zaległości spłacania płatność",
+    ]
+
+    def liability(i):
+        start = report_date - timedelta(days=rnd.randint(60, 3000))
+        amount = rnd.randint(500, 300000)
+        return {
+            "bank": rnd.choice(BANKS),
+            "type": rnd.choice(CREDIT_TYPES),
+            "start": start,
+            "amount": amount,
+            "left": rnd.randint(0, amount),
+            "installment": rnd.randint(30, 3000),
+        }
+
+    active = [liability(i) for i in range(n_liabilities)]
+    closed = [liability(i) for i in range(n_liabilities)]
+    statistical = [liability(i) for i in range(n_liabilities)]
+
+    for i, item in enumerate(active):
+        out.append(item["type"])
+        out.append(f"{_d(item['start'])} {_pln(item['amount'])} {_pln(item['left'])} {_pln(item['installment'])} BRAK")
+        out.append(item["bank"])
+        if i % 12 == 11:
+            out.append(f"{i // 12 + 1} / 95")
+    out.append(f"Łącznie {_pln(sum(a['amount'] for a in active))} {_pln(sum(a['left'] for a in active))} BRAK")
+
+    out.append("Zobowiązania finansowe - zamknięte (w ciągu ostatnich 60 miesięcy)")
+    out.append("Zawarcie Pierwotna Zakończenie Historia Ostatni")
+    for item in closed:
+        item["end"] = item["start"] + timedelta(days=rnd.randint(30, 900))
+        out.append(item["type"])
+        out.append(f"{_d(item['start'])} {_pln(item['amount'])} {_d(item['end'])}")
+        out.append(item["bank"])
+    out.append(f"Łącznie {_pln(sum(c['amount'] for c in closed))}")
+    out.append("Informacje dodatkowe")
+    out.append(f"{rnd.randint(0, 20)} {rnd.randint(0, 20)} 0 0")
+    out.append("Zapytania kredytowe w BIK Zapytania w BIG InfoMonitor Niespłacone długi Uregulowane płatności")
+    out.append("Informacje szczegółowe")
+
+    def history(item, closed_item):
+        out.append("Historia spłaty")
+        out.append("Data Do spłaty Suma zaległości Liczba dni opóźnienia")
+        day = item.get("end", report_date)
+        for _ in range(m_history):
+            delay = rnd.choice([0] * 19 + [rnd.randint(1, 120)])
+            arrears = rnd.randint(10, 900) if delay else 0
+            due = 0 if closed_item and rnd.random() < 0.2 else rnd.randint(100, 200000)
+            due_s = f"{due} PLN" if due else "0"
+            arrears_s = f"{arrears} PLN" if arrears else "0"
+            out.append(f"{_d(day)} {due_s} {arrears_s} {delay}")
+            day -= timedelta(days=rnd.randint(25, 35))
+
+    out.append("Zobowiązania finansowe w BIK w trakcie spłaty")
+    for item in active:
+        out.append(item["bank"])
+        out.append(f"Zobowiązanie: {item['type']}")
+        out.append(f"Z dnia: {_d(item['start'])}")
+        out.append("Pierwotna kwota Suma zaległości Kwota raty Historia spłacania Ostatnia płatność")
+        out.append(f"{_pln(item['amount'])} BRAK {_pln(item['installment'])}")
+        out.append(f"Kredytobiorca {_pln(item['amount'])} {_pln(item['left'])} Otwarte")
+        history(item, False)
+
+    out.append("Zobowiązania finansowe zamknięte w BIK")
+    out.append("Nazwa instytucji Zobowiązania Pierwotna kwota Historia spłacania")
+    for item in closed:
+        out.append(f"{item['bank']} {item['type']} z dn. {_d(item['start'])} {_pln(item['amount'])} umowa zakończona dn. {_d(item['end'])}")
+        out.append("Relacja Status Data zamknięcia")
+        out.append(f"Kredytobiorca Zamknięte {_d(item['end'])}")
+        history(item, True)
+
+    out.append("Zobowiązania finansowe przetwarzane w celach statystycznych")
+    out.append("Nazwa instytucji Zobowiązania Pierwotna kwota Historia spłacania")
+    for item in statistical:
+        item["end"] = item["start"] + timedelta(days=rnd.randint(30, 900))
+        out.append(f"{item['bank']} {item['type']} z dn.")
+        out.append(f"{_pln(item['amount'])} umowa zakończona dn. {_d(item['end'])}")
+        out.append(f"Kredytobiorca {_pln(item['amount'])} 0 Zamknięte {_d(item['end'])}")
+        history(item, True)
+
+    out.append("Zobowiązania finansowe przetwarzane na potrzeby rozpatrywania reklamacji: brak")
+    out.append("Zapytania kredytowe w BIK")
+    out.append("Nazwa instytucji Data zapytania Zobowiązania Wnioskowana kwota Twoja rola")
+    for _ in range(10):
+        out.append("Kredyt gotówkowy / pożyczka")
+        out.append(f"{rnd.choice(BANKS)} {_d(report_date - timedelta(days=rnd.randint(1, 365)))}, 11:59 {_pln(rnd.randint(1, 300) * 1000)} Kredytobiorca")
+    return "\n".join(out) + "\n"
+
+
+# --- Synthetic transfer confirmations ---
+
+def synthesize_confirmation_text(i, bank="mBank"):
+    rnd = random.Random(i)
+    day = date(2024, 1, 1) + timedelta(days=rnd.randint(0, 364))
+    amount = f"{rnd.randint(1000, 9000)},{rnd.randint(10, 99)}"
+    account = f"{rnd.randint(10, 99)} 1140 {rnd.randint(1000, 9999)} 1111 2222 3333 4444"
+    if bank == "mBank":
+        return "\n".join([
+            "mBank S.A.",
+            "Potwierdzenie wykonania przelewu",
+            f"Data operacji: {day.isoformat()}",
+            f"Kwota przelewu: {amount}PLN",
+            "Nadawca: PRACODAWCA SP Z O O",
+            "Odbiorca: JULIA LATKO",
+            f"Rachunek odbiorcy: {account}",
+            f"Tytuł operacji: WYNAGRODZENIE {day.month:02d}/{day.year}",
+        ])
+    return "\n".join([
+        "Bank Pekao S.A.",
+        f"Data księgowania: {day.strftime('%d/%m/%Y')}",
+        f"Kwota uznania: {amount} PLN",
+        "Właściciel: JAN KOWALSKI",
+        f"Numer rachunku: {account}",
+        "Typ operacji: PRZELEW",
+        f"Tytuł: PENSJA {day.month:02d}/{day.year}",
+    ])
+
+
+# --- Minimal PDF writer ---
+# Standard Helvetica with a /Differences encoding for Polish letters, so
+# pdfminer maps the glyphs back to the right Unicode characters.
+_GLYPHS = {
+    "ą": "aogonek", "ć": "cacute", "ę": "eogonek", "ł": "lslash", "ń": "nacute",
+    "ó": "oacute", "ś": "sacute", "ź": "zacute", "ż": "zdotaccent",
+    "Ą": "Aogonek", "Ć": "Cacute", "Ę": "Eogonek", "Ł": "Lslash", "Ń": "Nacute",
+    "Ó": "Oacute", "Ś": "Sacute", "Ź": "Zacute", "Ż": "Zdotaccent",
+    "–": "endash", "—": "emdash",
+}
+_CODES = {ch: 128 + i for i, ch in enumerate(_GLYPHS)}
+
+
+def _encode(text):
+    out = bytearray()
+    for ch in text:
+        if ch in _CODES:
+            out.append(_CODES[ch])
+        elif ch in "()\\":
+            out += b"\\" + ch.encode()
+        elif ord(ch) < 128:
+            out.append(ord(ch))
+        else:
+            out += b"?"
+    return bytes(out)
+
+
+def render_pdf(pages, font_size=9, leading=11, width=595, height=842):
+    """
+    pages: list of pages; a page is a list of lines; a line is a string
+    (drawn at x=40) or a list of (x, text) segments for table-like layouts.
+    Returns the PDF bytes.
+    """
+    objects = []
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    differences = " ".join(f"{code} /{_GLYPHS[ch]}" for ch, code in _CODES.items())
+    font = add(("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding "
+                f"<< /Type /Encoding /BaseEncoding /WinAnsiEncoding /Differences [{differences}] >> >>").encode())
+
+    contents = []
+    for lines in pages:
+        ops = [f"BT /F1 {font_size} Tf".encode()]
+        y = height - 40
+        for line in lines:
+            segments = line if isinstance(line, list) else [(40, line)]
+            for x, text in segments:
+                ops.append(f"1 0 0 1 {x} {y} Tm (".encode() + _encode(text) + b") Tj")
+            y -= leading
+        ops.append(b"ET")
+        stream = zlib.compress(b"\n".join(ops))
+        contents.append(add(b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(stream) + stream + b"\nendstream"))
+
+    pages_id = len(objects) + len(pages) + 1
+    kids = []
+    for content in contents:
+        kids.append(add((f"<< /Type /Page /Parent {pages_id} 0 R /MediaBox [0 0 {width} {height}] "
+                         f"/Resources << /Font << /F1 {font} 0 R >> >> /Contents {content} 0 R >>").encode()))
+    add(f"<< /Type /Pages /Kids [{' '.join(f'{k} 0 R' for k in kids)}] /Count {len(kids)} >>".encode())
+    catalog = add(f"<< /Type /Catalog /Pages {pages_id} 0 R >>".encode())
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, xref)
+    return bytes(out)
+
+
+def render_text_pdf(text, lines_per_page=70):
+    return render_pdf([page.split("\n") for page in split_pages(text, lines_per_page)])
@@ -0,0 +1,85 @@
+"""
+Peak RSS of BIK report extraction versus page count.
+
+    python -m benchmarks.memory                     # default page counts
+    python -m benchmarks.memory --liabilities 5 20 80 --limit-mb 64
+
+Every measurement runs in a fresh interpreter: the synthetic report PDF is
+rendered first, then peak RSS growth (ru_maxrss) is measured over
+- retained: pdfplumber with every page kept open until the end (the
+  behaviour before pages were released)
+- bounded: parsers.extraction.iter_page_texts (each page released)
+- analyze_bik: the full native -> regex cascade over iter_page_texts
+With --limit-mb the bounded run also sets EXTRACT_MEMORY_LIMIT_MB and
+reports whether the document was aborted.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks.corpus import ROOT
+
+
+CHILD = r"""
+import io, json, resource, sys
+from benchmarks.corpus import render_text_pdf, synthesize_bik_text
+n, mode = int(sys.argv[1]), sys.argv[2]
+data = render_text_pdf(synthesize_bik_text(n, 24, seed=n))
+import pdfplumber
+from parsers.extraction import ExtractionMemoryError, iter_page_texts
+from services.bik import analyze_bik
+
+def peak_kb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+pages, aborted = 0, False
+if mode == "analyze_bik":
+    pages = len(list(iter_page_texts(data, "pdfium", memory_limit=0)))
+before = peak_kb()
+if mode == "retained":
+    with pdfplumber.open(io.BytesIO(data)) as pdf:
+        for page in pdf.pages:
+            page.extract_text()
+            pages += 1
+elif mode == "bounded":
+    try:
+        for _ in iter_page_texts(data, "pdfplumber"):
+            pages += 1
+    except ExtractionMemoryError:
+        aborted = True
+else:
+    aborted = analyze_bik(data, "bench", backend="pdfplumber").get("status") == "error"
+print(json.dumps({"pages": pages, "peak_mb": (peak_kb() - before) / 1024, "aborted": aborted}))
+"""
+
+MODES = ["retained", "bounded", "analyze_bik"]
+
+
+def run_once(liabilities, mode, limit_mb):
+    env = dict(os.environ, EXTRACT_MEMORY_LIMIT_MB=str(limit_mb), DEBUG_CAPTURE_SAMPLE_RATE="0")
+    out = subprocess.run([sys.executable, "-c", CHILD, str(liabilities), mode], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--liabilities", type=int, nargs="+", default=[5, 10, 20, 40, 80],
+                        help="liabilities per section of the synthetic report (sets the page count)")
+    parser.add_argument("--limit-mb", type=float, default=0, help="EXTRACT_MEMORY_LIMIT_MB for the bounded runs")
+    args = parser.parse_args(argv)
+
+    print(f"{'pages':>6} " + " ".join(f"{mode + ' MB':>15}" for mode in MODES))
+    for n in args.liabilities:
+        results = {mode: run_once(n, mode, args.limit_mb if mode != "retained" else 0) for mode in MODES}
+        cells = [f"{r['peak_mb']:>12.1f}{' !' if r['aborted'] else '  '} " for r in results.values()]
+        print(f"{results['retained']['pages']:>6} " + " ".join(cells))
+    if args.limit_mb:
+        print("! = aborted by the memory limit")
+
+
+if __name__ == "__main__":
+    main()
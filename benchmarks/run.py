@@ -0,0 +1,192 @@
+"""
+Parser benchmark suite.
+
+    python -m benchmarks.run                    # run and compare with benchmarks/baseline.json
+    python -m benchmarks.run --save-baseline    # store current numbers as the new baseline
+    python -m benchmarks.run --only native --scale 4
+
+For every case it reports docs/sec (best of --repeat runs), peak Python
+memory (tracemalloc) and per-phase timings (cumulative time of the repo's
+own functions, from one profiled run). Exit code 1 when a case is slower
+or uses more memory than the baseline beyond --tolerance, so it can gate a deploy.
+Baselines are machine specific - regenerate them on the box that compares.
+"""
+
+import argparse
+import cProfile
+import json
+import os
+import pstats
+import sys
+import time
+import tracemalloc
+
+from benchmarks.corpus import (
+    ROOT, FIXTURE_TEXTS, load_fixture_text, synthesize_bik_text,
+    synthesize_confirmation_text, render_pdf
+)
+
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+class Case:
+    def __init__(self, name, docs, run, units=None):
+        """
+        docs: inputs for one round; run(doc) processes a single input.
+        units: documents handled per round when one input holds many (default len(docs)).
+        """
+        self.name = name
+        self.docs = docs
+        self.run = run
+        self.units = units or len(docs)
+
+    def round(self):
+        for doc in self.docs:
+            self.run(doc)
+
+
+def build_cases(scale=1):
+    from parsers.bik_native_parser import parse_bik_native
+    from parsers.bik_parser import parse_bik_text
+    from parsers.pdf_parser import parse_pdf
+    from services.transactions import group_transactions
+
+    cases = []
+    bik_inputs = [(name, [load_fixture_text(name)]) for name in FIXTURE_TEXTS]
+    for n, m in [(10, 24), (40, 120)]:
+        n, m = n * scale, m * scale
+        bik_inputs.append((f"synthetic_n{n}_m{m}", [synthesize_bik_text(n, m, seed=n + m)]))
+
+    for label, texts in bik_inputs:
+        cases.append(Case(f"native[{label}]", texts, parse_bik_native))
+    for label, texts in bik_inputs:
+        cases.append(Case(f"regex_text[{label}]", texts, parse_bik_text))
+
+    confirmations = [
+        render_pdf([synthesize_confirmation_text(i, "mBank" if i % 2 else "Pekao").split("\n")])
+        for i in range(20 * scale)
+    ]
+    cases.append(Case(f"parse_pdf[{len(confirmations)} confirmations]", confirmations, parse_pdf))
+    cases.append(Case(f"parse_pdf_pdfium[{len(confirmations)} confirmations]", confirmations,
+                      lambda pdf: parse_pdf(pdf, backend="pdfium")))
+
+    # upload_pdfs grouping over already parsed results (dedup + canonical names + months)
+    parsed = [parse_pdf(pdf) for pdf in confirmations[:20]]
+    batch = []
+    for i in range(2000 * scale):
+        item = dict(parsed[i % len(parsed)])
+        item["amount"] = item.get("amount", 0) + i  # mostly unique, every 20th a duplicate
+        if i % 20 == 0 and batch:
+            item = dict(batch[-1])
+        batch.append(item)
+    cases.append(Case(f"group_transactions[{len(batch)} items]", [batch],
+                      lambda items: group_transactions([dict(x) for x in items]), units=len(batch)))
+    return cases
+
+
+def measure(case, repeat):
+    case.round()  # warm-up (imports, regex caches, pdfminer font tables)
+
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        case.round()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    tracemalloc.start()
+    case.round()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    profiler = cProfile.Profile()
+    profiler.runcall(case.round)
+    phases = repo_phases(profiler)
+
+    return {
+        "docs_per_sec": round(case.units / best, 2) if best else None,
+        "seconds_per_round": round(best, 5),
+        "peak_kb": round(peak / 1024, 1),
+        "phases": phases,
+    }
+
+
+def repo_phases(profiler, top=6):
+    """Cumulative seconds of the repo's own functions (parsers/, services/), slowest first."""
+    stats = pstats.Stats(profiler)
+    rows = []
+    for (filename, _, func), (_, _, _, cumtime, _) in stats.stats.items():
+        if not filename.startswith(ROOT) or os.sep + "benchmarks" + os.sep in filename:
+            continue
+        module = os.path.relpath(filename, ROOT)[:-3].replace(os.sep, ".")
+        rows.append((cumtime, f"{module}.{func}"))
+    rows.sort(reverse=True)
+    return {name: round(t, 5) for t, name in rows[:top]}
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, res in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if base.get("docs_per_sec") and res["docs_per_sec"] < base["docs_per_sec"] * (1 - tolerance):
+            regressions.append(f"{name}: {res['docs_per_sec']} docs/s vs baseline {base['docs_per_sec']}")
+        if base.get("peak_kb") and res["peak_kb"] > base["peak_kb"] * (1 + tolerance):
+            regressions.append(f"{name}: peak {res['peak_kb']} KB vs baseline {base['peak_kb']}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--scale", type=int, default=1, help="multiplies synthetic corpus sizes")
+    parser.add_argument("--only", help="run cases whose name contains this string")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.3)
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for case in build_cases(args.scale):
+        if args.only and args.only not in case.name:
+            continue
+        res = measure(case, args.repeat)
+        results[case.name] = res
+        print(f"{case.name:<45} {res['docs_per_sec']:>10} docs/s {res['peak_kb']:>10} KB peak")
+        for phase, seconds in res["phases"].items():
+            print(f"    {phase:<60} {seconds * 1000:>9.2f} ms")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update({name: {k: r[k] for k in ("docs_per_sec", "peak_kb")} for name, r in results.items()})
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline to compare against (run with --save-baseline)")
+        return 0
+    with open(args.baseline) as f:
+        regressions = compare(results, json.load(f), args.tolerance)
+    if regressions:
+        print("\nREGRESSIONS:")
+        for line in regressions:
+            print("  " + line)
+        return 1
+    print("\nNo regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,49 @@
+"""
+Shared test setup: the app client with its process-wide state isolated, and
+builders for confirmation uploads.
+"""
+
+import pytest
+
+import app as app_module
+import services.debug_capture as debug_capture
+import services.jobs as jobs
+import services.parse_cache as parse_cache
+from benchmarks.corpus import render_pdf, synthesize_confirmation_text
+from services.uploads import SpooledUpload
+
+
+def confirmation_pdf(i, bank="mBank"):
+    return render_pdf([synthesize_confirmation_text(i, bank).split("\n")])
+
+
+def upload(data):
+    """An uploaded file as the app receives it (request files are SpooledUploads)."""
+    spooled = SpooledUpload()
+    spooled.write(data)
+    return spooled
+
+
+@pytest.fixture(autouse=True)
+def no_debug_capture(tmp_path, monkeypatch):
+    # get_debug_capture() is a process-wide singleton that reads the env once:
+    # every test gets its own, never sampling (test_debug_capture builds its own)
+    monkeypatch.setattr(debug_capture, "_default_capture", debug_capture.DebugCapture(
+        str(tmp_path / "debug_capture"), sample_rate=0))
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """
+    Test client of the module-level app: in-memory parse cache, no transaction
+    index or BIK store, a fresh job manager, pdfium on both routes, one worker.
+    Tests needing more override the fixture (it can take this one as an argument).
+    """
+    monkeypatch.setattr(parse_cache, "_default_cache", parse_cache.ParseCache(None))
+    monkeypatch.setattr(app_module, "get_transaction_index", lambda: None)
+    monkeypatch.setattr(app_module, "get_bik_store", lambda: None)
+    monkeypatch.setattr(jobs, "_default_manager", jobs.JobManager(max_workers=1))
+    monkeypatch.setitem(app_module.app.config, "PDF_BACKEND_UPLOAD_PDFS", "pdfium")
+    monkeypatch.setitem(app_module.app.config, "PDF_BACKEND_UPLOAD_BIK", "pdfium")
+    monkeypatch.setitem(app_module.app.config, "PDF_PARSE_WORKERS", 1)
+    return app_module.app.test_client()
@@ -1,4 +1,5 @@
 
+from parsers.bik_models import Report
 from parsers.bik_parser import parse_bik_report, parse_liabilities
 import json
 from datetime import datetime
@@ -26,14 +27,7 @@ MBANK
 """
 
 def test_parser():
-    analysis = {
-        "score": None,
-        "personal_data": {},
-        "active_liabilities": [],
-        "closed_liabilities": [],
-        "alerts": [],
-        "summary": {"total_installment": 0.0, "total_limits": 0.0, "mortgage_installment": 0.0}
-    }
+    analysis = Report()
     
     print("--- PARSING HEADER ---")
     # Simulate header parsing logic here before moving to main file
@@ -47,9 +41,9 @@ def test_parser():
     print("\n--- PARSING LIABILITIES ---")
     # Extract just the liabilities part for function test
     liab_section = sample_text.split("Zobowiązania finansowe - w trakcie spłaty")[1]
-    parse_liabilities(liab_section, analysis["active_liabilities"], analysis)
+    parse_liabilities(liab_section, analysis.active_liabilities, analysis)
     
-    print(json.dumps(analysis["active_liabilities"], indent=2, ensure_ascii=False))
+    print(json.dumps([item.to_dict() for item in analysis.active_liabilities], indent=2, ensure_ascii=False))
 
 if __name__ == "__main__":
     test_parser()
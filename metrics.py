@@ -0,0 +1,223 @@
+"""
+In-process metrics in Prometheus text format (served at /metrics).
+
+- STAGE_SECONDS: latency of every pipeline stage, labelled pipeline/stage
+  (upload receive, per-page extraction, each parse phase, fallback, LLM call,
+  serialization)
+- counters for BIK parser_type distribution, fallbacks and confirmation results
+
+Values are per process: with several gunicorn workers each worker exposes
+its own series (scrape them per worker, or aggregate with sum()).
+Work done in the parse pool is recorded in the worker process with
+capture_observations() and replayed into the web process's registry.
+
+A top-level module, not part of services/, so the parsers can record their
+timings without depending on the service layer.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_local = threading.local()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == int(value):
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._series = {}
+        REGISTRY[name] = self
+
+    def _label_values(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _record(self, label_values, value):
+        buffer = getattr(_local, "buffer", None)
+        if buffer is not None:
+            # Inside capture_observations(): replayed later (possibly in another process)
+            buffer.append((self.name, label_values, value))
+        else:
+            self._apply(label_values, value)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        self._record(self._label_values(labels), amount)
+
+    def _apply(self, label_values, value):
+        with self._lock:
+            self._series[label_values] = self._series.get(label_values, 0) + value
+
+    def render(self):
+        with self._lock:
+            return [f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(value)}"
+                    for values, value in sorted(self._series.items())]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        self._record(self._label_values(labels), value)
+
+    def _apply(self, label_values, value):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # per-bucket counts (non-cumulative), sum, count
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for values, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    le = _format_labels(self.labelnames, values, f'le="{_format_value(bound)}"')
+                    lines.append(f"{self.name}_bucket{le} {cumulative}")
+                inf = _format_labels(self.labelnames, values, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{inf} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, values)} {_format_value(total)}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, values)} {count}")
+        return lines
+
+
+REGISTRY = {}
+
+
+def render_metrics():
+    """All metrics in Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    for metric in REGISTRY.values():
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+@contextmanager
+def capture_observations():
+    """
+    Buffers everything recorded in this thread instead of applying it.
+    The yielded list is picklable; pass it to replay_observations() (e.g. in
+    the web process after a parse pool worker returned it).
+    """
+    previous = getattr(_local, "buffer", None)
+    _local.buffer = observed = []
+    try:
+        yield observed
+    finally:
+        _local.buffer = previous
+
+
+def replay_observations(observed):
+    for name, label_values, value in observed:
+        REGISTRY[name]._record(label_values, value)
+
+
+# --- Pipeline metrics ---
+
+STAGE_SECONDS = Histogram(
+    "pipeline_stage_seconds",
+    "Duration of a pipeline stage. Streamed BIK parsing phases include waiting for lazily extracted pages.",
+    ["pipeline", "stage"],
+)
+PAGE_EXTRACT_SECONDS = Histogram(
+    "pdf_page_extract_seconds",
+    "Text extraction time of one PDF page.",
+    ["backend"],
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_seconds",
+    "Request handling time until the response is returned (streamed bodies not included).",
+    ["route", "method", "status"],
+)
+BIK_REPORTS = Counter(
+    "bik_reports_total",
+    "BIK analyses returned, by parser_type.",
+    ["parser_type"],
+)
+BIK_FALLBACKS = Counter(
+    "bik_fallbacks_total",
+    "BIK analyses that fell back from the native to the regex parser.",
+    ["reason"],
+)
+CONFIRMATIONS = Counter(
+    "confirmations_parsed_total",
+    "Bank confirmations parsed, by status.",
+    ["status"],
+)
+LLM_REQUESTS = Counter(
+    "llm_requests_total",
+    "LLM calls made by the LLM BIK parser, by outcome.",
+    ["status"],
+)
+LLM_CACHE = Counter(
+    "llm_cache_total",
+    "LLM response cache lookups, by result.",
+    ["result"],
+)
+
+
+def observe_stage(pipeline, stage, seconds):
+    STAGE_SECONDS.observe(seconds, pipeline=pipeline, stage=stage)
+
+
+@contextmanager
+def stage_timer(pipeline, stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(pipeline, stage, time.perf_counter() - start)
+
+
+class StageClock:
+    """Times consecutive phases of one pipeline: clock.lap("phase") records the time since the last lap."""
+
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+        self._last = time.perf_counter()
+
+    def lap(self, stage):
+        now = time.perf_counter()
+        observe_stage(self.pipeline, stage, now - self._last)
+        self._last = now
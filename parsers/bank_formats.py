@@ -0,0 +1,178 @@
+"""
+Bank confirmation formats for parse_pdf.
+Each format declares its detector strings and labelled fields; everything
+is compiled once at import:
+- one detector regex over all registered banks (single pass over the text)
+- per format, one combined regex of all field labels (single pass), after
+  which each value is read with an anchored match at its label position.
+Adding a bank = one register_bank_format() call, per-file cost stays flat.
+"""
+
+import re
+
+
+class Field:
+    """A labelled value, e.g. label 'Kwota\\s*przelewu:' + value '\\s*([\\d\\s\\.,]+)PLN'."""
+
+    def __init__(self, name, label, value):
+        self.name = name
+        self.label = label
+        self.pattern = re.compile(label + value, re.IGNORECASE)
+
+
+class BankFormat:
+    def __init__(self, name, detect, fields, build):
+        """
+        name: shown in errors ("mBank")
+        detect: literal strings (case-sensitive) that identify the bank
+        fields: list of Field; several Fields with the same name are tried in list order
+        build: build(values, text) -> dict with amount/date/title/sender/recipient/account_number
+        """
+        self.name = name
+        self.detect = detect
+        self.fields = fields
+        self.build = build
+        self._labels = re.compile(
+            "|".join(f"(?P<f{i}>{f.label})" for i, f in enumerate(fields)),
+            re.IGNORECASE
+        )
+
+    def extract(self, text):
+        """Returns {field name: first group of the first matching Field}."""
+        # One pass collecting every label position
+        positions = [[] for _ in self.fields]
+        for m in self._labels.finditer(text):
+            positions[int(m.lastgroup[1:])].append(m.start())
+
+        values = {}
+        for i, field in enumerate(self.fields):
+            if field.name in values:
+                continue
+            # Same result as field.pattern.search(text): first label position where the value matches
+            for pos in positions[i]:
+                m = field.pattern.match(text, pos)
+                if m:
+                    values[field.name] = m.group(1)
+                    break
+        return self.build(values, text)
+
+
+BANK_FORMATS = []
+_detector = None
+
+
+def register_bank_format(bank_format):
+    """Adds a format; earlier registrations win when several banks are mentioned."""
+    global _detector
+    BANK_FORMATS.append(bank_format)
+    alternatives = []
+    for i, fmt in enumerate(BANK_FORMATS):
+        for literal in fmt.detect:
+            alternatives.append(f"(?P<b{i}_{len(alternatives)}>{re.escape(literal)})")
+    _detector = re.compile("|".join(alternatives))
+
+
+def detect_bank_format(text):
+    """Single scan over text; returns the highest-priority BankFormat found, or None."""
+    best = None
+    for m in _detector.finditer(text):
+        idx = int(m.lastgroup[1:].split("_")[0])
+        if best is None or idx < best:
+            best = idx
+            if best == 0:
+                break
+    return BANK_FORMATS[best] if best is not None else None
+
+
+def bank_format_names():
+    return [fmt.name for fmt in BANK_FORMATS]
+
+
+# --- MBANK ---
+# Generic fallback for a 26 digit account number if the label is missing
+GENERIC_ACCOUNT = re.compile(r"(\d{2}[ \d]{20,})")
+
+
+def _build_mbank(values, text):
+    fields = {}
+    # Amount: Kwotaprzelewu: 3376,53PLN
+    if "amount" in values:
+        fields["amount"] = float(values["amount"].replace(" ", "").replace(",", "."))
+    # Date: Dataoperacji: 2024-12-10
+    if "date" in values:
+        fields["date"] = values["date"]
+    for key in ("recipient", "sender", "title"):
+        if key in values:
+            fields[key] = values[key].strip()
+
+    # Account Number for mBank (Odbiorca usually has account details nearby or look for "Rachunek odbiorcy")
+    account = values.get("account")
+    if account is None:
+        acc_match = GENERIC_ACCOUNT.search(text)
+        if acc_match:
+            account = acc_match.group(1)
+    if account is not None:
+        fields["account_number"] = account.replace(" ", "").strip()
+    return fields
+
+
+register_bank_format(BankFormat(
+    "mBank",
+    detect=["mBank"],
+    fields=[
+        Field("amount", r"Kwota\s*przelewu:", r"\s*([\d\s\.,]+)PLN"),
+        Field("date", r"Data\s*operacji:", r"\s*(\d{4}-\d{2}-\d{2})"),
+        Field("recipient", r"Odbiorca:", r"\s*(.+)"),
+        Field("sender", r"Nadawca:", r"\s*(.+)"),
+        Field("title", r"Tytuł\s*operacji:", r"\s*(.+)"),
+        Field("account", r"Rachunek\s*odbiorcy:", r"\s*([\d\s]{20,})"),
+    ],
+    build=_build_mbank
+))
+
+
+# --- PEKAO ---
+def _build_pekao(values, text):
+    fields = {}
+    if "amount" in values:
+        raw_amt = values["amount"].replace(".", "").replace(",", ".")
+        try: fields["amount"] = float(raw_amt)
+        except: pass
+
+    if "date" in values:
+        d, m, y = values["date"].split("/")
+        fields["date"] = f"{y}-{m}-{d}"
+
+    if "recipient" in values:
+        fields["recipient"] = values["recipient"].strip()
+
+    # Account Number: "Numer rachunku: 88 1240 ..."
+    if "account" in values:
+        fields["account_number"] = values["account"].replace(" ", "").strip()
+
+    # Title heuristics
+    for line in text.split('\n'):
+        upper = line.upper()
+        if "TYTUŁ:" in upper: # Explicit title
+            fields["title"] = line.split(":", 1)[1].strip()
+            break
+        if "WYNAGRODZENIE" in upper or "PŁACE" in upper or "PRZELEW" in upper:
+             if "TYP OPERACJI" not in upper:
+                 fields["title"] = line.strip()
+                 break
+    return fields
+
+
+register_bank_format(BankFormat(
+    "Pekao",
+    detect=["Pekao"],
+    fields=[
+        # "Kwota uznania" wins over "Kwota operacji" wherever they appear
+        Field("amount", r"Kwota\s*uznania:", r"\s*([\d\.,]+)\s*PLN"),
+        Field("amount", r"Kwota\s*operacji:", r"\s*([\d\.,]+)\s*PLN"),
+        Field("date", r"Data\s*księgowania:", r"\s*(\d{2}/\d{2}/\d{4})"),
+        Field("recipient", r"Właściciel:", r"\s*(.+)"),
+        Field("account", r"Numer\s*rachunku:", r"\s*([\d\s]{20,})"),
+    ],
+    build=_build_pekao
+))
@@ -0,0 +1,130 @@
+"""
+BIK parser cascade: native parser first, regex parser second, over ONE extraction.
+
+Page texts are pulled from the extraction backend lazily and kept, so the
+native tier can stop early and a later tier reuses the pages already
+extracted (only pulling the rest). Each tier result gets a confidence score;
+the first tier reaching ACCEPT_CONFIDENCE wins, otherwise every tier runs
+and the most confident result is returned.
+"""
+
+from collections import namedtuple
+
+from metrics import stage_timer
+from parsers.bik_native_parser import parse_bik_native_pages, PARSER_VERSION as NATIVE_VERSION
+from parsers.bik_parser import parse_bik_text, PARSER_VERSION as REGEX_VERSION
+from parsers.lenders import find_lenders
+
+
+# Bump when tiers, scoring or acceptance change - invalidates cached results
+CASCADE_VERSION = f"{NATIVE_VERSION}.{REGEX_VERSION}.1"
+
+# A tier result at least this confident is returned without running later tiers
+ACCEPT_CONFIDENCE = 0.7
+
+TierResult = namedtuple("TierResult", "parser_type analysis confidence error")
+
+
+class ReportPages:
+    """
+    Page texts of one report, extracted lazily and at most once.
+    active_table: parsers.bik_layout.ActiveTableReader fed by the same extraction (optional).
+    """
+
+    def __init__(self, pages, active_table=None):
+        self._source = iter(pages)
+        self.active_table = active_table
+        self.pages = []
+        self.exhausted = False
+        self.error = None  # extraction failure, raised again for every later read
+
+    def __iter__(self):
+        i = 0
+        while True:
+            if i < len(self.pages):
+                yield self.pages[i]
+                i += 1
+            elif self.exhausted or not self._pull():
+                return
+
+    def _pull(self):
+        if self.error is not None:
+            raise self.error
+        try:
+            self.pages.append(next(self._source))
+            return True
+        except StopIteration:
+            self.exhausted = True
+            return False
+        except Exception as e:
+            # A later tier must not parse the pages read before the failure as the whole report
+            self.error = e
+            raise
+
+    def full_text(self):
+        """Whole document text (every page followed by a newline), extracting the rest if needed."""
+        while not self.exhausted:
+            self._pull()
+        return self.text_so_far()
+
+    def text_so_far(self):
+        return "".join(text + "\n" for text in self.pages)
+
+    def close(self):
+        close = getattr(self._source, "close", None)
+        if close:
+            close()
+
+
+def confidence(analysis):
+    """
+    0..1 estimate of how completely a tier parsed a report: header data found,
+    liabilities found and the share of them naming a known lender.
+    """
+    if not analysis or "error" in analysis:
+        return 0.0
+    personal = analysis.get("personal_data") or {}
+    score = 0.1 * bool(personal.get("pesel")) + 0.1 * bool(personal.get("report_date"))
+    score += 0.1 * (analysis.get("score") is not None)
+    liabilities = (analysis.get("active_liabilities", []) + analysis.get("closed_liabilities", [])
+                   + analysis.get("statistical_liabilities", []))
+    if liabilities:
+        known = sum(1 for liability in liabilities if find_lenders(liability.get("bank") or ""))
+        score += 0.4 + 0.3 * known / len(liabilities)
+    return round(score, 3)
+
+
+def _native_tier(report):
+    return parse_bik_native_pages(iter(report), report.active_table)
+
+
+def _regex_tier(report):
+    return parse_bik_text(report.full_text())
+
+
+# (parser_type, parse function over ReportPages), in cascade order
+TIERS = [
+    ("NATIVE", _native_tier),
+    ("REGEX_FALLBACK", _regex_tier),
+]
+
+
+def run_cascade(report, tiers=TIERS):
+    """
+    Runs tiers over one ReportPages until one is confident enough.
+    Returns (best TierResult, [TierResult of every tier that ran]).
+    A tier that raises scores 0; ties go to the earlier tier.
+    """
+    results = []
+    for parser_type, parse in tiers:
+        try:
+            with stage_timer("bik_cascade", parser_type.lower()):
+                analysis = parse(report)
+            result = TierResult(parser_type, analysis, confidence(analysis), None)
+        except Exception as e:
+            result = TierResult(parser_type, None, 0.0, str(e))
+        results.append(result)
+        if result.confidence >= ACCEPT_CONFIDENCE:
+            break
+    best = max(results, key=lambda r: r.confidence)  # max() keeps the first of equals
+    return best, results
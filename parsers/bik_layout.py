@@ -0,0 +1,168 @@
+"""
+Layout path for the active liabilities summary table (pdfplumber backend).
+
+The text path (bik_native_parser.parse_active_section) rebuilds the table
+from flattened lines. Here the table is located on the pages while they
+are extracted: its bounds (the table header and "Łącznie") are found with
+page.search() over the text map extract_text() has just built, and only
+the region between them is cropped and run through extract_words() - no
+second full-page layout pass, no cost on pages outside the table. Rows
+and columns are then read from the word boxes:
+- a row is anchored by its "Zawarcie" date, the first date on a line
+- words left of the date are the "Typ umowy" cell: the credit type on top,
+  the lender name (possibly wrapped over several lines) below it
+- words right of the date are the amount cells in column order: Pierwotna
+  kwota, Pozostało do spłaty, Kwota raty ("ND" = none), Suma zaległości
+
+The pdfium backend has no pdfplumber pages; there, and whenever the table
+is not found whole, the native parser keeps using the text path.
+"""
+
+import re
+
+from parsers.bik_native_parser import (
+    DATE_PATTERN, SECTION_MARKERS, _credit_type, _mentions_active_lender, summary_liability
+)
+
+
+ACTIVE_HEADER = dict(SECTION_MARKERS)["active"]
+
+# First of these below the header ends the table (the tokenizer's summary end, or the next section)
+TABLE_END = re.compile(r'^Łącznie|Informacje szczegółowe|Historia spłaty|Zobowiązania', re.MULTILINE)
+
+COLUMN_HEADER = re.compile(r'^(Zawarcie Pierwotna|Typ umowy)')
+PAGE_NUMBER = re.compile(r'^\d+ / \d+$')
+AMOUNT = re.compile(r'\d[\d.,]*')
+
+# Same line grouping tolerance as pdfplumber's extract_text() (points)
+Y_TOLERANCE = 3
+
+# A line of the "Typ umowy" column starting with one of these begins the next row
+TYPE_PREFIXES = ("kredyt", "karta", "zakupy", "pożyczka", "limit", "debet", "leasing", "linia")
+
+
+class ActiveTableReader:
+    """
+    Collects the words of the active summary table, page by page, as an
+    on_page hook of parsers.extraction.iter_page_texts.
+    """
+
+    def __init__(self):
+        self.lines = []  # lines of the table (lists of words, left to right), top to bottom across pages
+        self.found = False
+        self.complete = False
+        self.failed = False
+
+    def __call__(self, page, text):
+        if self.complete or self.failed:
+            return
+        if not self.found and not ACTIVE_HEADER.search(text):
+            return
+        try:
+            self._read_page(page)
+        except Exception as e:
+            # Only an optimization - the text path still has the whole table
+            print(f"⚠️ Active table layout not read: {e}")
+            self.failed = True
+
+    def _read_page(self, page):
+        top = page.bbox[1]
+        if not self.found:
+            header = page.search(ACTIVE_HEADER)
+            if not header:
+                return
+            self.found = True
+            top = header[0]["bottom"]
+        bottom = page.bbox[3]
+        for match in page.search(TABLE_END):
+            if match["top"] >= top:
+                bottom = match["top"]
+                self.complete = True
+                break
+        # within_bbox: only words wholly inside the table, not the "Łącznie" row it touches
+        left, _, right, _ = page.bbox
+        words = page.within_bbox((left, top, right, bottom)).extract_words()
+        self.lines.extend(_word_lines(words))
+
+    def liabilities(self):
+        """Liabilities read from the table, or None when it was not read whole."""
+        if not self.complete or self.failed:
+            return None
+        rows = []
+        row = None
+        for words in self.lines:
+            texts = [w["text"] for w in words]
+            line = " ".join(texts)
+            if COLUMN_HEADER.match(line) or PAGE_NUMBER.match(line):
+                continue
+            anchor = next((i for i, t in enumerate(texts) if DATE_PATTERN.fullmatch(t)), None)
+            if anchor is None:
+                if row is None or (row.cells is not None and _is_type_label(line)):
+                    row = _Row()
+                    rows.append(row)
+                if row.cells is not None or _mentions_active_lender(line):
+                    row.bank.append(line)
+                else:
+                    row.type.append(line)
+                continue
+            if row is None or row.cells is not None:
+                row = _Row()
+                rows.append(row)
+            row.cells = _cells(texts[anchor + 1:])
+            if anchor:
+                row.bank.append(" ".join(texts[:anchor]))
+        return [liability for liability in map(_Row.liability, rows) if liability is not None]
+
+
+class _Row:
+    __slots__ = ("type", "bank", "cells")
+
+    def __init__(self):
+        self.type = []
+        self.bank = []
+        self.cells = None  # amount cells right of the date, None until the date line
+
+    def liability(self):
+        cells = self.cells or []
+        amounts = [_to_float(cell) for cell in cells[:3]]
+        if len(amounts) < 2 or None in amounts[:2]:
+            return None
+        installment = amounts[2] if len(amounts) > 2 and amounts[2] is not None else 0.0  # "ND" = Nie Dotyczy
+        credit_type = _credit_type(" ".join(self.type)) or "Kredyt"
+        bank = " ".join(self.bank) or "Nieznany Bank"
+        return summary_liability(bank, credit_type, amounts[0], amounts[1], installment)
+
+
+def _word_lines(words):
+    """Words grouped into lines by their top, each line left to right."""
+    lines = []
+    line_top = None
+    for word in sorted(words, key=lambda w: (w["top"], w["x0"])):
+        if line_top is None or word["top"] - line_top > Y_TOLERANCE:
+            line_top = word["top"]
+            lines.append([])
+        lines[-1].append(word)
+    return [sorted(line, key=lambda w: w["x0"]) for line in lines]
+
+
+def _cells(texts):
+    """Amount cells: a number with its "PLN" unit, or a word such as "ND" / "BRAK"."""
+    cells = []
+    for text in texts:
+        if text == "PLN" and cells:
+            continue
+        cells.append(text)
+    return cells
+
+
+def _is_type_label(line):
+    return line.lower().startswith(TYPE_PREFIXES) and not _mentions_active_lender(line)
+
+
+def _to_float(text):
+    if not AMOUNT.fullmatch(text):
+        return None
+    try:
+        return float(text.replace('.', '').replace(',', '.'))
+    except ValueError:
+        return None
@@ -1,108 +1,105 @@
-
+import asyncio
+import hashlib
 import os
 import json
-from openai import OpenAI
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
+from metrics import LLM_CACHE
+from parsers.bik_models import Liability, PersonalData, Report, Summary
+from parsers.bik_native_parser import tokenize_report, HEADER_LINES
+from parsers.llm_client import chat_json, chat_json_async
+
 # Load environment variables
 load_dotenv()
 
-def parse_bik_with_llm(full_text):
-    """
-    Parses BIK report text using OpenAI/LLM API.
-    Returns a structured dictionary compatible with the frontend.
-    """
-    
-    api_key = os.getenv("OPENAI_API_KEY")
-    base_url = os.getenv("OPENAI_BASE_URL")
-    model_name = os.getenv("OPENAI_MODEL_NAME", "gpt-4o")
+# Bump when a prompt changes - invalidates cached LLM responses
+PROMPT_VERSION = "2"
 
-    if not api_key:
-        return {"error": "Missing OPENAI_API_KEY in .env file", "status": "error"}
+LLM_CACHE_NAMESPACE = "bik_llm"
 
-    # Initialize Client
-    client = OpenAI(
-        api_key=api_key,
-        base_url=base_url if base_url else None
-    )
+# "full": the whole report in one completion; "sections": header and each
+# liability section in concurrent smaller completions, merged afterwards
+LLM_MODES = ("full", "sections")
 
-    # Define Schema (Structured Output)
-    schema = {
-        "type": "object",
-        "properties": {
-            "personal_data": {
+# Output schema (documents the expected JSON; requests use response_format=json_object)
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "personal_data": {
+            "type": "object",
+            "properties": {
+                 "name": {"type": "string", "description": "Full Name (e.g. PAWEŁ HEUSER)"},
+                 "pesel": {"type": "string"},
+                 "birth_date": {"type": "string", "description": "YYYY-MM-DD"},
+                 "report_date": {"type": "string", "description": "YYYY-MM-DD"},
+                 "is_stale": {"type": "boolean"}
+            },
+            "required": ["name", "pesel", "report_date"]
+        },
+        "score": {"type": "integer", "description": "Credit Score (0-100)"},
+        "inquiries_12m": {"type": "integer", "description": "Count of credit inquiries in last 12 months"},
+         "summary": {
+            "type": "object",
+            "properties": {
+                "total_installment": {"type": "number"},
+                "total_limits": {"type": "number"},
+                "mortgage_installment": {"type": "number"}
+            }
+        },
+        "active_liabilities": {
+            "type": "array",
+            "items": {
                 "type": "object",
                 "properties": {
-                     "name": {"type": "string", "description": "Full Name (e.g. PAWEŁ HEUSER)"},
-                     "pesel": {"type": "string"},
-                     "birth_date": {"type": "string", "description": "YYYY-MM-DD"},
-                     "report_date": {"type": "string", "description": "YYYY-MM-DD"},
-                     "is_stale": {"type": "boolean"}
+                    "bank": {"type": "string"},
+                    "type": {"type": "string"},
+                    "installment": {"type": "number"},
+                    "amount_left": {"type": "number"},
+                    "limit": {"type": "number"},
+                    "max_delay_status": {"type": "string", "description": "Status string e.g. '0-30 dni', 'OK', 'WINDYKACJA'"},
+                    "closing_date": {"type": "string", "nullable": True},
+                    "description": {"type": "string", "nullable": True}
                 },
-                "required": ["name", "pesel", "report_date"]
-            },
-            "score": {"type": "integer", "description": "Credit Score (0-100)"},
-            "inquiries_12m": {"type": "integer", "description": "Count of credit inquiries in last 12 months"},
-             "summary": {
+                "required": ["bank", "type", "installment", "amount_left", "limit", "max_delay_status"]
+            }
+        },
+        "closed_liabilities": {
+            "type": "array",
+            "items": {
                 "type": "object",
                 "properties": {
-                    "total_installment": {"type": "number"},
-                    "total_limits": {"type": "number"},
-                    "mortgage_installment": {"type": "number"}
-                }
-            },
-            "active_liabilities": {
-                "type": "array",
-                "items": {
-                    "type": "object",
-                    "properties": {
-                        "bank": {"type": "string"},
-                        "type": {"type": "string"},
-                        "installment": {"type": "number"},
-                        "amount_left": {"type": "number"},
-                        "limit": {"type": "number"},
-                        "max_delay_status": {"type": "string", "description": "Status string e.g. '0-30 dni', 'OK', 'WINDYKACJA'"},
-                        "closing_date": {"type": "string", "nullable": True},
-                        "description": {"type": "string", "nullable": True}
-                    },
-                    "required": ["bank", "type", "installment", "amount_left", "limit", "max_delay_status"]
-                }
-            },
-            "closed_liabilities": {
-                "type": "array",
-                "items": {
-                    "type": "object",
-                    "properties": {
-                        "bank": {"type": "string"},
-                        "type": {"type": "string"},
-                        "closing_date": {"type": "string", "description": "DD.MM.YYYY"},
-                        "max_delay_days": {"type": "integer"},
-                        "max_delay_status": {"type": "string", "description": "Bucket e.g. '31-90 dni'"},
-                        "arrears_amount": {"type": "number", "description": "Max historical arrears amount"},
-                        "description": {"type": "string", "nullable": True}
-                    },
-                     "required": ["bank", "max_delay_days"]
-                }
-            },
-            "statistical_liabilities": {
-                "type": "array",
-                "items": {
-                    "type": "object",
-                     "properties": {
-                        "bank": {"type": "string"},
-                        "type": {"type": "string"},
-                         "closing_date": {"type": "string"},
-                        "max_delay_days": {"type": "integer"},
-                        "max_delay_status": {"type": "string"}
-                    }
-                }
+                    "bank": {"type": "string"},
+                    "type": {"type": "string"},
+                    "closing_date": {"type": "string", "description": "DD.MM.YYYY"},
+                    "max_delay_days": {"type": "integer"},
+                    "max_delay_status": {"type": "string", "description": "Bucket e.g. '31-90 dni'"},
+                    "arrears_amount": {"type": "number", "description": "Max historical arrears amount"},
+                    "description": {"type": "string", "nullable": True}
+                },
+                 "required": ["bank", "max_delay_days"]
             }
         },
-        "required": ["personal_data", "score", "active_liabilities", "closed_liabilities"]
-    }
+        "statistical_liabilities": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                 "properties": {
+                    "bank": {"type": "string"},
+                    "type": {"type": "string"},
+                     "closing_date": {"type": "string"},
+                    "max_delay_days": {"type": "integer"},
+                    "max_delay_status": {"type": "string"}
+                }
+            }
+        }
+    },
+    "required": ["personal_data", "score", "active_liabilities", "closed_liabilities"]
+}
 
-    # System Prompt with specific fallback instructions
-    system_prompt = """You are a specialized Credit Analyst AI.
+# System Prompt with specific fallback instructions
+SYSTEM_PROMPT = """You are a specialized Credit Analyst AI.
 Your task is to extract financial liability data from the provided BIK Report.
 Output valid JSON matching the schema.
 
@@ -130,80 +127,276 @@ CRITICAL: You must scan the ENTIRE document from start to finish. Do not stop af
 - **Amounts**: Return strings or numbers.
 """
 
-    try:
-        response = client.chat.completions.create(
-            model=model_name,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Analyze this BIK Report:\n\n{full_text}"}
-            ],
-            response_format={"type": "json_object"},
-            temperature=0  # Deterministic
-        )
-        
-        raw_json = response.choices[0].message.content
-        # Debug Log
-        with open("server_debug.log", "a") as f:
-            f.write(f"RAW LLM JSON: {raw_json}\n")
-        
-        parsed_data = json.loads(raw_json)
-        
-        # --- NORMALIZATION STRATEGIES ---
-        # 1. Flatten 'liabilities' wrapper if present
-        if "liabilities" in parsed_data:
-            liabs = parsed_data.pop("liabilities")
-            if isinstance(liabs, dict):
-                for key in ["active_liabilities", "closed_liabilities", "statistical_liabilities"]:
-                   if key in liabs: parsed_data[key] = liabs[key]
-        
-        # 2. Extract Score to Root
-        if "personal_data" in parsed_data:
-            pd = parsed_data["personal_data"]
-            if "score" in pd and "score" not in parsed_data:
-                parsed_data["score"] = pd.pop("score")
-            # 3. Map Date -> report_date
-            if "date" in pd:
-                pd["report_date"] = pd.pop("date")
-                
-        # 4. Ensure Keys Exist
-        for k in ["active_liabilities", "closed_liabilities", "statistical_liabilities"]:
-            if k not in parsed_data: parsed_data[k] = []
-
-        # Helper to clean numbers
-        def to_float(val):
-            if isinstance(val, (int, float)): return float(val)
-            if isinstance(val, str):
-                clean = val.replace("PLN", "").replace(" ", "").replace(",", ".").strip()
-                try: 
-                    return float(clean)
-                except: 
-                    return 0.0
-            return 0.0
-
-        # Post-Processing / Normalization
-        for l in parsed_data.get("active_liabilities", []):
-            if "delays" not in l: l["delays"] = [l.get("max_delay_status", "")]
-            # Enforce Numbers
-            l["installment"] = to_float(l.get("installment"))
-            l["amount_left"] = to_float(l.get("amount_left"))
-            l["limit"] = to_float(l.get("limit"))
-
-        for l in parsed_data.get("closed_liabilities", []):
-            if "delays" not in l: l["delays"] = [f"{l.get('max_delay_days', 0)} dni"]
-            l["arrears_amount"] = to_float(l.get("arrears_amount"))
+
+# Section mode: one small prompt per report part
+SECTION_PROMPT_INTRO = """You are a specialized Credit Analyst AI.
+You receive ONE part of a BIK Report. Extract data from this part only and output valid JSON.
+- **Bank Name**: Look for "SANTANDER", "ALIOR", "MBANK".
+- **Status**: If history "0 0 0", status "OK".
+- **Amounts**: Return strings or numbers.
+
+"""
+
+SECTION_PROMPTS = {
+    "header": SECTION_PROMPT_INTRO + """This is the report header. Output:
+{"personal_data": {"name": ..., "pesel": ..., "birth_date": "YYYY-MM-DD", "report_date": "YYYY-MM-DD"}, "score": ..., "inquiries_12m": ...}
+- **Name**: "Wnioskodawca" (e.g. Paweł Heuser). **PESEL**: 11 digits.
+- **Score**: "Ocena punktowa" (e.g. 52/100). Extract ONLY the number.
+- **inquiries_12m**: count of credit inquiries in the last 12 months.
+""",
+    "active": SECTION_PROMPT_INTRO + """This is "Zobowiązania finansowe w trakcie spłaty". Output:
+{"active_liabilities": [{"bank", "type", "installment", "amount_left", "limit", "max_delay_status", "closing_date", "description"}]}
+- `installment` is "Rata". `max_delay_status` e.g. '0-30 dni', 'OK', 'WINDYKACJA'.
+""",
+    "closed": SECTION_PROMPT_INTRO + """This is "Zobowiązania finansowe zamknięte". Output:
+{"closed_liabilities": [{"bank", "type", "closing_date" (DD.MM.YYYY), "max_delay_days", "max_delay_status", "arrears_amount", "description"}]}
+- `arrears_amount` is the max historical arrears amount.
+""",
+    "statistical": SECTION_PROMPT_INTRO + """This is "Zobowiązania przetwarzane w celach statystycznych". Output:
+{"statistical_liabilities": [{"bank", "type", "closing_date", "max_delay_days", "max_delay_status"}]}
+- Extract ALL items.
+""",
+}
+
+
+def normalize_report_text(full_text):
+    """
+    Canonical report text: NFC, runs of whitespace collapsed, blank lines dropped.
+    Request text is hashed in this form for the response cache, so extraction
+    noise (spacing, page breaks) doesn't cause cache misses; section mode also
+    sends it. Full mode sends the report as extracted.
+    """
+    text = unicodedata.normalize("NFC", full_text)
+    lines = (" ".join(line.split()) for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def split_report_sections(text):
+    """
+    {"header", "active", "closed", "statistical"} -> text, split with the native
+    parser's tokenizer (the detailed inquiries list at the end is dropped).
+    The header is the first HEADER_LINES lines like in the native parser - the
+    inquiries count can sit below the first section header.
+    Parts without any lines are left out.
+    """
+    lines = text.split("\n")
+    parts = {"header": lines[:HEADER_LINES], "active": [], "closed": [], "statistical": []}
+    for token in tokenize_report(lines):
+        if token.section:
+            parts[token.section].append(token.line)
+    return {part: "\n".join(lines) for part, lines in parts.items() if lines}
+
+
+def _cache_digest(model_name, system_prompt, user_content):
+    return hashlib.sha256(f"{model_name}\n{system_prompt}\n{normalize_report_text(user_content)}".encode("utf-8")).hexdigest()
+
+
+def _cached_response(cache, digest):
+    if not cache:
+        return None
+    cached = cache.get(LLM_CACHE_NAMESPACE, digest, PROMPT_VERSION)
+    LLM_CACHE.inc(result="miss" if cached is None else "hit")
+    return cached
+
+
+def _parse_response(raw_json, cache, digest, capture=None):
+    # Debug Log (the caller's hook, e.g. a sampled services.debug_capture write)
+    if capture:
+        capture("llm_response.json", raw_json)
+
+    parsed_data = json.loads(raw_json)
+    if cache:
+        cache.set(LLM_CACHE_NAMESPACE, digest, PROMPT_VERSION, parsed_data)
+    return parsed_data
+
+
+def _complete(model_name, system_prompt, user_content, cache=None, capture=None):
+    """
+    One completion returning the parsed JSON object.
+    Cached by hash of model name + prompt + normalized request text (PROMPT_VERSION
+    as the cache version), errors are never cached.
+    """
+    digest = _cache_digest(model_name, system_prompt, user_content)
+    parsed_data = _cached_response(cache, digest)
+    if parsed_data is None:
+        parsed_data = _parse_response(chat_json(system_prompt, user_content, model_name), cache, digest, capture)
+    return parsed_data
+
+
+async def _complete_async(model_name, system_prompt, user_content, cache=None, capture=None):
+    digest = _cache_digest(model_name, system_prompt, user_content)
+    parsed_data = _cached_response(cache, digest)
+    if parsed_data is None:
+        raw_json = await chat_json_async(system_prompt, user_content, model_name)
+        parsed_data = _parse_response(raw_json, cache, digest, capture)
+    return parsed_data
+
+
+def _flatten_liabilities(parsed_data):
+    # Flatten 'liabilities' wrapper if present
+    if "liabilities" in parsed_data:
+        liabs = parsed_data.pop("liabilities")
+        if isinstance(liabs, dict):
+            for key in ["active_liabilities", "closed_liabilities", "statistical_liabilities"]:
+               if key in liabs: parsed_data[key] = liabs[key]
+    return parsed_data
+
+
+def _llm_requests(full_text, mode):
+    """
+    [(part, system_prompt, user_content)]: the whole report as extracted, or
+    one request per part of the normalized text in section mode.
+    """
+    if mode == "sections":
+        parts = split_report_sections(normalize_report_text(full_text))
+        if len(parts) > 1:
+            return [(part, SECTION_PROMPTS[part], f"Analyze this part of a BIK Report:\n\n{part_text}")
+                    for part, part_text in parts.items()]
+    return [("report", SYSTEM_PROMPT, f"Analyze this BIK Report:\n\n{full_text}")]
+
+
+def _merge(responses):
+    """{part: parsed response} -> one dict in the full-report shape."""
+    if "report" in responses:
+        return _flatten_liabilities(responses["report"])
+    merged = {}
+    header = _flatten_liabilities(dict(responses.get("header", {})))
+    merged.update({k: v for k, v in header.items() if not k.endswith("_liabilities")})
+    for part in ["active", "closed", "statistical"]:
+        key = f"{part}_liabilities"
+        merged[key] = _flatten_liabilities(dict(responses.get(part, {}))).get(key, [])
+    return merged
+
+
+def _normalize(parsed_data):
+    """Maps the model output onto the frontend schema (numbers, delays, score)."""
+    # --- NORMALIZATION STRATEGIES ---
+    # 1. 'liabilities' wrapper: flattened per response by _flatten_liabilities
+    
+    # 2. Extract Score to Root
+    if "personal_data" in parsed_data:
+        pd = parsed_data["personal_data"]
+        if "score" in pd and "score" not in parsed_data:
+            parsed_data["score"] = pd.pop("score")
+        # 3. Map Date -> report_date
+        if "date" in pd:
+            pd["report_date"] = pd.pop("date")
             
-        # Clean Score
-        if "score" in parsed_data:
-             val = parsed_data["score"]
-             if isinstance(val, str):
-                 # "52 / 100" -> 52
-                 import re
-                 m = re.search(r"(\d+)", val)
-                 if m: parsed_data["score"] = int(m.group(1))
-
-        parsed_data["alerts"] = [] 
+    # 4. Ensure Keys Exist
+    for k in ["active_liabilities", "closed_liabilities", "statistical_liabilities"]:
+        if k not in parsed_data: parsed_data[k] = []
+
+    # Helper to clean numbers
+    def to_float(val):
+        if isinstance(val, (int, float)): return float(val)
+        if isinstance(val, str):
+            clean = val.replace("PLN", "").replace(" ", "").replace(",", ".").strip()
+            try: 
+                return float(clean)
+            except: 
+                return 0.0
+        return 0.0
+
+    # Post-Processing / Normalization
+    for l in parsed_data.get("active_liabilities", []):
+        if "delays" not in l: l["delays"] = [l.get("max_delay_status", "")]
+        # Enforce Numbers
+        l["installment"] = to_float(l.get("installment"))
+        l["amount_left"] = to_float(l.get("amount_left"))
+        l["limit"] = to_float(l.get("limit"))
+
+    for l in parsed_data.get("closed_liabilities", []):
+        if "delays" not in l: l["delays"] = [f"{l.get('max_delay_days', 0)} dni"]
+        l["arrears_amount"] = to_float(l.get("arrears_amount"))
+
+    # Section prompts don't ask for the summary table - total the active liabilities instead
+    if "summary" not in parsed_data:
+        parsed_data["summary"] = {
+            "total_installment": sum(l["installment"] for l in parsed_data["active_liabilities"]),
+            "total_limits": sum(l["limit"] for l in parsed_data["active_liabilities"]),
+            "mortgage_installment": 0.0
+        }
         
-        return parsed_data
+    # Clean Score
+    if "score" in parsed_data:
+         val = parsed_data["score"]
+         if isinstance(val, str):
+             # "52 / 100" -> 52
+             import re
+             m = re.search(r"(\d+)", val)
+             if m: parsed_data["score"] = int(m.group(1))
+
+    # Same schema as the native/regex parsers; keys the model invents are dropped
+    report = Report(
+        personal_data=PersonalData.from_dict(parsed_data.get("personal_data") or {}),
+        score=parsed_data.get("score"),
+        inquiries_12m=parsed_data.get("inquiries_12m") or 0,
+        summary=Summary.from_dict(parsed_data["summary"]),
+        active_liabilities=[Liability.from_dict(l) for l in parsed_data["active_liabilities"]],
+        closed_liabilities=[Liability.from_dict(l) for l in parsed_data["closed_liabilities"]],
+        statistical_liabilities=[Liability.from_dict(l) for l in parsed_data["statistical_liabilities"]],
+        parser_type="LLM"
+    )
+    return report.to_dict()
+
+
+def _config_error(mode):
+    if not os.getenv("OPENAI_API_KEY"):
+        return {"error": "Missing OPENAI_API_KEY in .env file", "status": "error"}
+    if mode not in LLM_MODES:
+        return {"error": f"Unknown LLM_BIK_MODE: {mode} (available: {', '.join(LLM_MODES)})", "status": "error"}
+    return None
+
+
+def parse_bik_with_llm(full_text, cache=None, mode=None, capture=None):
+    """
+    Parses BIK report text using OpenAI/LLM API.
+    Returns a structured dictionary compatible with the frontend.
+    cache: ParseCache for LLM responses (None = no caching).
+    mode: "full" or "sections" (None = LLM_BIK_MODE env var, default "full").
+    capture: called as capture(name, content) with every raw LLM response
+    (None = not kept), e.g. services.debug_capture's DebugCapture.hook(capture_id).
+    """
+    mode = mode or os.getenv("LLM_BIK_MODE", "full")
+    error = _config_error(mode)
+    if error:
+        return error
+    model_name = os.getenv("OPENAI_MODEL_NAME", "gpt-4o")
+    requests = _llm_requests(full_text, mode)
+
+    try:
+        if len(requests) == 1:
+            part, system_prompt, user_content = requests[0]
+            responses = {part: _complete(model_name, system_prompt, user_content, cache, capture)}
+        else:
+            # Section requests run concurrently on the shared client's connection pool
+            with ThreadPoolExecutor(max_workers=len(requests)) as pool:
+                futures = {part: pool.submit(_complete, model_name, system_prompt, user_content, cache, capture)
+                           for part, system_prompt, user_content in requests}
+                responses = {part: future.result() for part, future in futures.items()}
+        return _normalize(_merge(responses))
+
+    except Exception as e:
+        return {"error": f"LLM Parsing Failed: {str(e)}", "status": "error"}
+
+
+async def parse_bik_with_llm_async(full_text, cache=None, mode=None, capture=None):
+    """
+    Async parse_bik_with_llm for job/worker event loops: requests run on the
+    loop (at most LLM_MAX_CONCURRENCY in flight) instead of blocking threads.
+    """
+    mode = mode or os.getenv("LLM_BIK_MODE", "full")
+    error = _config_error(mode)
+    if error:
+        return error
+    model_name = os.getenv("OPENAI_MODEL_NAME", "gpt-4o")
+    requests = _llm_requests(full_text, mode)
+
+    try:
+        results = await asyncio.gather(*(_complete_async(model_name, system_prompt, user_content, cache, capture)
+                                         for _, system_prompt, user_content in requests))
+        responses = dict(zip((part for part, _, _ in requests), results))
+        return _normalize(_merge(responses))
 
     except Exception as e:
         return {"error": f"LLM Parsing Failed: {str(e)}", "status": "error"}
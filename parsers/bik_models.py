@@ -0,0 +1,148 @@
+"""
+BIK report model shared by the native, regex and LLM parsers.
+
+Parsers fill these slotted objects and return report.to_dict(), so every
+parser produces the same keys (missing values are None/0/empty, not absent)
+and callers never need defensive .get(). The dict is what gets cached,
+sent back from the parse pool and served as JSON.
+"""
+
+import json
+from dataclasses import dataclass, field
+
+
+@dataclass(slots=True)
+class PersonalData:
+    name: str = None
+    pesel: str = None
+    birth_date: str = None
+    report_date: str = None
+    is_stale: bool = False
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "pesel": self.pesel,
+            "birth_date": self.birth_date,
+            "report_date": self.report_date,
+            "is_stale": self.is_stale
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{key: data[key] for key in cls.__slots__ if key in data})
+
+
+@dataclass(slots=True)
+class Summary:
+    total_installment: float = 0
+    total_limits: float = 0
+    mortgage_installment: float = 0
+
+    def to_dict(self):
+        return {
+            "total_installment": self.total_installment,
+            "total_limits": self.total_limits,
+            "mortgage_installment": self.mortgage_installment
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{key: data[key] for key in cls.__slots__ if key in data})
+
+
+@dataclass(slots=True)
+class Liability:
+    bank: str = ""
+    type: str = ""
+    installment: float = 0
+    amount_left: float = 0
+    limit: float = 0
+    original_amount: float = 0
+    is_limit_based: bool = False
+    closing_date: str = None
+    arrears_amount: float = 0
+    max_delay_days: int = 0
+    max_delay_status: str = None
+    delays: list = field(default_factory=list)  # e.g. ["OK"], ["45 dni"], ["WINDYKACJA"]
+    description: str = ""
+    is_pozabankowe: bool = False
+
+    def to_dict(self):
+        return {
+            "bank": self.bank,
+            "type": self.type,
+            "installment": self.installment,
+            "amount_left": self.amount_left,
+            "limit": self.limit,
+            "original_amount": self.original_amount,
+            "is_limit_based": self.is_limit_based,
+            "closing_date": self.closing_date,
+            "arrears_amount": self.arrears_amount,
+            "max_delay_days": self.max_delay_days,
+            "max_delay_status": self.max_delay_status,
+            "delays": list(self.delays),
+            "description": self.description,
+            "is_pozabankowe": self.is_pozabankowe
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Known keys of a liability dict (e.g. LLM output); anything else is dropped."""
+        return cls(**{key: data[key] for key in cls.__slots__ if key in data})
+
+
+# Alert.level -> the severity name the native parser used to send
+SEVERITY = {"red": "ERROR", "yellow": "WARNING", "info": "INFO"}
+
+
+@dataclass(slots=True)
+class Alert:
+    level: str  # "red", "yellow" or "info"
+    msg: str
+    type: str = None  # machine-readable code, e.g. "POZABANKOWE_ACTIVE"
+    bank: str = None
+
+    def to_dict(self):
+        # severity/message repeat level/msg: clients written against either
+        # the regex or the native parser's alerts keep working
+        return {
+            "level": self.level,
+            "msg": self.msg,
+            "type": self.type,
+            "bank": self.bank,
+            "severity": SEVERITY.get(self.level, "INFO"),
+            "message": self.msg
+        }
+
+
+@dataclass(slots=True)
+class Report:
+    personal_data: PersonalData = field(default_factory=PersonalData)
+    score: int = None
+    inquiries_12m: int = 0
+    summary: Summary = field(default_factory=Summary)
+    active_liabilities: list = field(default_factory=list)
+    closed_liabilities: list = field(default_factory=list)
+    statistical_liabilities: list = field(default_factory=list)
+    alerts: list = field(default_factory=list)
+    parser_type: str = None
+
+    def alert(self, level, msg, type=None, bank=None):
+        self.alerts.append(Alert(level, msg, type, bank))
+
+    def to_dict(self):
+        return {
+            "personal_data": self.personal_data.to_dict(),
+            "score": self.score,
+            "inquiries_12m": self.inquiries_12m,
+            "summary": self.summary.to_dict(),
+            "active_liabilities": [item.to_dict() for item in self.active_liabilities],
+            "closed_liabilities": [item.to_dict() for item in self.closed_liabilities],
+            "statistical_liabilities": [item.to_dict() for item in self.statistical_liabilities],
+            "alerts": [item.to_dict() for item in self.alerts],
+            "parser_type": self.parser_type
+        }
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), ensure_ascii=False)
@@ -4,69 +4,186 @@ Deterministic, fast, and free.
 """
 
 import re
+from bisect import bisect_left, bisect_right
 from datetime import datetime
+from collections import namedtuple
+from itertools import chain, islice
 
+from metrics import StageClock
+from parsers.bik_models import Liability, Report
+from parsers.lenders import (
+    POZABANKOWE_LENDERS, ACTIVE_SECTION_SET, CLOSED_SECTION_LENDERS,
+    find_lenders, first_lender, is_pozabankowe
+)
 
-# Non-bank lenders (pozabankowe) - these are red flags for traditional banks
-POZABANKOWE_COMPANIES = [
-    "ALLEGRO PAY", "TWISTO", "VIVUS", "PROVIDENT", "WONGA", "LENDON",
-    "NETCREDIT", "SZYBKA GOTÓWKA", "INCREDIT", "AASA", "HAPIPOŻYCZKI",
-    "FILARUM", "WANDOO", "KUKI", "SOLVEN", "POŻYCZKA PLUS", "EXTRA PORTFEL",
-    "KREDITO24", "FERRATUM", "EKSPRES KASA", "SMART POŻYCZKA", "POZYCZKOMAT",
-    "TAKTO FINANSE", "CREDIT-AGRICOLE", "OPTIMA", "BOCIAN", "EVEREST",
-    "PROFI CREDIT", "DELTA", "MONEY GRATIS", "RAPIDA", "MILOAN"
+
+# Bump when extraction logic changes - invalidates cached results
+PARSER_VERSION = "3"
+
+
+# Lender names live in parsers/lenders.py (one compiled matcher for all sections)
+POZABANKOWE_COMPANIES = POZABANKOWE_LENDERS
+
+
+# Header phase only looks at the first lines of the report
+HEADER_LINES = 100
+
+# Detailed inquiries list - comes after every liability section, nothing past it is needed
+STOP_MARKER = "Zapytania kredytowe w BIK"
+
+
+# === Line tokenizer ===
+# Every report line is classified once; the section parsers consume the tokens.
+SECTION_HEADER = "section_header"  # value: "active" / "closed" / "statistical"
+CREDIT_TYPE = "credit_type"        # active summary table, value: normalized credit type
+SUMMARY_ROW = "summary_row"        # active summary table line with a date, value: the date match
+BANK_LINE = "bank_line"            # active summary table line naming a known lender (no date)
+SUMMARY_END = "summary_end"        # "Łącznie" / start of the detailed part of the active section
+HISTORY_ROW = "history_row"        # line starting with a date outside the summary table
+OTHER = "other"
+
+Token = namedtuple("Token", "kind index line clean section value")
+
+# All three headers contain this word - the full patterns only run on such lines
+SECTION_CANDIDATE = re.compile(r'Zobowiązania', re.IGNORECASE)
+
+# Checked in this order - the first matching pattern names the section
+SECTION_MARKERS = [
+    ("statistical", re.compile(r'Zobowiązania.*przetwarzane w celach statystycznych', re.IGNORECASE)),
+    ("closed", re.compile(r'Zobowiązania finansowe.*zamknięte', re.IGNORECASE)),
+    ("active", re.compile(r'Zobowiązania finansowe.*w trakcie spłaty', re.IGNORECASE)),
 ]
 
+DATE_PATTERN = re.compile(r'\d{2}\.\d{2}\.\d{4}')
+
+# Credit types that use LIMIT instead of Amount Left
+LIMIT_BASED_TYPES = ["kredyt odnawialny", "karta kredytowa", "debet", "limit"]
+
+
+def _section_header(line):
+    if not SECTION_CANDIDATE.search(line):
+        return None
+    for section, pattern in SECTION_MARKERS:
+        if pattern.search(line):
+            return section
+    return None
+
+
+def _credit_type(line_clean):
+    lower = line_clean.lower()
+    if "kredyt odnawialny" in lower:
+        return "Kredyt odnawialny"
+    if "karta kredytowa" in lower:
+        return "Karta kredytowa"
+    if "kredyt gotówkowy" in lower or "pożyczka" in lower:
+        return "Kredyt gotówkowy"
+    if "kredyt mieszkaniowy" in lower or "hipot" in lower:
+        return "Kredyt hipoteczny"
+    return None
+
+
+def tokenize_report(lines):
+    """
+    Single pass over report lines, stops at STOP_MARKER.
+    Yields a Token per line; `section` is the section the line belongs to (None before the first header).
+    Active summary lines get the fine-grained kinds, the rest are HISTORY_ROW or OTHER.
+    """
+    section = None
+    in_summary = True  # active summary table runs until the first "Łącznie" across all active parts
+    for i, line in enumerate(lines):
+        clean = line.strip()
+        if clean == STOP_MARKER:
+            return
+        header = _section_header(line)
+        if header:
+            section = header
+            yield Token(SECTION_HEADER, i, line, clean, header, header)
+            continue
+
+        if section == "active" and in_summary:
+            if clean.startswith("Łącznie") or "Informacje szczegółowe" in line or "Historia spłaty" in line:
+                in_summary = False
+                yield Token(SUMMARY_END, i, line, clean, section, None)
+                continue
+            if not clean:
+                yield Token(OTHER, i, line, clean, section, None)
+                continue
+            credit_type = _credit_type(clean)
+            if credit_type:
+                yield Token(CREDIT_TYPE, i, line, clean, section, credit_type)
+                continue
+            date_match = DATE_PATTERN.search(clean)
+            if date_match:
+                yield Token(SUMMARY_ROW, i, line, clean, section, date_match)
+            elif _mentions_active_lender(clean):
+                yield Token(BANK_LINE, i, line, clean, section, None)
+            else:
+                yield Token(OTHER, i, line, clean, section, None)
+            continue
+
+        if clean[:1].isdigit() and DATE_PATTERN.match(clean):
+            yield Token(HISTORY_ROW, i, line, clean, section, None)
+        else:
+            yield Token(OTHER, i, line, clean, section, None)
+
 
 def parse_bik_native(full_text):
     """
     Parse BIK report text using pattern matching and section detection.
     Returns a structured dictionary compatible with the frontend.
     """
-    lines = full_text.split('\n')
-    
-    result = {
-        "personal_data": {
-            "name": None,
-            "pesel": None,
-            "birth_date": None,
-            "report_date": None,
-            "is_stale": False
-        },
-        "score": None,
-        "inquiries_12m": 0,
-        "summary": {
-            "total_installment": 0,
-            "total_limits": 0,
-            "mortgage_installment": 0
-        },
-        "active_liabilities": [],
-        "closed_liabilities": [],
-        "statistical_liabilities": [],
-        "alerts": [],
-        "parser_type": "NATIVE"
-    }
+    return parse_bik_native_lines(full_text.split('\n'))
+
+
+def parse_bik_native_pages(pages, active_table=None):
+    """
+    Streaming variant of parse_bik_native.
+    pages: iterable of page texts, consumed lazily. Once the liability
+    sections are complete the remaining pages are never pulled (so never extracted).
+    active_table: parsers.bik_layout.ActiveTableReader fed by the same extraction.
+    """
+    return parse_bik_native_lines(_iter_page_lines(pages), active_table)
+
+
+def _iter_page_lines(pages):
+    # Same lines as joining every page with a trailing "\n" and splitting
+    for page_text in pages:
+        yield from page_text.split('\n')
+    yield ""
+
+
+def parse_bik_native_lines(lines, active_table=None):
+    """
+    Core parser over an iterable of report lines (a list or a lazy stream).
+    active_table: reader of the active summary table layout (see
+    parsers.bik_layout); its rows replace the text path when it found the table.
+    """
+    clock = StageClock("bik_native")
+    lines = iter(lines)
+    header_lines = list(islice(lines, HEADER_LINES))
+    
+    result = Report(parser_type="NATIVE")
     
     # === PHASE 1: Header Extraction (First 50 lines) ===
-    header_text = '\n'.join(lines[:50])
+    header_text = '\n'.join(header_lines[:50])
     
     # Date: DD.MM.YYYY format at the start
     date_match = re.search(r'^(\d{2}\.\d{2}\.\d{4})', header_text)
     if date_match:
         try:
             dt = datetime.strptime(date_match.group(1), "%d.%m.%Y")
-            result["personal_data"]["report_date"] = dt.strftime("%Y-%m-%d")
+            result.personal_data.report_date = dt.strftime("%Y-%m-%d")
         except:
             pass
     
     # PESEL: 11 digits
     pesel_match = re.search(r'PESEL[:\s]*(\d{11})', header_text)
     if pesel_match:
-        result["personal_data"]["pesel"] = pesel_match.group(1)
+        result.personal_data.pesel = pesel_match.group(1)
     
     # Name: Line after date, before PESEL (usually line 3)
     # Handle both "Paweł Heuser" and "SZYMON MACKIEWICZ" formats
-    for i, line in enumerate(lines[:10]):
+    for i, line in enumerate(header_lines[:10]):
         line_clean = line.strip()
         # Skip if line has PESEL or other keywords
         if 'PESEL' in line_clean or 'Wskaźnik' in line_clean or ':' in line_clean:
@@ -75,171 +192,122 @@ def parse_bik_native(full_text):
         if re.match(r'^[A-ZĄĆĘŁŃÓŚŹŻ][A-ZĄĆĘŁŃÓŚŹŻa-ząćęłńóśźż]+(?:\s+[A-ZĄĆĘŁŃÓŚŹŻ][A-ZĄĆĘŁŃÓŚŹŻa-ząćęłńóśźż]+)+$', line_clean):
             # Skip if it's a date line
             if not re.search(r'\d{2}\.\d{2}\.\d{4}', line_clean):
-                result["personal_data"]["name"] = line_clean.title()  # Normalize to Title Case
+                result.personal_data.name = line_clean.title()  # Normalize to Title Case
                 break
     
     # Score: "52/ 100" or "52 / 100" pattern
     score_match = re.search(r'(\d{1,3})\s*/\s*100', header_text)
     if score_match:
-        result["score"] = int(score_match.group(1))
+        result.score = int(score_match.group(1))
     
     # Inquiries: Line with pattern "14 19 0 12" (4 numbers) near "Zapytania"
     # Search in first 100 lines (may be after summary table)
-    extended_text = '\n'.join(lines[:100])
+    extended_text = '\n'.join(header_lines)
     inquiries_match = re.search(r'^(\d+)\s+(\d+)\s+(\d+)\s+(\d+)\s*$', extended_text, re.MULTILINE)
     if inquiries_match:
-        result["inquiries_12m"] = int(inquiries_match.group(1))
+        result.inquiries_12m = int(inquiries_match.group(1))
+    clock.lap("header")
     
-    # === PHASE 2: Section Detection ===
-    section_markers = {
-        "active": r'Zobowiązania finansowe.*w trakcie spłaty',
-        "closed": r'Zobowiązania finansowe.*zamknięte',
-        "statistical": r'Zobowiązania.*przetwarzane w celach statystycznych'
-    }
+    # === PHASE 2: Section Detection (one tokenizer pass) ===
+    # Active summary parsing works on tokens; closed/statistical parsing only needs the text
+    active_tokens = []
+    section_lines = {"closed": [], "statistical": []}
     
-    current_section = None
-    section_lines = {"active": [], "closed": [], "statistical": []}
-    
-    for i, line in enumerate(lines):
-        # Check for section headers
-        if re.search(section_markers["statistical"], line, re.IGNORECASE):
-            current_section = "statistical"
-        elif re.search(section_markers["closed"], line, re.IGNORECASE):
-            current_section = "closed"
-        elif re.search(section_markers["active"], line, re.IGNORECASE):
-            current_section = "active"
-        elif current_section:
-            section_lines[current_section].append((i, line))
+    for token in tokenize_report(chain(header_lines, lines)):
+        if token.kind == SECTION_HEADER or token.section is None:
+            continue
+        if token.section == "active":
+            active_tokens.append(token)
+        else:
+            section_lines[token.section].append(token.line)
+    clock.lap("sections")
     
     # === PHASE 3: Parse Active Liabilities ===
-    result["active_liabilities"] = parse_active_section(section_lines["active"], lines)
+    # Rows read from the table layout when the extraction provided one, else from the text
+    layout_rows = active_table.liabilities() if active_table is not None else None
+    result.active_liabilities = layout_rows or parse_active_section(active_tokens)
+    clock.lap("active")
     
     # === PHASE 4: Parse Closed Liabilities ===
-    result["closed_liabilities"] = parse_closed_section(section_lines["closed"], lines)
+    result.closed_liabilities = parse_closed_section('\n'.join(section_lines["closed"]))
+    clock.lap("closed")
     
     # === PHASE 5: Parse Statistical Liabilities ===
-    result["statistical_liabilities"] = parse_statistical_section(section_lines["statistical"], lines)
+    result.statistical_liabilities = parse_statistical_section('\n'.join(section_lines["statistical"]))
+    clock.lap("statistical")
     
     # === PHASE 6: Calculate Summary ===
-    for liability in result["active_liabilities"]:
-        result["summary"]["total_installment"] += liability.get("installment", 0)
-        result["summary"]["total_limits"] += liability.get("limit", 0)
+    for liability in result.active_liabilities:
+        result.summary.total_installment += liability.installment
+        result.summary.total_limits += liability.limit
     
     # === PHASE 7: Detect Pozabankowe (Non-Bank Lenders) ===
     # These are red flags for traditional banks
-    for liability in result["active_liabilities"]:
-        bank = liability.get("bank", "").upper()
-        for company in POZABANKOWE_COMPANIES:
-            if company.upper() in bank:
-                liability["is_pozabankowe"] = True
-                result["alerts"].append({
-                    "type": "POZABANKOWE_ACTIVE",
-                    "severity": "WARNING",
-                    "message": f"Aktywna pożyczka pozabankowa: {liability.get('bank')}",
-                    "bank": liability.get("bank")
-                })
-                break
-    
-    for liability in result["closed_liabilities"]:
-        bank = liability.get("bank", "").upper()
-        for company in POZABANKOWE_COMPANIES:
-            if company.upper() in bank:
-                liability["is_pozabankowe"] = True
-                result["alerts"].append({
-                    "type": "POZABANKOWE_CLOSED",
-                    "severity": "INFO",
-                    "message": f"Zamknięta pożyczka pozabankowa: {liability.get('bank')}",
-                    "bank": liability.get("bank")
-                })
-                break
-    
-    return result
+    for liability in result.active_liabilities:
+        if is_pozabankowe(liability.bank):
+            liability.is_pozabankowe = True
+            result.alert("yellow", f"Aktywna pożyczka pozabankowa: {liability.bank}", "POZABANKOWE_ACTIVE", liability.bank)
+    
+    for liability in result.closed_liabilities:
+        if is_pozabankowe(liability.bank):
+            liability.is_pozabankowe = True
+            result.alert("info", f"Zamknięta pożyczka pozabankowa: {liability.bank}", "POZABANKOWE_CLOSED", liability.bank)
+    clock.lap("summary")
+    
+    return result.to_dict()
 
 
-def parse_active_section(section_lines, all_lines):
+def parse_active_section(tokens):
     """Parse active liabilities from summary table only (not history)."""
     liabilities = []
     
-    # Known bank/lender names (including pozabankowe)
-    bank_names = ["SANTANDER CONSUMER BANK", "MBANK WYDZIAŁ BANKOWOŚCI", "ALIOR BANK", 
-                  "CREDIT AGRICOLE", "ING BANK ŚLĄSKI", "ING BANK",
-                  "SANTANDER", "MBANK", "PKO BP", "PKO", "ING", "BNP", "CITI", "GETIN", 
-                  "MILLENNIUM", "NEST BANK", "SKOK", "BANK MILLENNIUM", "ELEKTRONICZNEJ",
-                  # Pozabankowe
-                  "ALLEGRO PAY", "TWISTO", "VIVUS", "PROVIDENT", "WONGA", "LENDON",
-                  "NETCREDIT", "INCREDIT", "AASA", "FILARUM", "WANDOO", "KUKI",
-                  "PROFI CREDIT", "FERRATUM", "SP. Z O.O."]
-    
-    # Credit types that use LIMIT instead of Amount Left
-    limit_based_types = ["kredyt odnawialny", "karta kredytowa", "debet", "limit"]
-    
-    # Find where summary table ends (at "Łącznie" line)
-    summary_end_idx = len(section_lines)
-    for idx, (line_num, line) in enumerate(section_lines):
-        if line.strip().startswith("Łącznie"):
-            summary_end_idx = idx
-            break
-        # Also stop if we hit detailed section
-        if "Informacje szczegółowe" in line or "Historia spłaty" in line:
-            summary_end_idx = idx
+    # Only process summary table tokens (the tokenizer marks where it ends at "Łącznie")
+    summary_tokens = []
+    for token in tokens:
+        if token.kind == SUMMARY_END:
             break
-    
-    # Only process summary table lines
-    summary_lines = section_lines[:summary_end_idx]
-    lines_list = [(i, line) for i, line in summary_lines]
+        summary_tokens.append(token)
     
     # Track current credit type
     current_type = "Kredyt"
     pending_bank = None  # Bank name waiting to be matched with amounts
     
-    for idx, (line_num, line) in enumerate(lines_list):
-        line_clean = line.strip()
-        
-        # Skip empty lines
-        if not line_clean:
-            continue
+    for idx, token in enumerate(summary_tokens):
+        line_clean = token.clean
         
         # Detect credit type
-        if "kredyt odnawialny" in line_clean.lower():
-            current_type = "Kredyt odnawialny"
+        if token.kind == CREDIT_TYPE:
+            current_type = token.value
             continue
-        elif "karta kredytowa" in line_clean.lower():
-            current_type = "Karta kredytowa"
-            continue
-        elif "kredyt gotówkowy" in line_clean.lower() or "pożyczka" in line_clean.lower():
-            current_type = "Kredyt gotówkowy"
+        
+        # Check if this line is just a bank name (for next iteration)
+        if token.kind == BANK_LINE:
+            pending_bank = line_clean
             continue
-        elif "kredyt mieszkaniowy" in line_clean.lower() or "hipot" in line_clean.lower():
-            current_type = "Kredyt hipoteczny"
+        
+        if token.kind != SUMMARY_ROW:
             continue
         
         # Extract amounts properly - look for patterns like "167.837 PLN" or "0" or "1.054 PLN"
-        # First, remove the date from the line to avoid confusion
-        date_match = re.search(r'\d{2}\.\d{2}\.\d{4}', line_clean)
-        has_date = bool(date_match)
+        # Get text after the date (where amounts should be)
+        date_match = token.value
+        after_date = line_clean[date_match.end():].strip()
         
-        if has_date:
-            # Get text after the date (where amounts should be)
-            after_date = line_clean[date_match.end():].strip()
-            
-            # Look for PLN amounts in after_date section
-            # Pattern: number followed by PLN, or standalone number followed by space/ND
-            amounts = []
-            
-            # Find all explicitly marked PLN amounts
-            pln_amounts = re.findall(r'([\d.,]+)\s*PLN', after_date)
-            amounts.extend(pln_amounts)
-            
-            # Also find standalone "0" which often means 0 PLN
-            # But only if followed by space or ND or BRAK
-            standalone_zeros = re.findall(r'\b(0)\s+(?:ND|BRAK|PLN|\d)', after_date)
-            amounts.extend(standalone_zeros)
-            
-        else:
-            amounts = []
+        # Look for PLN amounts in after_date section
+        # Pattern: number followed by PLN, or standalone number followed by space/ND
+        amounts = []
+        
+        # Find all explicitly marked PLN amounts
+        pln_amounts = re.findall(r'([\d.,]+)\s*PLN', after_date)
+        amounts.extend(pln_amounts)
+        
+        # Also find standalone "0" which often means 0 PLN
+        # But only if followed by space or ND or BRAK
+        standalone_zeros = re.findall(r'\b(0)\s+(?:ND|BRAK|PLN|\d)', after_date)
+        amounts.extend(standalone_zeros)
         
         # This is likely a liability line if it has date + at least 2 amounts
-        if has_date and len(amounts) >= 2:
+        if len(amounts) >= 2:
             # Extract amounts
             def to_float(s):
                 try:
@@ -261,55 +329,50 @@ def parse_active_section(section_lines, all_lines):
             bank = "Nieznany Bank"
             
             # Check if bank is on same line (before the date)
-            date_match = re.search(r'\d{2}\.\d{2}\.\d{4}', line_clean)
-            if date_match:
-                before_date = line_clean[:date_match.start()].strip()
-                if before_date and any(name.upper() in before_date.upper() for name in bank_names):
-                    bank = before_date
+            before_date = line_clean[:date_match.start()].strip()
+            if before_date and _mentions_active_lender(before_date):
+                bank = before_date
             
             # If not found, check next line
-            if bank == "Nieznany Bank" and idx + 1 < len(lines_list):
-                next_line = lines_list[idx + 1][1].strip()
-                if any(name.upper() in next_line.upper() for name in bank_names):
-                    bank = next_line
+            if bank == "Nieznany Bank" and idx + 1 < len(summary_tokens):
+                next_token = summary_tokens[idx + 1]
+                if next_token.kind == BANK_LINE or _mentions_active_lender(next_token.clean):
+                    bank = next_token.clean
             
             # If still not found, use pending bank from previous line
             if bank == "Nieznany Bank" and pending_bank:
                 bank = pending_bank
             
-            # Determine if this is limit-based
-            is_limit_based = any(lt in current_type.lower() for lt in limit_based_types)
-            
-            liability = {
-                "bank": bank,
-                "type": current_type,
-                "installment": installment,
-                "amount_left": amount_left,
-                "limit": original_amount if is_limit_based else 0,
-                "original_amount": original_amount,
-                "is_limit_based": is_limit_based,
-                "max_delay_status": "OK",
-                "max_delay_days": 0,
-                "delays": ["OK"]
-            }
-            liabilities.append(liability)
+            liabilities.append(summary_liability(bank, current_type, original_amount, amount_left, installment))
             
             # Reset for next entry
             current_type = "Kredyt"
             pending_bank = None
-        
-        # Check if this line is just a bank name (for next iteration)
-        elif any(name.upper() in line_clean.upper() for name in bank_names) and not has_date:
-            pending_bank = line_clean
     
     # If no liabilities found, try alternate parsing
     if not liabilities:
-        liabilities = parse_active_alternate(section_lines, all_lines)
+        liabilities = parse_active_alternate(tokens)
     
     return liabilities
 
 
-def parse_active_alternate(section_lines, all_lines):
+def summary_liability(bank, credit_type, original_amount, amount_left, installment):
+    """Liability of one active summary table row (shared by the text and the layout path)."""
+    is_limit_based = any(lt in credit_type.lower() for lt in LIMIT_BASED_TYPES)
+    return Liability(
+        bank=bank,
+        type=credit_type,
+        installment=installment,
+        amount_left=amount_left,
+        limit=original_amount if is_limit_based else 0,
+        original_amount=original_amount,
+        is_limit_based=is_limit_based,
+        max_delay_status="OK",
+        delays=["OK"]
+    )
+
+
+def parse_active_alternate(tokens):
     """Alternate parsing for active section - look in detailed info."""
     liabilities = []
     
@@ -317,7 +380,7 @@ def parse_active_alternate(section_lines, all_lines):
     # "SANTANDER CONSUMER BANK" (line 41)
     # "Kredytobiorca 9.399 PLN 6.174 PLN 60 Otwarte" (line 50)
     
-    full_text = '\n'.join([line for _, line in section_lines])
+    full_text = '\n'.join(token.line for token in tokens)
     
     # Find bank + amount patterns in detailed section
     bank_names = re.findall(r'^([A-ZĄĆĘŁŃÓŚŹŻ][A-ZĄĆĘŁŃÓŚŹŻ\s]+(?:BANK|CONSUMER BANK|BANKOWOŚCI))$', full_text, re.MULTILINE)
@@ -329,28 +392,24 @@ def parse_active_alternate(section_lines, all_lines):
             def to_float(s):
                 return float(s.replace('.', '').replace(',', '.'))
             
-            liabilities.append({
-                "bank": bank.strip(),
-                "type": "Kredyt",
-                "installment": to_float(rata_match.group(1)),
-                "amount_left": to_float(rata_match.group(3)),
-                "limit": to_float(rata_match.group(2)),
-                "max_delay_status": "OK",
-                "max_delay_days": 0,
-                "delays": ["OK"]
-            })
+            liabilities.append(Liability(
+                bank=bank.strip(),
+                type="Kredyt",
+                installment=to_float(rata_match.group(1)),
+                amount_left=to_float(rata_match.group(3)),
+                limit=to_float(rata_match.group(2)),
+                max_delay_status="OK",
+                delays=["OK"]
+            ))
     
     return liabilities
 
 
-def parse_closed_section(section_lines, all_lines):
+def parse_closed_section(full_text):
     """Parse closed liabilities from section text."""
     liabilities = []
-    
-    full_text = '\n'.join([line for _, line in section_lines])
-    
-    # Known bank names to look for (order matters - more specific first)
-    bank_names = ["SANTANDER CONSUMER BANK", "MBANK WYDZIAŁ BANKOWOŚCI", "ALIOR BANK", "SANTANDER", "MBANK", "PKO", "ING", "BNP", "CITI", "GETIN", "MILLENNIUM", "CONSUMER BANK"]
+    # History rows are parsed once; each entry looks up its window in the index
+    history = HistoryIndex(full_text)
     
     # Find each bank entry with closing date pattern
     # Pattern: "z dn. DD.MM.YYYY" ... "umowa zakończona dn. DD.MM.YYYY"
@@ -370,43 +429,31 @@ def parse_closed_section(section_lines, all_lines):
         context_start = max(0, match.start() - 200)
         context = full_text[context_start:match.start()]
         
-        bank = "Nieznany Bank"
-        for name in bank_names:
-            if name.upper() in context.upper():
-                # Get the full line containing the bank name
-                for line in context.split('\n'):
-                    if name.upper() in line.upper():
-                        bank = line.strip()
-                        break
-                break
+        bank = _bank_line_in_context(context)
         
         # Clean bank name (remove trailing garbage)
         bank = re.sub(r'\s+(Kredyt|Karta|Pożyczka).*$', '', bank, flags=re.IGNORECASE)
         
         # Extract max delay from history after this entry
-        max_delay = extract_max_delay(full_text, match.end())
+        max_delay = history.max_delay(match.end())
         
-        liabilities.append({
-            "bank": bank,
-            "type": "Kredyt zamknięty",
-            "closing_date": closing_date,
-            "max_delay_days": max_delay,
-            "max_delay_status": f"{max_delay} dni" if max_delay > 0 else "OK",
-            "arrears_amount": 0,
-            "delays": [f"{max_delay} dni" if max_delay > 0 else "OK"]
-        })
+        liabilities.append(Liability(
+            bank=bank,
+            type="Kredyt zamknięty",
+            closing_date=closing_date,
+            max_delay_days=max_delay,
+            max_delay_status=f"{max_delay} dni" if max_delay > 0 else "OK",
+            delays=[f"{max_delay} dni" if max_delay > 0 else "OK"]
+        ))
     
     return liabilities
 
 
-def parse_statistical_section(section_lines, all_lines):
+def parse_statistical_section(full_text):
     """Parse statistical liabilities from section text."""
     liabilities = []
-    
-    full_text = '\n'.join([line for _, line in section_lines])
-    
-    # Known bank names to look for (order matters - more specific first)
-    bank_names = ["SANTANDER CONSUMER BANK", "MBANK WYDZIAŁ BANKOWOŚCI", "ALIOR BANK", "SANTANDER", "MBANK", "PKO", "ING", "BNP", "CITI", "GETIN", "MILLENNIUM", "CONSUMER BANK"]
+    # History rows are parsed once; each entry looks up its window in the index
+    history = HistoryIndex(full_text)
     
     # Pattern: "X PLN umowa zakończona dn. DD.MM.YYYY"
     entry_pattern = re.compile(
@@ -422,47 +469,150 @@ def parse_statistical_section(section_lines, all_lines):
         context_start = max(0, match.start() - 200)
         context = full_text[context_start:match.start()]
         
-        bank = "Nieznany Bank"
-        for name in bank_names:
-            if name.upper() in context.upper():
-                # Get the full line containing the bank name
-                for line in context.split('\n'):
-                    if name.upper() in line.upper():
-                        bank = line.strip()
-                        break
-                break
+        bank = _bank_line_in_context(context)
         
         # Clean bank name (keep only bank part)
         bank = re.sub(r'\s+\d+.*$', '', bank)  # Remove amounts after bank name
         bank = re.sub(r'\s+(Kredyt|Karta|Pożyczka).*$', '', bank, flags=re.IGNORECASE)
         
         # Extract max delay from history after this entry
-        max_delay = extract_max_delay(full_text, match.end())
+        max_delay = history.max_delay(match.end())
         
-        liabilities.append({
-            "bank": bank,
-            "type": "Statystyczny",
-            "closing_date": closing_date,
-            "max_delay_days": max_delay,
-            "max_delay_status": f"{max_delay} dni" if max_delay > 0 else "OK",
-            "delays": [f"{max_delay} dni" if max_delay > 0 else "OK"]
-        })
+        liabilities.append(Liability(
+            bank=bank,
+            type="Statystyczny",
+            closing_date=closing_date,
+            max_delay_days=max_delay,
+            max_delay_status=f"{max_delay} dni" if max_delay > 0 else "OK",
+            delays=[f"{max_delay} dni" if max_delay > 0 else "OK"]
+        ))
     
     return liabilities
 
 
-def extract_max_delay(text, start_pos):
-    """Extract maximum delay days from history section near given position."""
-    # Look at next 50 lines/1000 chars for delay pattern
-    search_text = text[start_pos:start_pos + 3000]
-    
-    # Pattern: "DD.MM.YYYY amount amount DELAY_DAYS" where DELAY_DAYS > 0
-    delay_pattern = re.compile(r'\d{2}\.\d{2}\.\d{4}\s+[\d.,]+\s*(?:PLN)?\s+[\d.,]+\s*(?:PLN)?\s+(\d+)')
-    
-    max_delay = 0
-    for match in delay_pattern.finditer(search_text):
-        delay = int(match.group(1))
-        if delay > max_delay:
-            max_delay = delay
-    
-    return max_delay
+def _mentions_active_lender(text):
+    return not ACTIVE_SECTION_SET.isdisjoint(find_lenders(text))
+
+
+def _bank_line_in_context(context):
+    """
+    Line of context naming the highest-priority known bank (CLOSED_SECTION_LENDERS
+    order), or "Nieznany Bank". Each line is scanned once by the lender matcher.
+    """
+    line_hits = [(line, find_lenders(line)) for line in context.split('\n')]
+    name = first_lender(set().union(*(hits for _, hits in line_hits)), CLOSED_SECTION_LENDERS)
+    if name is None:
+        return "Nieznany Bank"
+    # Get the full line containing the bank name
+    for line, hits in line_hits:
+        if name in hits:
+            return line.strip()
+
+
+# Repayment history row: "DD.MM.YYYY amount amount DELAY_DAYS"
+HISTORY_ROW_PATTERN = re.compile(r'(\d{2}\.\d{2}\.\d{4})\s+([\d.,]+)\s*(?:PLN)?\s+([\d.,]+)\s*(?:PLN)?\s+(\d+)')
+
+# Characters after an entry that belong to its history
+HISTORY_WINDOW = 3000
+
+HistoryRow = namedtuple("HistoryRow", "start end date due arrears delay_days")
+
+
+def _history_row(m):
+    return HistoryRow(m.start(), m.end(), m.group(1), m.group(2), m.group(3), int(m.group(4)))
+
+
+class HistoryIndex:
+    """
+    Repayment history rows of a section text, indexed by offset.
+    Rows are scanned lazily, only as far as the queried windows reach, and
+    windows of neighbouring entries share them instead of rescanning.
+    Window queries give exactly what scanning text[start:start + size] would;
+    the regex only runs again at a window edge that cuts through a row.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.starts = []
+        self.ends = []
+        # Rows with a delay (row number, days) - max_delay only has to look at these
+        self.delayed = []
+        self.delayed_days = []
+        # Current scan segment: rows from `origin` on are consecutive matches up to `covered`
+        self._scan = None
+        self._origin = 0
+        self._covered = 0
+
+    def _index_until(self, start, end):
+        """Indexes rows until one starts at or after `end`. False if start is behind the current segment."""
+        if self._scan is None or start > self._covered:
+            # Nothing scanned around start yet - skip the gap, new segment
+            self._scan = HISTORY_ROW_PATTERN.finditer(self.text, start)
+            self._origin = self._covered = start
+        elif start < self._origin:
+            return False
+        starts, ends = self.starts, self.ends
+        if starts and starts[-1] >= end:
+            return True
+        for m in self._scan:
+            row_start, row_end = m.span()
+            delay = m.group(4)
+            if delay != "0" and int(delay) > 0:
+                self.delayed.append(len(starts))
+                self.delayed_days.append(int(delay))
+            starts.append(row_start)
+            ends.append(row_end)
+            if row_start >= end:
+                self._covered = row_end
+                return True
+        self._covered = len(self.text)
+        return True
+
+    def row(self, i):
+        return _history_row(HISTORY_ROW_PATTERN.match(self.text, self.starts[i]))
+
+    def _window(self, start, size):
+        """Returns (head rows, k, j, tail rows); rows k..j-1 of the index belong to the window."""
+        text = self.text
+        end = start + size
+        if not self._index_until(start, end):
+            # Query behind the current segment - plain scan
+            return [_history_row(m) for m in HISTORY_ROW_PATTERN.finditer(text, start, end)], 0, 0, []
+        k = bisect_left(self.starts, start)
+        pos = start
+        head = []
+        # Window starts inside a row: rescan until a match lines up with the index again
+        if k > 0 and self.ends[k - 1] > start:
+            while True:
+                m = HISTORY_ROW_PATTERN.search(text, pos, end)
+                if m is None:
+                    return head, k, k, []
+                k = bisect_left(self.starts, m.start())
+                if k < len(self.starts) and self.starts[k] == m.start() and self.ends[k] == m.end():
+                    break
+                head.append(_history_row(m))
+                pos = m.end()
+
+        j = bisect_right(self.ends, end, k)
+        tail = []
+        # A row crossing the window end may still match (shorter) in the cut text
+        if j < len(self.starts) and self.starts[j] < end:
+            if j > k:
+                pos = self.ends[j - 1]
+            tail = [_history_row(m) for m in HISTORY_ROW_PATTERN.finditer(text, pos, end)]
+        return head, k, j, tail
+
+    def rows_in_window(self, start, size=HISTORY_WINDOW):
+        head, k, j, tail = self._window(start, size)
+        return head + [self.row(i) for i in range(k, j)] + tail
+
+    def max_delay(self, start, size=HISTORY_WINDOW):
+        """Largest delay (days) among the rows in the window, 0 when there are none."""
+        head, k, j, tail = self._window(start, size)
+        max_delay = max((row.delay_days for row in head + tail), default=0)
+        lo = bisect_left(self.delayed, k)
+        hi = bisect_left(self.delayed, j, lo)
+        if hi > lo:
+            max_delay = max(max_delay, max(self.delayed_days[lo:hi]))
+        return max_delay
+
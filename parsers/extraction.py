@@ -0,0 +1,231 @@
+"""
+PDF text extraction shared by all parsers.
+Parsers accept a file path, raw bytes or an open binary file object,
+so uploads can be parsed straight from memory.
+
+Extraction goes through a backend (BACKENDS):
+- "pdfplumber": pdfminer layout analysis, the reference output
+- "pdfium": PDFium (pypdfium2, C++) text path, tens of times faster. Lines are
+  regrouped by baseline the way pdfplumber does, which gives identical text for
+  plain line/table layouts (see test_extraction_parity.py) but is not a full
+  layout analysis - use it where layout fidelity isn't needed.
+
+Memory: every page is released as soon as its text is out, so a long
+report costs about one page of layout objects, not all of them. With
+EXTRACT_MEMORY_LIMIT_MB set, a document whose extraction grows the
+process RSS by more than that is aborted with ExtractionMemoryError.
+"""
+
+import ctypes
+import io
+import os
+import sys
+import threading
+import time
+
+from metrics import PAGE_EXTRACT_SECONDS
+
+
+def open_pdf(source):
+    """pdfplumber.open() for a path, bytes or a binary file object."""
+    # Imported on first use: pdfminer takes a while to load and the pdfium
+    # backend doesn't need it
+    import pdfplumber
+
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    elif hasattr(source, "seek"):
+        source.seek(0)
+    return pdfplumber.open(source)
+
+
+def source_name(source, filename=None):
+    """Display name for a parse source (basename for paths)."""
+    if filename:
+        return filename
+    if isinstance(source, str):
+        return os.path.basename(source)
+    return "upload.pdf"
+
+
+class ExtractionMemoryError(MemoryError):
+    """A document's extraction grew the process RSS past EXTRACT_MEMORY_LIMIT_MB."""
+
+
+def extract_memory_limit():
+    """Per-document RSS growth limit in bytes (EXTRACT_MEMORY_LIMIT_MB, 0 = no limit)."""
+    return int(float(os.getenv("EXTRACT_MEMORY_LIMIT_MB", 0)) * 1024 * 1024)
+
+
+def rss_bytes():
+    """Resident set size of this process (peak RSS where /proc is not available)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class PdfplumberBackend:
+    name = "pdfplumber"
+
+    def iter_page_texts(self, source, on_page=None):
+        with open_pdf(source) as pdf:
+            for page in pdf.pages:
+                try:
+                    text = page.extract_text() or ""
+                    if on_page is not None:
+                        on_page(page, text)
+                    yield text
+                finally:
+                    # A page keeps its chars/layout (and a textmap cache entry) until
+                    # closed - without this a 50-page report holds ~200 MB until the end
+                    page.close()
+
+
+class PdfiumBackend:
+    name = "pdfium"
+
+    # pdfplumber's default extract_text() tolerances (points)
+    y_tolerance = 3
+    x_tolerance = 3
+
+    # PDFium is not thread-safe; calls from request threads and job threads are serialized
+    _lock = threading.Lock()
+
+    def iter_page_texts(self, source, on_page=None):
+        # No pdfplumber pages here - on_page is never called
+        import pypdfium2 as pdfium
+
+        if isinstance(source, (bytearray, memoryview)):
+            source = bytes(source)
+        elif hasattr(source, "seek"):
+            source.seek(0)
+        with self._lock:
+            doc = pdfium.PdfDocument(source)
+        try:
+            for i in range(len(doc)):
+                with self._lock:
+                    text = self._page_text(doc[i])
+                yield text
+        finally:
+            with self._lock:
+                doc.close()
+
+    def _page_text(self, page):
+        textpage = page.get_textpage()
+        try:
+            text = textpage.get_text_range()
+            if len(text) != textpage.count_chars():
+                # Characters outside the BMP - text offsets no longer map to char indices
+                return "\n".join(line.strip() for line in text.split("\r\n") if line.strip())
+            return self._group_lines(textpage, text)
+        finally:
+            textpage.close()
+            page.close()
+
+    def _group_lines(self, textpage, text):
+        """
+        PDFium breaks lines on large horizontal gaps; regroup its line
+        segments by baseline and join them left to right like pdfplumber.
+        """
+        import pypdfium2.raw as pdfium_c
+
+        x, y = ctypes.c_double(), ctypes.c_double()
+        left, right, bottom, top = ctypes.c_double(), ctypes.c_double(), ctypes.c_double(), ctypes.c_double()
+        segments = []
+        pos = 0
+        for segment in text.split("\r\n"):
+            stripped = segment.strip()
+            if stripped:
+                first = pos + len(segment) - len(segment.lstrip())
+                last = pos + len(segment.rstrip()) - 1
+                pdfium_c.FPDFText_GetCharOrigin(textpage.raw, first, x, y)
+                pdfium_c.FPDFText_GetCharBox(textpage.raw, last, left, right, bottom, top)
+                segments.append((y.value, x.value, right.value, stripped))
+            pos += len(segment) + 2
+
+        # Top to bottom, then left to right
+        segments.sort(key=lambda s: (-s[0], s[1]))
+        lines = []
+        baseline = None
+        for seg_y, seg_left, seg_right, seg_text in segments:
+            if baseline is not None and abs(baseline - seg_y) <= self.y_tolerance:
+                lines[-1].append((seg_left, seg_right, seg_text))
+            else:
+                baseline = seg_y
+                lines.append([(seg_left, seg_right, seg_text)])
+
+        out = []
+        for line in lines:
+            line.sort()
+            parts = []
+            prev_right = None
+            for seg_left, seg_right, seg_text in line:
+                if prev_right is not None and seg_left - prev_right > self.x_tolerance:
+                    parts.append(" ")
+                parts.append(seg_text)
+                prev_right = seg_right
+            out.append("".join(parts))
+        return "\n".join(out)
+
+
+BACKENDS = {backend.name: backend for backend in (PdfplumberBackend(), PdfiumBackend())}
+DEFAULT_BACKEND = "pdfplumber"
+
+
+def get_backend(name=None):
+    """Backend by name (None = DEFAULT_BACKEND). ValueError for unknown names."""
+    name = name or DEFAULT_BACKEND
+    try:
+        return BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown PDF extraction backend: {name} (available: {', '.join(BACKENDS)})")
+
+
+def iter_page_texts(source, backend=None, memory_limit=None, on_page=None):
+    """
+    Yields the text of each page, one page at a time.
+    Pages the consumer never asks for are never laid out / extracted.
+    memory_limit: bytes of RSS growth allowed while extracting this document
+    (None = EXTRACT_MEMORY_LIMIT_MB, 0 = no limit); ExtractionMemoryError past it.
+    RSS is per process - in the parse pool that is one document at a time,
+    in threaded callers concurrent extractions count together.
+    on_page: on_page(page, text) for every pdfplumber page before it is
+    released, for layout readers (parsers.bik_layout); pdfplumber backend only.
+    """
+    backend = get_backend(backend)
+    limit = extract_memory_limit() if memory_limit is None else memory_limit
+    baseline = rss_bytes() if limit else 0
+    pages = backend.iter_page_texts(source, on_page)
+    try:
+        page_number = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                text = next(pages)
+            except StopIteration:
+                return
+            PAGE_EXTRACT_SECONDS.observe(time.perf_counter() - start, backend=backend.name)
+            page_number += 1
+            if limit and rss_bytes() - baseline > limit:
+                raise ExtractionMemoryError(
+                    f"Extraction stopped at page {page_number}: memory limit of {limit // (1024 * 1024)} MB exceeded")
+            yield text
+    finally:
+        pages.close()
+
+
+def first_page_text(source, backend=None):
+    pages = iter_page_texts(source, backend)
+    try:
+        return next(pages, "")
+    finally:
+        pages.close()
+
+
+def extract_text(source, backend=None):
+    """Whole document text, every page followed by a newline."""
+    return "".join(text + "\n" for text in iter_page_texts(source, backend))
@@ -0,0 +1,139 @@
+"""
+Canonical lender dictionary and the shared multi-pattern matcher.
+
+All names are compiled once into a single trie-shaped regex (shared prefixes
+are matched once, the longest name wins at each position). After a hit the
+scan resumes where another name could still overlap its end - the same
+failure-link idea as Aho-Corasick - and names nested inside the hit come from
+a precomputed table, so one pass over a line reports every lender in it.
+Matching is case-insensitive substring matching, same as `name.upper() in line.upper()`.
+"""
+
+import re
+
+
+# Non-bank lenders (pozabankowe) - these are red flags for traditional banks
+POZABANKOWE_LENDERS = [
+    "ALLEGRO PAY", "TWISTO", "VIVUS", "PROVIDENT", "WONGA", "LENDON",
+    "NETCREDIT", "SZYBKA GOTÓWKA", "INCREDIT", "AASA", "HAPIPOŻYCZKI",
+    "FILARUM", "WANDOO", "KUKI", "SOLVEN", "POŻYCZKA PLUS", "EXTRA PORTFEL",
+    "KREDITO24", "FERRATUM", "EKSPRES KASA", "SMART POŻYCZKA", "POZYCZKOMAT",
+    "TAKTO FINANSE", "CREDIT-AGRICOLE", "OPTIMA", "BOCIAN", "EVEREST",
+    "PROFI CREDIT", "DELTA", "MONEY GRATIS", "RAPIDA", "MILOAN"
+]
+
+# Known bank/lender names in the active summary table (including pozabankowe)
+ACTIVE_SECTION_LENDERS = [
+    "SANTANDER CONSUMER BANK", "MBANK WYDZIAŁ BANKOWOŚCI", "ALIOR BANK",
+    "CREDIT AGRICOLE", "ING BANK ŚLĄSKI", "ING BANK",
+    "SANTANDER", "MBANK", "PKO BP", "PKO", "ING", "BNP", "CITI", "GETIN",
+    "MILLENNIUM", "NEST BANK", "SKOK", "BANK MILLENNIUM", "ELEKTRONICZNEJ",
+    # Pozabankowe
+    "ALLEGRO PAY", "TWISTO", "VIVUS", "PROVIDENT", "WONGA", "LENDON",
+    "NETCREDIT", "INCREDIT", "AASA", "FILARUM", "WANDOO", "KUKI",
+    "PROFI CREDIT", "FERRATUM", "SP. Z O.O."
+]
+
+# Bank names for closed / statistical entries (order matters - more specific first)
+CLOSED_SECTION_LENDERS = [
+    "SANTANDER CONSUMER BANK", "MBANK WYDZIAŁ BANKOWOŚCI", "ALIOR BANK", "SANTANDER", "MBANK",
+    "PKO", "ING", "BNP", "CITI", "GETIN", "MILLENNIUM", "CONSUMER BANK"
+]
+
+LENDERS = sorted({name.upper() for name in POZABANKOWE_LENDERS + ACTIVE_SECTION_LENDERS + CLOSED_SECTION_LENDERS})
+
+
+def _trie_regex(names):
+    """Prefix-shared alternation; greedy optional tails make it prefer the longest name."""
+    trie = {}
+    for name in names:
+        node = trie
+        for ch in name:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def build(node):
+        terminal = "" in node
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if terminal:
+            return "(?:" + body + ")?"
+        return body
+
+    return build(trie)
+
+
+class LenderMatcher:
+    def __init__(self, names):
+        self.names = sorted({name.upper() for name in names})
+        self._regex = re.compile(_trie_regex(self.names))
+        # Every dictionary name contained in a given name - a hit on the
+        # longest name at a position implies hits on all of these
+        self._contained = {n: frozenset(m for m in self.names if m in n) for n in self.names}
+        # Longest suffix of a name that is a prefix of another (not contained) name:
+        # the scan steps back this far after a hit so overlapping names are not lost
+        self._overlap = {
+            n: max((k for m in self.names if m not in n
+                    for k in range(1, min(len(n), len(m))) if n[-k:] == m[:k]), default=0)
+            for n in self.names
+        }
+
+    def find_all(self, text):
+        """Set of dictionary names (upper case) occurring anywhere in text."""
+        text = text.upper()
+        hits = set()
+        pos = 0
+        search = self._regex.search
+        while True:
+            m = search(text, pos)
+            if m is None:
+                return hits
+            name = m.group()
+            hits |= self._contained[name]
+            pos = max(m.start() + 1, m.end() - self._overlap[name])
+
+
+LENDER_MATCHER = LenderMatcher(LENDERS)
+
+POZABANKOWE_SET = frozenset(name.upper() for name in POZABANKOWE_LENDERS)
+ACTIVE_SECTION_SET = frozenset(name.upper() for name in ACTIVE_SECTION_LENDERS)
+
+
+def find_lenders(text):
+    return LENDER_MATCHER.find_all(text)
+
+
+def is_pozabankowe(bank):
+    return not POZABANKOWE_SET.isdisjoint(find_lenders(bank))
+
+
+def first_lender(hits, ordered_names):
+    """First name of ordered_names (priority order) present in hits, or None."""
+    for name in ordered_names:
+        if name.upper() in hits:
+            return name.upper()
+    return None
+
+
+# Dictionary entries that are not a lender's name (legal form, address words)
+GENERIC_NAMES = frozenset(["SP. Z O.O.", "ELEKTRONICZNEJ", "CONSUMER BANK"])
+
+
+def canonical_lender(bank):
+    """
+    One name per lender for grouping/lookups: the shortest known name found
+    in bank at a word start ("MBANK WYDZIAŁ BANKOWOŚCI" -> "MBANK",
+    "BANK MILLENNIUM" -> "MILLENNIUM", "PKO BP 1 O.GDYNIA" -> "PKO").
+    Unknown lenders keep their text, upper-cased with whitespace collapsed.
+    """
+    text = " ".join((bank or "").upper().split())
+    best = None
+    for name in find_lenders(text):
+        if name in GENERIC_NAMES:
+            continue
+        m = re.search(r"(?<!\w)" + re.escape(name), text)
+        if m and (best is None or (len(name), m.start()) < best[:2]):
+            best = (len(name), m.start(), name)
+    return best[2] if best else text
@@ -0,0 +1,176 @@
+"""
+Shared OpenAI client for the LLM parsers.
+
+- one pooled client per process (keep-alive connections reused across calls);
+  async callers get one AsyncOpenAI client per event loop
+- per-call deadline (LLM_TIMEOUT seconds) covering every attempt, each
+  request only gets the time that is left
+- retries with jittered exponential backoff on 429/5xx and connection errors
+  (LLM_MAX_RETRIES), Retry-After is honoured
+- async calls are bounded to LLM_MAX_CONCURRENCY in flight per event loop,
+  backoff sleeps don't hold a slot
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+import weakref
+
+from metrics import LLM_REQUESTS, stage_timer
+
+
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 20.0
+
+_lock = threading.Lock()
+_clients = {}  # (api_key, base_url) -> OpenAI
+_async_clients = weakref.WeakKeyDictionary()  # event loop -> {(api_key, base_url): (AsyncOpenAI, Semaphore)}
+
+
+def llm_timeout():
+    return float(os.getenv("LLM_TIMEOUT", 120))
+
+
+def llm_max_retries():
+    return int(os.getenv("LLM_MAX_RETRIES", 4))
+
+
+def llm_max_concurrency():
+    return max(1, int(os.getenv("LLM_MAX_CONCURRENCY", 4)))
+
+
+def _client_key():
+    return os.getenv("OPENAI_API_KEY"), os.getenv("OPENAI_BASE_URL") or None
+
+
+def get_llm_client():
+    """Process-wide OpenAI client for the current OPENAI_API_KEY / OPENAI_BASE_URL."""
+    key = _client_key()
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                from openai import OpenAI  # the SDK takes ~0.7s to import - only load it when used
+                # Retries are done by chat_json (deadline-aware), not by the SDK
+                client = _clients[key] = OpenAI(api_key=key[0], base_url=key[1], max_retries=0)
+    return client
+
+
+def _get_async_client():
+    """(AsyncOpenAI, Semaphore) for the running event loop."""
+    loop = asyncio.get_running_loop()
+    key = _client_key()
+    per_loop = _async_clients.setdefault(loop, {})
+    entry = per_loop.get(key)
+    if entry is None:
+        from openai import AsyncOpenAI
+        client = AsyncOpenAI(api_key=key[0], base_url=key[1], max_retries=0)
+        entry = per_loop[key] = (client, asyncio.Semaphore(llm_max_concurrency()))
+    return entry
+
+
+def _request(system_prompt, user_content, model):
+    return {
+        "model": model or os.getenv("OPENAI_MODEL_NAME", "gpt-4o"),
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_content}
+        ],
+        "response_format": {"type": "json_object"},
+        "temperature": 0  # Deterministic
+    }
+
+
+def _retry_after(error):
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None  # missing or an HTTP date
+
+
+def retry_delay(error, attempt, remaining):
+    """
+    Seconds to wait before retrying after error (attempt counts from 0),
+    or None when the error is not transient or the deadline leaves no time.
+    """
+    import openai
+
+    if isinstance(error, openai.APIStatusError):
+        if error.status_code != 429 and error.status_code < 500:
+            return None
+    elif not isinstance(error, openai.APIConnectionError):  # includes APITimeoutError
+        return None
+    # Full jitter: concurrent callers throttled together don't retry in lockstep
+    delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+    retry_after = _retry_after(error)
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    if delay >= remaining:
+        return None
+    return delay
+
+
+def _give_up(error, attempt, deadline):
+    """Backoff delay for the next attempt, or None to re-raise error."""
+    delay = None
+    if attempt < llm_max_retries():
+        delay = retry_delay(error, attempt, deadline - time.monotonic())
+    if delay is None:
+        LLM_REQUESTS.inc(status="error")
+        return None
+    LLM_REQUESTS.inc(status="retry")
+    print(f"LLM call failed ({error}), retry {attempt + 1} in {delay:.1f}s")
+    return delay
+
+
+def chat_json(system_prompt, user_content, model=None, deadline=None):
+    """
+    JSON-mode chat completion; returns the message content.
+    deadline: seconds for the whole call including retries (None = LLM_TIMEOUT).
+    """
+    client = get_llm_client()
+    request = _request(system_prompt, user_content, model)
+    end = time.monotonic() + (deadline or llm_timeout())
+    with stage_timer("bik_llm", "llm_call"):
+        attempt = 0
+        while True:
+            try:
+                response = client.chat.completions.create(**request, timeout=max(end - time.monotonic(), 0.001))
+            except Exception as e:
+                delay = _give_up(e, attempt, end)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            LLM_REQUESTS.inc(status="ok")
+            return response.choices[0].message.content
+
+
+async def chat_json_async(system_prompt, user_content, model=None, deadline=None):
+    """Async chat_json for event loops (job/worker context)."""
+    client, slots = _get_async_client()
+    request = _request(system_prompt, user_content, model)
+    end = time.monotonic() + (deadline or llm_timeout())
+    with stage_timer("bik_llm", "llm_call"):
+        attempt = 0
+        while True:
+            try:
+                async with slots:
+                    response = await client.chat.completions.create(
+                        **request, timeout=max(end - time.monotonic(), 0.001))
+            except Exception as e:
+                delay = _give_up(e, attempt, end)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            LLM_REQUESTS.inc(status="ok")
+            return response.choices[0].message.content
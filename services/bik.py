@@ -0,0 +1,125 @@
+"""
+BIK report analysis used by /upload_bik, /upload_bik_batch and background jobs:
+the native -> regex parser cascade (parsers.bik_cascade) over a single
+text extraction, behind the BIK store (services.bik_store) and the parse cache.
+"""
+
+from metrics import BIK_FALLBACKS, BIK_REPORTS, capture_observations, replay_observations
+from parsers.bik_cascade import ReportPages, run_cascade, CASCADE_VERSION
+from parsers.bik_layout import ActiveTableReader
+from parsers.extraction import DEFAULT_BACKEND, iter_page_texts
+from services.debug_capture import get_debug_capture
+from services.parse_cache import backend_namespace
+from services.parse_pool import parse_as_completed
+
+
+def analyze_bik(source, digest, cache=None, backend=None, store=None, filename=None):
+    """
+    Returns the analysis dict for one BIK report.
+    source: path, bytes or binary file object; digest: SHA-256 of the file.
+    backend: text extraction backend name (None = pdfplumber).
+    store: BikStore - reports stored earlier are answered from it without
+    parsing, new analyses are stored (with filename).
+    """
+    backend = backend or DEFAULT_BACKEND
+    analysis = store.find_file(digest, CASCADE_VERSION, backend) if store is not None else None
+    if analysis is None:
+        namespace = backend_namespace("bik", backend)
+        analysis = cache.get(namespace, digest, CASCADE_VERSION) if cache else None
+        if analysis is None:
+            analysis = _run_cascade(source, backend)
+            if cache:
+                cache.set(namespace, digest, CASCADE_VERSION, analysis)
+        if store is not None:
+            store.record(digest, CASCADE_VERSION, backend, filename, analysis)
+    BIK_REPORTS.inc(parser_type=analysis.get("parser_type", "ERROR"))
+    return analysis
+
+
+def _analyze_upload(args):
+    # Runs in a parse pool worker; metrics recorded there are sent back with the result
+    source, backend = args
+    with capture_observations() as observed:
+        analysis = _run_cascade(source, backend)
+    return analysis, observed
+
+
+def analyze_bik_batch(uploads, workers=1, cache=None, backend=None, store=None):
+    """
+    Yields (position, filename, analysis) for every upload as soon as its
+    analysis is ready: stored/cached reports first, then parsed reports in
+    completion order (not upload order; position is the index in uploads).
+    uploads: list of (filename, SpooledUpload) tuples.
+    Identical files (same digest) are parsed once.
+    store: BikStore, as in analyze_bik.
+    """
+    backend = backend or DEFAULT_BACKEND
+    namespace = backend_namespace("bik", backend)
+    positions = {}  # digest -> positions of every upload with that digest
+    ready = []
+    pending = []  # (source, backend) to parse, first occurrence of each digest
+    pending_digests = []
+    for position, (filename, upload) in enumerate(uploads):
+        digest = upload.digest
+        if digest in positions:
+            positions[digest].append(position)
+            continue
+        positions[digest] = [position]
+        hit = store.find_file(digest, CASCADE_VERSION, backend) if store is not None else None
+        if hit is not None:
+            ready.append((digest, hit))
+            continue
+        hit = cache.get(namespace, digest, CASCADE_VERSION) if cache else None
+        if hit is not None:
+            if store is not None:
+                store.record(digest, CASCADE_VERSION, backend, filename, hit)
+            ready.append((digest, hit))
+        else:
+            pending.append((upload.source, backend))
+            pending_digests.append(digest)
+
+    def emit(digest, analysis):
+        for position in positions[digest]:
+            BIK_REPORTS.inc(parser_type=analysis.get("parser_type", "ERROR"))
+            yield position, uploads[position][0], dict(analysis)
+
+    for digest, analysis in ready:
+        yield from emit(digest, analysis)
+    for i, (analysis, observed) in parse_as_completed(_analyze_upload, pending, workers=workers):
+        replay_observations(observed)
+        digest = pending_digests[i]
+        if cache:
+            cache.set(namespace, digest, CASCADE_VERSION, analysis)
+        if store is not None:
+            store.record(digest, CASCADE_VERSION, backend, uploads[positions[digest][0]][0], analysis)
+        yield from emit(digest, analysis)
+
+
+def _run_cascade(source, backend):
+    # Pages are extracted lazily while the native parser consumes them (it
+    # stops once the liability sections are complete); the regex tier only
+    # extracts the pages nobody has read yet. On the pdfplumber backend the
+    # active summary table is also read from its word boxes (parsers.bik_layout)
+    capture = get_debug_capture()
+    capture_id = capture.begin("bik")
+    active_table = ActiveTableReader()
+    report = ReportPages(iter_page_texts(source, backend, on_page=active_table), active_table)
+    try:
+        best, results = run_cascade(report)
+    finally:
+        report.close()
+        if capture_id:
+            capture.write(capture_id, "bik_text.txt", report.text_so_far())
+
+    for result in results:
+        print(f"--- {result.parser_type} parser: confidence {result.confidence}"
+              + (f", failed: {result.error}" if result.error else ""))
+    if len(results) > 1:
+        BIK_FALLBACKS.inc(reason="native_error" if results[0].error else "low_confidence")
+
+    if best.analysis is None:
+        return {"error": best.error, "status": "error"}
+    analysis = best.analysis
+    analysis["parser_type"] = best.parser_type
+    analysis["parser_confidence"] = best.confidence
+    return analysis
@@ -0,0 +1,184 @@
+"""
+Persistent store of parsed BIK analyses (SQLite), so earlier reports can be
+looked up without re-uploading and re-parsing the PDF.
+
+- reports: one row per report file (by SHA-256 of the upload) with the
+  full analysis JSON; indexed by (pesel, report_date) for a client's
+  latest report and report history
+- liabilities: one row per liability of a stored report, indexed by
+  (lender, section) - lender is parsers.lenders.canonical_lender(bank), so
+  "mBank" finds rows stored as "MBANK WYDZIAŁ BANKOWOŚCI"
+
+A re-uploaded report is answered from the store before the parse cache and
+the PDF pipeline. Rows remember the cascade version and the text extraction
+backend that produced them; a parser upgrade or a report uploaded through
+another backend is parsed again (and replaces the stored row) instead of
+serving an analysis the current pipeline would not produce. The database
+(WAL mode) is shared by all gunicorn workers.
+
+The store holds personal data (PESEL, names, credit history): it is off
+unless BIK_STORE_PATH is set, and its query endpoints need a token
+(BIK_STORE_API_TOKEN, see app.py).
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from parsers.lenders import canonical_lender
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    id INTEGER PRIMARY KEY,
+    file_digest TEXT NOT NULL UNIQUE,
+    version TEXT NOT NULL,
+    backend TEXT,
+    pesel TEXT,
+    report_date TEXT,
+    name TEXT,
+    score INTEGER,
+    total_installment REAL,
+    parser_type TEXT,
+    filename TEXT,
+    stored_at TEXT NOT NULL,
+    analysis TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reports_pesel_date ON reports (pesel, report_date);
+CREATE TABLE IF NOT EXISTS liabilities (
+    report_id INTEGER NOT NULL REFERENCES reports (id) ON DELETE CASCADE,
+    section TEXT NOT NULL,
+    lender TEXT NOT NULL,
+    bank TEXT,
+    type TEXT,
+    installment REAL,
+    amount_left REAL,
+    max_delay_days INTEGER
+);
+CREATE INDEX IF NOT EXISTS liabilities_lender ON liabilities (lender, section);
+CREATE INDEX IF NOT EXISTS liabilities_report ON liabilities (report_id);
+"""
+
+SECTIONS = ("active", "closed", "statistical")
+
+HISTORY_COLUMNS = "file_digest, backend, filename, report_date, name, score, total_installment, parser_type, stored_at"
+
+
+class BikStore:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()  # sqlite3 connections are per thread
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            conn.executescript(SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(reports)")}
+            if "backend" not in columns:
+                # Stores created before rows were keyed by backend - their rows never match and get replaced
+                conn.execute("ALTER TABLE reports ADD COLUMN backend TEXT")
+            self._local.conn = conn
+        return conn
+
+    def find_file(self, digest, version, backend):
+        """The stored analysis of a report file parsed by this cascade version and backend, or None."""
+        row = self._connection().execute(
+            "SELECT analysis FROM reports WHERE file_digest = ? AND version = ? AND backend = ?",
+            (digest, version, backend)
+        ).fetchone()
+        return json.loads(row["analysis"]) if row else None
+
+    def record(self, digest, version, backend, filename, analysis):
+        """Stores (or replaces) the analysis of one report file; error results are not stored."""
+        if analysis.get("status") == "error":
+            return
+        personal = analysis.get("personal_data") or {}
+        summary = analysis.get("summary") or {}
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM reports WHERE file_digest = ?", (digest,))
+            report_id = conn.execute(
+                "INSERT INTO reports (file_digest, version, backend, pesel, report_date, name, score, "
+                "total_installment, parser_type, filename, stored_at, analysis) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (digest, version, backend, personal.get("pesel"), personal.get("report_date"), personal.get("name"),
+                 analysis.get("score"), summary.get("total_installment"), analysis.get("parser_type"), filename,
+                 time.strftime("%Y-%m-%d %H:%M:%S"), json.dumps(analysis, ensure_ascii=False))
+            ).lastrowid
+            conn.executemany(
+                "INSERT INTO liabilities (report_id, section, lender, bank, type, installment, amount_left, "
+                "max_delay_days) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(report_id, section, canonical_lender(item.get("bank")), item.get("bank"), item.get("type"),
+                  item.get("installment"), item.get("amount_left"), item.get("max_delay_days"))
+                 for section in SECTIONS for item in analysis.get(f"{section}_liabilities") or []]
+            )
+
+    def latest(self, pesel):
+        """Analysis of the client's most recent report (by report date), or None."""
+        row = self._connection().execute(
+            "SELECT analysis FROM reports WHERE pesel = ? ORDER BY report_date DESC, id DESC LIMIT 1", (pesel,)
+        ).fetchone()
+        return json.loads(row["analysis"]) if row else None
+
+    def history(self, pesel):
+        """Stored reports of a client, newest first (without the analyses)."""
+        rows = self._connection().execute(
+            f"SELECT {HISTORY_COLUMNS} FROM reports WHERE pesel = ? ORDER BY report_date DESC, id DESC", (pesel,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def clients_with_lender(self, lender, section="active"):
+        """
+        Clients whose latest report lists a liability at lender in section:
+        [{pesel, name, report_date, file_digest, liabilities: [...]}], by PESEL.
+        """
+        rows = self._connection().execute(
+            "SELECT r.pesel, r.name, r.report_date, r.file_digest, "
+            "l.bank, l.type, l.installment, l.amount_left, l.max_delay_days "
+            "FROM liabilities l JOIN reports r ON r.id = l.report_id "
+            "WHERE l.lender = ? AND l.section = ? AND r.id = ("
+            "  SELECT id FROM reports WHERE pesel = r.pesel ORDER BY report_date DESC, id DESC LIMIT 1"
+            ") ORDER BY r.pesel",
+            (canonical_lender(lender), section)
+        ).fetchall()
+        clients = {}
+        for row in rows:
+            client = clients.get(row["pesel"])
+            if client is None:
+                client = clients[row["pesel"]] = {key: row[key] for key in ["pesel", "name", "report_date",
+                                                                             "file_digest"]}
+                client["liabilities"] = []
+            client["liabilities"].append({key: row[key] for key in ["bank", "type", "installment", "amount_left",
+                                                                    "max_delay_days"]})
+        return list(clients.values())
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM reports").fetchone()[0]
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def get_bik_store():
+    """Process-wide store at BIK_STORE_PATH (unset / empty = disabled, returns None)."""
+    global _default_store
+    path = os.getenv("BIK_STORE_PATH", "")
+    if not path:
+        return None
+    if _default_store is None:
+        with _default_lock:
+            if _default_store is None:
+                _default_store = BikStore(path)
+    return _default_store
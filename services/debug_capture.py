@@ -0,0 +1,140 @@
+"""
+Debug artifact capture (extracted BIK text, raw LLM responses).
+Requests only put artifacts on a bounded queue; a background thread writes
+them, one file per request and artifact, so nothing blocks the request and
+gunicorn workers never write to the same file. A full queue drops the
+artifact instead of waiting. The capture directory is size-capped: the
+oldest files are deleted once it grows past DEBUG_CAPTURE_MAX_BYTES.
+
+Off by default: the artifacts are uploaded reports (names, PESEL, credit
+history). Operators enable it with DEBUG_CAPTURE_SAMPLE_RATE (0-1).
+"""
+
+import atexit
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+
+
+class DebugCapture:
+    def __init__(self, directory, sample_rate=0.0, max_bytes=64 * 1024 * 1024, queue_size=256):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._total_bytes = None  # size of the directory, scanned by the writer thread
+
+    def begin(self, kind):
+        """
+        Starts a capture for one request. Returns a capture id, or None when
+        this request is not sampled (writes with a None id are no-ops).
+        """
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return None
+        return f"{time.strftime('%Y%m%d-%H%M%S')}-{kind}-{uuid.uuid4().hex[:8]}"
+
+    def write(self, capture_id, name, content):
+        """Queues one artifact (str or bytes) of a capture. Never blocks."""
+        if capture_id is None:
+            return
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait((f"{capture_id}-{name}", content))
+        except queue.Full:
+            self.dropped += 1
+
+    def hook(self, capture_id):
+        """
+        capture(name, content) writing into capture_id, for code that must not
+        import this module (parsers.bik_llm_parser); None when not sampled.
+        """
+        if capture_id is None:
+            return None
+        return lambda name, content: self.write(capture_id, name, content)
+
+    def flush(self, timeout=5.0):
+        """Waits (up to timeout) until every queued artifact is on disk."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def _ensure_writer(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="debug-capture", daemon=True)
+                self._thread.start()
+                atexit.register(self.flush, 2.0)
+
+    def _run(self):
+        while True:
+            filename, content = self._queue.get()
+            try:
+                self._write_file(filename, content)
+            except OSError as e:
+                print(f"Debug capture write failed ({filename}): {e}")
+            finally:
+                self._queue.task_done()
+
+    def _write_file(self, filename, content):
+        os.makedirs(self.directory, exist_ok=True)
+        if self._total_bytes is None:
+            self._total_bytes = sum(size for _, _, size in self._files())
+        data = content.encode("utf-8") if isinstance(content, str) else content
+        path = os.path.join(self.directory, filename)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        self._total_bytes += len(data)
+        if self._total_bytes > self.max_bytes:
+            self._rotate()
+
+    def _files(self):
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue  # rotated away by another worker
+                files.append((stat.st_mtime, entry.path, stat.st_size))
+        return files
+
+    def _rotate(self):
+        # Rescan: other workers write to the same directory
+        files = sorted(self._files())
+        total = sum(size for _, _, size in files)
+        target = self.max_bytes * 0.9
+        for _, path, size in files:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        self._total_bytes = total
+
+
+_default_capture = None
+
+
+def get_debug_capture():
+    """Process-wide capture configured from DEBUG_CAPTURE_* env vars."""
+    global _default_capture
+    if _default_capture is None:
+        _default_capture = DebugCapture(
+            os.getenv("DEBUG_CAPTURE_DIR", "debug_captures"),
+            sample_rate=float(os.getenv("DEBUG_CAPTURE_SAMPLE_RATE") or 0.0),
+            max_bytes=int(os.getenv("DEBUG_CAPTURE_MAX_BYTES", 64 * 1024 * 1024)),
+            queue_size=int(os.getenv("DEBUG_CAPTURE_QUEUE_SIZE", 256)),
+        )
+    return _default_capture
@@ -0,0 +1,172 @@
+"""
+Background parse jobs.
+Submitting returns a job id straight away; the parse runs on a small
+thread pool (CPU-heavy PDF work is further fanned out to the parse pool),
+so web workers are not held for the whole batch.
+Progress and partial results are read by polling or as Server-Sent Events.
+
+Jobs live in memory of the process that accepted them - run a single
+gunicorn worker (or sticky routing) for the /jobs API.
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Job:
+    def __init__(self, kind, total):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = "queued"  # queued -> running -> done | error
+        self.total = total
+        self.done = 0
+        self.partial_results = []
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self._changed = threading.Condition()
+        self._version = 0
+
+    def _touch(self):
+        # Caller holds self._changed
+        self._version += 1
+        self._changed.notify_all()
+
+    def set_running(self):
+        with self._changed:
+            self.status = "running"
+            self._touch()
+
+    def add_partial(self, item):
+        """Records one finished unit of work (a parsed file / report)."""
+        with self._changed:
+            self.partial_results.append(item)
+            self.done += 1
+            self._touch()
+
+    def finish(self, result):
+        with self._changed:
+            self.result = result
+            self.status = "done"
+            self.finished_at = time.time()
+            self._touch()
+
+    def fail(self, error):
+        with self._changed:
+            self.error = str(error)
+            self.status = "error"
+            self.finished_at = time.time()
+            self._touch()
+
+    @property
+    def finished(self):
+        return self.status in ("done", "error")
+
+    def to_dict(self, since=0):
+        with self._changed:
+            data = {
+                "job_id": self.id,
+                "kind": self.kind,
+                "status": self.status,
+                "progress": {"done": self.done, "total": self.total},
+                "partial_results": self.partial_results[since:],
+                "next": len(self.partial_results),
+            }
+            if self.status == "done":
+                data["result"] = self.result
+            if self.status == "error":
+                data["error"] = self.error
+            return data
+
+    def wait_for_change(self, version, timeout):
+        """Blocks until the job changed past `version` (or timeout). Returns the new version."""
+        with self._changed:
+            if self._version == version:
+                self._changed.wait(timeout)
+            return self._version
+
+
+class JobManager:
+    def __init__(self, max_workers=2, ttl_seconds=3600):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self.ttl_seconds = ttl_seconds
+
+    def submit(self, kind, total, work):
+        """
+        Starts work(job) in the background and returns the Job.
+        work reports progress via job.add_partial() and returns the final result.
+        """
+        self._expire()
+        job = Job(kind, total)
+        with self._lock:
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, work)
+        return job
+
+    def _run(self, job, work):
+        job.set_running()
+        try:
+            job.finish(work(job))
+        except Exception as e:
+            print(f"Job {job.id} failed: {e}")
+            job.fail(e)
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _expire(self):
+        now = time.time()
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.finished and now - job.finished_at > self.ttl_seconds]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+
+def sse_events(job, keepalive=15):
+    """
+    Server-Sent Events stream for a job:
+    'partial' per finished unit, 'progress' on every change, then 'done' or 'error'.
+    """
+    sent = 0
+    version = -1
+    while True:
+        version = job.wait_for_change(version, keepalive)
+        data = job.to_dict(since=sent)
+        for item in data["partial_results"]:
+            yield _sse("partial", item)
+        sent = data["next"]
+        yield _sse("progress", {"status": data["status"], **data["progress"]})
+        # Decided from the snapshot: the live job may have finished after it was taken
+        if data["status"] == "done":
+            yield _sse("done", data["result"])
+            return
+        if data["status"] == "error":
+            yield _sse("error", {"error": data["error"]})
+            return
+
+
+def _sse(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
+_default_manager = None
+
+
+def get_job_manager():
+    """Process-wide manager configured from JOB_WORKERS / JOB_TTL_SECONDS."""
+    global _default_manager
+    if _default_manager is None:
+        _default_manager = JobManager(
+            max_workers=int(os.getenv("JOB_WORKERS", 2)),
+            ttl_seconds=int(os.getenv("JOB_TTL_SECONDS", 3600)),
+        )
+    return _default_manager
@@ -0,0 +1,174 @@
+"""
+Content-addressed cache for parser results.
+Keys are the SHA-256 of the uploaded bytes plus the parser name and version,
+so a re-uploaded PDF skips pdfplumber entirely and a parser change
+(bumped PARSER_VERSION) never serves stale results.
+
+Two tiers:
+- in-memory LRU (per process, small, instant)
+- on-disk JSON files with size-based eviction (shared between gunicorn workers)
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from parsers.extraction import DEFAULT_BACKEND
+
+
+def sha256_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def backend_namespace(namespace, backend=None):
+    """Results extracted with a non-default text backend are cached apart from pdfplumber ones."""
+    if not backend or backend == DEFAULT_BACKEND:
+        return namespace
+    return f"{namespace}-{backend}"
+
+
+class ParseCache:
+    def __init__(self, directory, max_bytes=512 * 1024 * 1024, memory_items=512):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.memory_items = memory_items
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes = None  # computed lazily on first write
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def make_key(namespace, digest, version):
+        return f"{namespace}-v{version}-{digest}"
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".json")
+
+    # --- Memory tier ---
+    def _memory_get(self, key):
+        with self._lock:
+            raw = self._memory.get(key)
+            if raw is not None:
+                self._memory.move_to_end(key)
+            return raw
+
+    def _memory_set(self, key, raw):
+        with self._lock:
+            self._memory[key] = raw
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    # --- Disk tier ---
+    def _disk_get(self, key):
+        if not self.directory:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                raw = f.read()
+            os.utime(path)  # mtime doubles as "last used" for eviction
+            return raw
+        except OSError:
+            return None
+
+    def _disk_set(self, key, raw):
+        if not self.directory:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(raw)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Parse cache write failed: {e}")
+            return
+
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = self._scan_disk_bytes()
+            else:
+                self._disk_bytes += len(raw.encode("utf-8"))
+            if self._disk_bytes > self.max_bytes:
+                self._evict()
+
+    def _scan_disk_bytes(self):
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".json"):
+                try:
+                    total += entry.stat().st_size
+                except OSError:
+                    pass
+        return total
+
+    def _evict(self):
+        """Drop least recently used files until we're at 90% of the cap."""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".json"):
+                try:
+                    st = entry.stat()
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+                except OSError:
+                    pass
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._disk_bytes = total
+
+    # --- Public API ---
+    def get(self, namespace, digest, version):
+        """Returns a fresh copy of the cached result, or None."""
+        key = self.make_key(namespace, digest, version)
+        raw = self._memory_get(key)
+        if raw is None:
+            raw = self._disk_get(key)
+            if raw is None:
+                return None
+            self._memory_set(key, raw)
+        return json.loads(raw)
+
+    def set(self, namespace, digest, version, result):
+        # Errors may be transient (I/O, corrupt upload) - never cache them
+        if not isinstance(result, dict) or "error" in result:
+            return
+        key = self.make_key(namespace, digest, version)
+        raw = json.dumps(result, ensure_ascii=False)
+        self._memory_set(key, raw)
+        self._disk_set(key, raw)
+
+    def get_or_compute(self, namespace, digest, version, compute):
+        result = self.get(namespace, digest, version)
+        if result is None:
+            result = compute()
+            self.set(namespace, digest, version, result)
+        return result
+
+
+_default_cache = None
+
+
+def get_parse_cache():
+    """Process-wide cache configured from PARSE_CACHE_* env vars."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ParseCache(
+            os.getenv("PARSE_CACHE_DIR", os.path.join("cache", "parse")),
+            max_bytes=int(os.getenv("PARSE_CACHE_MAX_BYTES", 512 * 1024 * 1024)),
+            memory_items=int(os.getenv("PARSE_CACHE_MEMORY_ITEMS", 512)),
+        )
+    return _default_cache
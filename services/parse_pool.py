@@ -0,0 +1,153 @@
+"""
+Bounded process pool for the CPU-heavy per-file parse step.
+pdfplumber layout analysis is pure Python, so threads don't help - batches
+are spread across worker processes instead.
+
+Workers are started from a forkserver, not forked from the web process: that
+process already runs threads (jobs, the debug capture writer) and holds locks
+(PDFium), and a forked child could inherit a lock held mid-operation.
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+from collections import deque
+from itertools import islice
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+
+log = logging.getLogger(__name__)
+
+_executor = None
+_executor_workers = 0
+_executor_lock = threading.Lock()
+
+# "forkserver" where available (Linux, macOS), else "spawn" (Windows)
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+def default_workers():
+    """Worker count from PDF_PARSE_WORKERS, defaults to all cores."""
+    try:
+        return max(1, int(os.getenv("PDF_PARSE_WORKERS", os.cpu_count() or 1)))
+    except ValueError:
+        return os.cpu_count() or 1
+
+
+def get_executor(workers):
+    """
+    Lazily create (or resize) the shared process pool. Requests and job
+    threads can get here at the same time: only one of them creates it.
+    """
+    global _executor, _executor_workers
+    executor = _executor
+    if executor is None or _executor_workers != workers:
+        with _executor_lock:
+            executor = _executor
+            if executor is None or _executor_workers != workers:
+                if executor is not None:
+                    executor.shutdown(wait=False, cancel_futures=True)
+                executor = ProcessPoolExecutor(max_workers=workers,
+                                               mp_context=multiprocessing.get_context(START_METHOD))
+                _executor, _executor_workers = executor, workers
+    return executor
+
+
+def reset_executor():
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+        _executor_workers = 0
+
+
+def parse_many(parse_fn, items, workers=1, window=None):
+    """
+    Yields parse_fn(item) for every item, always in input order.
+    Keeping the input order is what makes dedup/grouping deterministic no
+    matter which worker finishes first.
+    items is consumed lazily with at most `window` (default 2 * workers)
+    items in flight, as in parse_as_completed. With workers <= 1 (or a list
+    of one item) everything runs in-process.
+    """
+    single = isinstance(items, list) and len(items) < 2
+    items = iter(items)
+    if workers <= 1 or single:
+        for item in items:
+            yield parse_fn(item)
+        return
+
+    window = window or 2 * workers
+    in_flight = deque()  # (future, item), input order
+    try:
+        executor = get_executor(workers)
+        for item in islice(items, window):
+            in_flight.append((executor.submit(parse_fn, item), item))
+        while in_flight:
+            result = in_flight[0][0].result()
+            in_flight.popleft()
+            for next_item in islice(items, 1):
+                in_flight.append((executor.submit(parse_fn, next_item), next_item))
+            yield result
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM kill) - drop the pool and finish in-process
+        log.warning("Parse pool broken, continuing in-process")
+        reset_executor()
+        unfinished = [item for _, item in in_flight]
+        in_flight.clear()
+        for item in unfinished:
+            yield parse_fn(item)
+        for item in items:
+            yield parse_fn(item)
+    finally:
+        for future, _ in in_flight:
+            future.cancel()
+
+
+def parse_as_completed(parse_fn, items, workers=1, window=None):
+    """
+    Yields (position, parse_fn(item)) for every item as soon as it is done -
+    completion order, not input order (position is the index in items).
+    items is consumed lazily with at most `window` (default 2 * workers)
+    items in flight, so payloads such as PDF bytes are only built shortly
+    before they are parsed. With workers <= 1 (or a list of one item)
+    everything runs in-process, in order.
+    Items not started yet are cancelled when the consumer stops early.
+    """
+    single = isinstance(items, list) and len(items) < 2
+    items = enumerate(items)
+    if workers <= 1 or single:
+        for position, item in items:
+            yield position, parse_fn(item)
+        return
+
+    window = window or 2 * workers
+    in_flight = {}  # future -> (position, item)
+    try:
+        executor = get_executor(workers)
+        for position, item in islice(items, window):
+            in_flight[executor.submit(parse_fn, item)] = (position, item)
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                position, _ = in_flight[future]
+                result = future.result()
+                del in_flight[future]
+                for next_position, next_item in islice(items, 1):
+                    in_flight[executor.submit(parse_fn, next_item)] = (next_position, next_item)
+                yield position, result
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM kill) - drop the pool and finish in-process
+        log.warning("Parse pool broken, continuing in-process")
+        reset_executor()
+        for position, item in sorted(in_flight.values(), key=lambda entry: entry[0]):
+            yield position, parse_fn(item)
+        in_flight = {}
+        for position, item in items:
+            yield position, parse_fn(item)
+    finally:
+        for future in in_flight:
+            future.cancel()
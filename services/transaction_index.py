@@ -0,0 +1,171 @@
+"""
+Persistent index of parsed bank confirmations (SQLite) for dedup across
+upload batches of one client.
+
+- by file digest: a re-uploaded confirmation is answered from the index
+  before parsing, the PDF is never opened
+- by transaction signature (date, amount, title, sender - the key
+  group_transactions dedups a batch by): the same transfer in a different file
+
+Matches keep their status and recipient group and are flagged
+previously_uploaded (with when and under which filename they were first seen).
+
+Off unless TRANSACTION_INDEX_PATH is set: rows hold recipients, account
+numbers and titles. Every row belongs to an owner (the client whose case the
+batch is for) and lookups only see that owner's rows - see for_owner().
+
+Rows are unique on (owner, signature, file_digest); both lookups are B-tree
+index seeks, so they stay O(log n) with hundreds of thousands of stored
+transactions. The database (WAL mode) is shared by all gunicorn workers.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY,
+    owner TEXT NOT NULL,
+    signature TEXT NOT NULL,
+    file_digest TEXT NOT NULL,
+    date TEXT,
+    amount REAL,
+    title TEXT,
+    sender TEXT,
+    recipient TEXT,
+    account TEXT,
+    filename TEXT,
+    first_seen TEXT NOT NULL,
+    UNIQUE (owner, signature, file_digest)
+);
+CREATE INDEX IF NOT EXISTS transactions_owner_file_digest ON transactions (owner, file_digest);
+"""
+
+COLUMNS = "date, amount, title, sender, recipient, account, filename, first_seen"
+
+PREVIOUSLY_UPLOADED = "previously_uploaded"
+
+
+def transaction_signature(data):
+    """Hash of (date, amount, title, sender) of a parse_pdf result."""
+    key = [data.get("date"), data.get("amount"), data.get("title"), data.get("sender")]
+    return hashlib.sha256(json.dumps(key, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def mark_previously_uploaded(data, prior):
+    """Copy of a parse result flagged as already stored by an earlier batch (prior: index row)."""
+    data = dict(data, status="success")
+    data[PREVIOUSLY_UPLOADED] = True
+    data["first_seen"] = prior["first_seen"]
+    data["first_filename"] = prior["filename"]
+    return data
+
+
+class TransactionIndex:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()  # sqlite3 connections are per thread
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            columns = [row["name"] for row in conn.execute("PRAGMA table_info(transactions)")]
+            if columns and "owner" not in columns:
+                # Rows stored before lookups were scoped have no owner - no lookup can match them
+                conn.execute("DROP TABLE transactions")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def for_owner(self, owner):
+        """The index as seen by one owner (what parse_confirmations takes)."""
+        return OwnerTransactions(self, owner)
+
+    def find_file(self, owner, digest):
+        """
+        The owner's stored transaction of a confirmation file (by SHA-256 of the
+        upload), as a parse result marked previously_uploaded, or None.
+        """
+        row = self._connection().execute(
+            f"SELECT {COLUMNS} FROM transactions WHERE owner = ? AND file_digest = ? LIMIT 1", (owner, digest)
+        ).fetchone()
+        if row is None:
+            return None
+        data = {key: row[key] for key in ["date", "amount", "title", "sender", "recipient", "account"]}
+        return mark_previously_uploaded(data, row)
+
+    def find_signature(self, owner, signature, exclude_digest=None):
+        """An index row of the owner with this transaction signature from a different file, or None."""
+        return self._connection().execute(
+            f"SELECT {COLUMNS} FROM transactions WHERE owner = ? AND signature = ? AND file_digest != ? LIMIT 1",
+            (owner, signature, exclude_digest or "")
+        ).fetchone()
+
+    def record(self, owner, items):
+        """
+        Stores successfully parsed confirmations of an owner in one transaction.
+        items: (file_digest, filename, parse result) tuples; already stored pairs are skipped.
+        """
+        first_seen = time.strftime("%Y-%m-%d %H:%M:%S")
+        rows = [
+            (owner, transaction_signature(data), digest, data.get("date"), data.get("amount"), data.get("title"),
+             data.get("sender"), data.get("recipient"), data.get("account"), filename, first_seen)
+            for digest, filename, data in items
+        ]
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                f"INSERT OR IGNORE INTO transactions (owner, signature, file_digest, {COLUMNS}) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+
+
+class OwnerTransactions:
+    """TransactionIndex lookups and writes limited to one owner's rows."""
+
+    def __init__(self, index, owner):
+        self.index = index
+        self.owner = owner
+
+    def find_file(self, digest):
+        return self.index.find_file(self.owner, digest)
+
+    def find_signature(self, signature, exclude_digest=None):
+        return self.index.find_signature(self.owner, signature, exclude_digest)
+
+    def record(self, items):
+        self.index.record(self.owner, items)
+
+
+_default_index = None
+_default_lock = threading.Lock()
+
+
+def get_transaction_index():
+    """Process-wide index at TRANSACTION_INDEX_PATH (unset/empty = disabled, returns None)."""
+    global _default_index
+    path = os.getenv("TRANSACTION_INDEX_PATH", "")
+    if not path:
+        return None
+    if _default_index is None:
+        with _default_lock:
+            if _default_index is None:
+                _default_index = TransactionIndex(path)
+    return _default_index
@@ -0,0 +1,227 @@
+"""
+Parsing, deduplication and grouping of bank confirmations (/upload_pdfs).
+"""
+
+from metrics import CONFIRMATIONS, capture_observations, replay_observations
+from parsers.pdf_parser import parse_pdf, PARSER_VERSION
+from services.parse_cache import backend_namespace
+from services.parse_pool import parse_as_completed, parse_many
+from services.transaction_index import mark_previously_uploaded, transaction_signature
+
+
+def _parse_upload(args):
+    # Metrics recorded in a pool worker are sent back with the result
+    source, filename, backend = args
+    with capture_observations() as observed:
+        result = parse_pdf(source, filename, backend=backend)
+        CONFIRMATIONS.inc(status=result.get("status", "error"))
+    return result, observed
+
+
+def _check_index(index, digest, filename, result, new_records):
+    # A transaction stored by an earlier batch from a different file is flagged, new ones get recorded
+    if index is None or result.get("status") != "success":
+        return result
+    prior = index.find_signature(transaction_signature(result), digest)
+    if prior is not None:
+        return mark_previously_uploaded(result, prior)
+    new_records.append((digest, filename, result))
+    return result
+
+
+def _scan_uploads(uploads, cache, namespace, index, new_records):
+    """
+    Splits a batch into results known without parsing (index, cache) and
+    the uploads to parse: returns ({digest: result}, [(digest, filename, upload)]),
+    one entry per distinct digest.
+    """
+    results = {}  # digest -> parsed result
+    to_parse = []  # first occurrence of each digest that needs parsing
+    queued = set()
+    for filename, upload in uploads:
+        digest = upload.digest
+        if digest in results or digest in queued:
+            continue
+        known = index.find_file(digest) if index else None
+        if known is not None:
+            results[digest] = known
+            continue
+        hit = cache.get(namespace, digest, PARSER_VERSION) if cache else None
+        if hit is not None:
+            results[digest] = _check_index(index, digest, filename, hit, new_records)
+        else:
+            to_parse.append((digest, filename, upload))
+            queued.add(digest)
+    return results, to_parse
+
+
+def parse_confirmations(uploads, workers=1, cache=None, backend=None, index=None):
+    """
+    Yields one parse_pdf result per upload, in upload order.
+    uploads: list of (filename, SpooledUpload) tuples.
+    backend: text extraction backend name (None = pdfplumber).
+    Identical files (same digest) are parsed once per batch and cached
+    results are reused without touching the PDF at all.
+    index: TransactionIndex.for_owner(...) - files and transactions the owner
+    stored in earlier batches come back flagged previously_uploaded (known
+    files are not parsed); new transactions are recorded once the batch is done.
+    """
+    namespace = backend_namespace("pdf", backend)
+    new_records = []
+    results, to_parse = _scan_uploads(uploads, cache, namespace, index, new_records)
+    # Sources are read as workers free up, so only the files in flight are loaded at once
+    pending = ((upload.source, filename, backend) for _, filename, upload in to_parse)
+    parsed = parse_many(_parse_upload, pending, workers=workers if len(to_parse) > 1 else 1)
+    next_pending = 0
+    for filename, upload in uploads:
+        digest = upload.digest
+        # Pull from the pool until this upload's result is in (pending keeps upload order)
+        while digest not in results:
+            result, observed = next(parsed)
+            replay_observations(observed)
+            done_digest, done_filename, _ = to_parse[next_pending]
+            next_pending += 1
+            if cache:
+                cache.set(namespace, done_digest, PARSER_VERSION, result)
+            results[done_digest] = _check_index(index, done_digest, done_filename, result, new_records)
+        data = dict(results[digest])
+        data["filename"] = filename
+        yield data
+
+    if new_records:
+        index.record(new_records)
+
+
+def parse_confirmations_as_completed(uploads, workers=1, cache=None, backend=None, index=None):
+    """
+    Streaming variant of parse_confirmations: yields (position, result) as
+    soon as each upload's result is ready - known/cached files first, then
+    parsed ones in completion order (position is the index in uploads).
+    PDF bytes are read only shortly before parsing (a few per worker in
+    flight), so the caller can discard each upload once its result is out.
+    Sort by position before group_transactions to keep grouping deterministic.
+    """
+    namespace = backend_namespace("pdf", backend)
+    new_records = []
+    results, to_parse = _scan_uploads(uploads, cache, namespace, index, new_records)
+    positions = {}  # digest -> positions of every upload with that digest
+    for position, (_, upload) in enumerate(uploads):
+        positions.setdefault(upload.digest, []).append(position)
+
+    def emit(digest):
+        for position in positions[digest]:
+            data = dict(results[digest])
+            data["filename"] = uploads[position][0]
+            yield position, data
+
+    for digest in list(results):
+        yield from emit(digest)
+
+    pending = ((upload.source, filename, backend) for _, filename, upload in to_parse)
+    for i, (result, observed) in parse_as_completed(_parse_upload, pending, workers=workers):
+        replay_observations(observed)
+        digest, filename, _ = to_parse[i]
+        if cache:
+            cache.set(namespace, digest, PARSER_VERSION, result)
+        results[digest] = _check_index(index, digest, filename, result, new_records)
+        yield from emit(digest)
+
+    if new_records:
+        index.record(new_records)
+
+
+def group_transactions(results):
+    """
+    Takes parse_pdf results in upload order and returns the
+    { recipient: { "YYYY-MM": [items] } } structure served to the frontend.
+    """
+    # Deduplication set
+    seen_transactions = set()
+    unique_results = []
+
+    # Pre-scan to map Account -> Canonical Name
+    # Priority: if we have "Julia Latko" and "Julia Kuczyńska" for same account,
+    # we ideally want the latest one or similar.
+    # For simplicity, we'll store all names seen for an account and pick one (e.g. longest or sorted).
+    account_names_map = {} # { "1234...": set(["Julia Latko", "Julia Kuczyńska"]) }
+
+    for data in results:
+        # Deduplication
+        if data['status'] == 'success':
+            sig = (data.get('date'), data.get('amount'), data.get('title'), data.get('sender'))
+            if sig in seen_transactions:
+                data['status'] = 'duplicate'
+                continue
+            seen_transactions.add(sig)
+
+        if data['status'] == 'success':
+            # Account mapping
+            acc = data.get('account')
+            name = data.get('recipient')
+            if acc and acc != "Brak Numeru Konta" and name and name != "Nieznany Odbiorca":
+                if acc not in account_names_map:
+                    account_names_map[acc] = set()
+                account_names_map[acc].add(name)
+
+        unique_results.append(data)
+
+    # Resolve Canonical Names for Accounts
+    # Heuristic: Pick the name that appears most often? Or just sort and pick last?
+    # Let's pick the longest name as it might be most complete? Or just alphabetical.
+    resolved_account_names = {}
+    for acc, names in account_names_map.items():
+        # Clean names (strip whitespace)
+        valid_names = [n for n in names if len(n) > 3]
+        if valid_names:
+            # Sort valid names to have deterministic output.
+            # If we wanted "latest", we'd need parsing order which is random-ish here without dates.
+            # Let's just pick one.
+            resolved_account_names[acc] = sorted(valid_names)[0]
+        else:
+            resolved_account_names[acc] = "Nieznany Właściciel"
+
+    # Grouping Logic
+    grouped_data = {}
+
+    for item in unique_results:
+        recipient = item.get('recipient', 'Nieznany Odbiorca')
+        acc = item.get('account')
+
+        # Override recipient name IF we have a resolved name for this account
+        if acc in resolved_account_names:
+            # We append the account number for clarity in UI?
+            # Or just use the resolved name. User wants to merge them.
+            canonical_name = resolved_account_names[acc]
+            # Let's format it: "NAME (Account...)" to be sure
+            # short_acc = acc[-4:] if len(acc) > 4 else acc
+            # recipient = f"{canonical_name} (....{short_acc})"
+            recipient = canonical_name
+
+        if item.get('status') == 'error':
+            recipient = 'Pliki Nieprzetworzone'
+
+        date = item.get('date', '')
+        month_key = "Nieznana Data"
+        if date and len(date) >= 7:
+            month_key = date[:7] # 2024-12
+
+        if recipient not in grouped_data:
+            grouped_data[recipient] = {}
+
+        if month_key not in grouped_data[recipient]:
+            grouped_data[recipient][month_key] = []
+
+        # Add the account info to item display if needed, already in item['account']
+        grouped_data[recipient][month_key].append(item)
+
+    # Sort Recipients
+    sorted_recipients = sorted(grouped_data.keys())
+
+    # Sort Months
+    final_structure = {}
+    for rec in sorted_recipients:
+        months = grouped_data[rec]
+        sorted_months = sorted(months.keys(), reverse=True)
+        final_structure[rec] = {m: months[m] for m in sorted_months}
+
+    return final_structure
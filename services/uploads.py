@@ -0,0 +1,91 @@
+"""
+In-memory upload handling.
+Uploaded files stay in a BytesIO and are handed straight to the parsers.
+Only files above UPLOAD_SPOOL_MAX_BYTES spill to a private temp file,
+which is deleted as soon as the request closes its files.
+"""
+
+import hashlib
+import io
+import os
+import tempfile
+
+from flask import Request, current_app
+
+
+DEFAULT_SPOOL_MAX_BYTES = 16 * 1024 * 1024
+
+
+class SpooledUpload:
+    """
+    Writable/readable file object for one uploaded file.
+    Hashes the bytes while werkzeug writes them, so the cache key is
+    known without a second read.
+    """
+
+    def __init__(self, max_memory=DEFAULT_SPOOL_MAX_BYTES):
+        self._file = io.BytesIO()
+        self._max_memory = max_memory
+        self._sha256 = hashlib.sha256()
+        self._kept = False
+        self.path = None  # set once spilled to disk
+
+    def write(self, data):
+        if self.path is None and self._file.tell() + len(data) > self._max_memory:
+            self._spill()
+        self._sha256.update(data)
+        return self._file.write(data)
+
+    def _spill(self):
+        # delete=True: the OS file goes away with close(), even on errors
+        spill = tempfile.NamedTemporaryFile(prefix="upload-", suffix=".pdf")
+        spill.write(self._file.getvalue())
+        self._file = spill
+        self.path = spill.name
+
+    @property
+    def digest(self):
+        return self._sha256.hexdigest()
+
+    @property
+    def source(self):
+        """What the parsers (and pool workers) get: raw bytes, or the spill file path."""
+        if self.path:
+            self._file.flush()
+            return self.path
+        return self._file.getvalue()
+
+    def keep_open(self):
+        """
+        Survive the end of the request (Flask closes request files).
+        Used by background jobs, which must call discard() when done.
+        """
+        self._kept = True
+        return self
+
+    def close(self):
+        if not self._kept:
+            self._file.close()
+
+    def discard(self):
+        self._kept = False
+        self.close()
+
+    def __getattr__(self, name):
+        # read/seek/tell/readline/flush... go to the underlying file
+        return getattr(self._file, name)
+
+
+class UploadRequest(Request):
+    """Flask request class that keeps file uploads in SpooledUpload buffers."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        max_memory = current_app.config.get("UPLOAD_SPOOL_MAX_BYTES", DEFAULT_SPOOL_MAX_BYTES)
+        return SpooledUpload(max_memory)
+
+
+def spool_max_bytes():
+    try:
+        return int(os.getenv("UPLOAD_SPOOL_MAX_BYTES", DEFAULT_SPOOL_MAX_BYTES))
+    except ValueError:
+        return DEFAULT_SPOOL_MAX_BYTES
@@ -0,0 +1,43 @@
+"""
+Worker warm-up: parses a bundled one-page confirmation before the first
+real request, so pdfminer/PDFium are loaded and their font and encoding
+caches are filled at boot instead of on a user's upload.
+
+Enabled with WARMUP=1 (create_app runs it). With `gunicorn --preload` it
+runs once in the master and the forked workers inherit the warm state.
+"""
+
+import os
+import time
+
+from metrics import capture_observations
+from parsers.extraction import iter_page_texts
+from parsers.pdf_parser import parse_pdf
+
+
+FIXTURE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "warmup_confirmation.pdf")
+
+
+def warmup_enabled():
+    return os.getenv("WARMUP", "0") == "1"
+
+
+def warm_up(backends):
+    """
+    Runs the fixture through every text backend in backends (parse_pdf with
+    the first one). Returns the seconds it took; failures are logged, not raised.
+    """
+    start = time.perf_counter()
+    with open(FIXTURE_PATH, "rb") as f:
+        data = f.read()
+    # Observations are buffered and dropped - warm-up isn't traffic
+    with capture_observations():
+        try:
+            parse_pdf(data, "warmup.pdf", backend=backends[0])
+            for backend in dict.fromkeys(backends):
+                list(iter_page_texts(data, backend))
+        except Exception as e:
+            print(f"Warm-up failed: {e}")
+    elapsed = time.perf_counter() - start
+    print(f"Warm-up done in {elapsed:.2f}s ({', '.join(dict.fromkeys(backends))})")
+    return elapsed
@@ -0,0 +1,31 @@
+"""
+Cold start: importing the app leaves the heavy parser dependencies unloaded,
+create_app() builds independent apps and WARMUP=1 warms them up at boot.
+"""
+
+import subprocess
+import sys
+
+import app as app_module
+from services import warmup
+
+
+def test_import_does_not_load_heavy_libraries():
+    code = ("import sys, app; "
+            "print(sorted(m for m in ('pandas', 'openai', 'pdfplumber', 'pdfminer', 'pypdfium2') if m in sys.modules))")
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert out.strip().splitlines()[-1] == "[]"
+
+
+def test_create_app_with_warmup(monkeypatch):
+    calls = []
+    monkeypatch.setattr(app_module, "warm_up", lambda backends: calls.append(backends))
+    monkeypatch.setenv("WARMUP", "1")
+    first, second = app_module.create_app(), app_module.create_app()
+    assert first is not second
+    assert calls == [["pdfium", "pdfplumber"]] * 2
+    assert first.test_client().get("/metrics").status_code == 200
+
+
+def test_warm_up_parses_fixture(monkeypatch):
+    assert warmup.warm_up(["pdfium", "pdfplumber"]) > 0
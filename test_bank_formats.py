@@ -0,0 +1,102 @@
+"""
+Bank confirmation formats (parsers.bank_formats): detection over all
+registered banks and field extraction through the combined label regex.
+"""
+
+import re
+
+import pytest
+
+import parsers.bank_formats as bank_formats
+from benchmarks.corpus import render_pdf, synthesize_confirmation_text
+from parsers.bank_formats import BankFormat, Field, bank_format_names, detect_bank_format, register_bank_format
+from parsers.pdf_parser import parse_pdf
+
+
+def labelled(text, label):
+    """Value after `label:` on its line of the fixture."""
+    return re.search(rf"^{label}:\s*(.*)$", text, re.MULTILINE).group(1)
+
+
+@pytest.mark.parametrize("bank", ["mBank", "Pekao"])
+def test_detects_each_format(bank):
+    for i in range(5):
+        assert detect_bank_format(synthesize_confirmation_text(i, bank)).name == bank
+
+
+def test_detection_priority_and_unknown_text():
+    assert bank_format_names()[:2] == ["mBank", "Pekao"]
+    # Registration order decides, not the position in the text
+    assert detect_bank_format("Przelew z Pekao na konto w mBank").name == "mBank"
+    assert detect_bank_format("Bank Pekao S.A.\nmbank (wrong case)").name == "Pekao"
+    assert detect_bank_format("ING Bank Śląski") is None
+
+
+@pytest.mark.parametrize("i", range(5))
+def test_mbank_fields(i):
+    text = synthesize_confirmation_text(i, "mBank")
+    fields = detect_bank_format(text).extract(text)
+    assert fields == {
+        "amount": float(labelled(text, "Kwota przelewu").replace("PLN", "").replace(",", ".")),
+        "date": labelled(text, "Data operacji"),
+        "recipient": "JULIA LATKO",
+        "sender": "PRACODAWCA SP Z O O",
+        "title": labelled(text, "Tytuł operacji"),
+        "account_number": labelled(text, "Rachunek odbiorcy").replace(" ", ""),
+    }
+
+
+@pytest.mark.parametrize("i", range(5))
+def test_pekao_fields(i):
+    text = synthesize_confirmation_text(i, "Pekao")
+    fields = detect_bank_format(text).extract(text)
+    day, month, year = labelled(text, "Data księgowania").split("/")
+    assert fields == {
+        "amount": float(labelled(text, "Kwota uznania").replace(" PLN", "").replace(",", ".")),
+        "date": f"{year}-{month}-{day}",
+        "recipient": "JAN KOWALSKI",
+        "account_number": labelled(text, "Numer rachunku").replace(" ", ""),
+        "title": labelled(text, "Tytuł"),
+    }
+
+
+def test_labels_without_spaces_and_account_fallback():
+    # pdfplumber drops the spaces of some labels; no "Rachunek odbiorcy" -> first 26-digit run
+    text = "mBank\nKwotaprzelewu: 3 376,53PLN\nDataoperacji: 2024-12-10\nOdbiorca: X\n" \
+           "Nr: 12 1140 2004 0000 3102 7654 3210"
+    fields = detect_bank_format(text).extract(text)
+    assert fields["amount"] == 3376.53 and fields["date"] == "2024-12-10"
+    assert fields["account_number"] == "12114020040000310276543210"
+
+
+def test_field_alternatives_keep_list_order():
+    # "Kwota uznania" wins over "Kwota operacji" even when it comes later in the text
+    text = "Pekao\nKwota operacji: 10,00 PLN\nKwota uznania: 1.250,00 PLN"
+    assert detect_bank_format(text).extract(text)["amount"] == 1250.0
+    # A label whose value does not match is skipped for the next occurrence
+    text = "Pekao\nKwota uznania: brak\nKwota uznania: 99,90 PLN"
+    assert detect_bank_format(text).extract(text)["amount"] == 99.9
+
+
+def test_register_bank_format(monkeypatch):
+    monkeypatch.setattr(bank_formats, "BANK_FORMATS", list(bank_formats.BANK_FORMATS))
+    monkeypatch.setattr(bank_formats, "_detector", bank_formats._detector)
+    register_bank_format(BankFormat(
+        "Test Bank", detect=["TESTBANK", "Bank Testowy"],
+        fields=[Field("amount", r"Suma:", r"\s*(\d+)")],
+        build=lambda values, text: {"amount": float(values["amount"])} if "amount" in values else {},
+    ))
+    assert detect_bank_format("Bank Testowy\nSuma: 12").extract("Suma: 12") == {"amount": 12.0}
+    assert detect_bank_format("TESTBANK mBank").name == "mBank"
+    assert bank_format_names()[-1] == "Test Bank"
+
+
+@pytest.mark.parametrize("bank", ["mBank", "Pekao"])
+def test_parse_pdf(bank):
+    text = synthesize_confirmation_text(3, bank)
+    result = parse_pdf(render_pdf([text.split("\n")]), "c.pdf")
+    expected = detect_bank_format(text).extract(text)
+    assert result["status"] == "success"
+    assert (result["amount"], result["date"], result["account"]) == \
+        (expected["amount"], expected["date"], expected["account_number"])
+    assert parse_pdf(render_pdf([["Bank XYZ", "Kwota: 1 PLN"]]), "x.pdf")["error"].startswith("Nie rozpoznano")
@@ -1,4 +1,5 @@
 
+from parsers.bik_models import Report
 from parsers.bik_parser import parse_liabilities
 import json
 
@@ -9,12 +10,9 @@ SANTANDER CONSUMER BANK
 """
 
 def test():
-    analysis = {
-        "active_liabilities": [],
-        "summary": {"total_installment": 0.0, "total_limits": 0.0, "mortgage_installment": 0.0}
-    }
-    parse_liabilities(sample_text, analysis["active_liabilities"], analysis)
-    print(json.dumps(analysis["active_liabilities"], indent=2, ensure_ascii=False))
+    analysis = Report()
+    parse_liabilities(sample_text, analysis.active_liabilities, analysis)
+    print(json.dumps([item.to_dict() for item in analysis.active_liabilities], indent=2, ensure_ascii=False))
 
 if __name__ == "__main__":
     test()
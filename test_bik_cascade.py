@@ -0,0 +1,58 @@
+"""
+Native -> regex cascade (parsers.bik_cascade) over one extraction.
+"""
+
+import pytest
+
+from benchmarks.corpus import load_fixture_text, split_pages, synthesize_bik_text
+from parsers.bik_cascade import ReportPages, run_cascade, TIERS, ACCEPT_CONFIDENCE
+from parsers.bik_native_parser import STOP_MARKER, parse_bik_native, parse_bik_native_pages
+
+
+def counted_pages(text, pulls):
+    for page in split_pages(text):
+        pulls.append(page)
+        yield page
+
+
+def test_native_result_is_accepted():
+    best, results = run_cascade(ReportPages(split_pages(load_fixture_text("debug_pdf_text.txt"))))
+    assert [r.parser_type for r in results] == ["NATIVE"]
+    assert best.confidence >= ACCEPT_CONFIDENCE
+    assert best.analysis["active_liabilities"]
+
+
+@pytest.mark.parametrize("text", [
+    load_fixture_text("debug_beata.txt"),
+    synthesize_bik_text(5, 3, seed=1),
+], ids=["beata", "synthetic"])
+def test_native_parser_stops_at_the_inquiries_page(text):
+    pages = split_pages(text)
+    marker_page = next(i for i, page in enumerate(pages) if STOP_MARKER in page.split("\n"))
+    assert marker_page < len(pages) - 1
+    pulls = []
+    result = parse_bik_native_pages(counted_pages(text, pulls))
+    # Pages after "Zapytania kredytowe w BIK" are never pulled, so never extracted
+    assert pulls == pages[:marker_page + 1]
+    assert result == parse_bik_native(text)
+
+
+def test_fallback_reuses_extracted_pages():
+    text = load_fixture_text("debug_pdf_text.txt")
+    pulls = []
+
+    def failing_native(report):
+        list(report)  # reads every page, as a native parser failing late would
+        raise ValueError("boom")
+
+    best, results = run_cascade(ReportPages(counted_pages(text, pulls)),
+                                tiers=[("NATIVE", failing_native)] + TIERS[1:])
+    assert [(r.parser_type, r.error) for r in results] == [("NATIVE", "boom"), ("REGEX_FALLBACK", None)]
+    assert best.parser_type == "REGEX_FALLBACK"
+    assert len(pulls) == len(split_pages(text))  # every page extracted exactly once
+
+
+def test_most_confident_tier_wins():
+    best, results = run_cascade(ReportPages(["hello\nworld"]))
+    assert len(results) == 2
+    assert best.parser_type == "NATIVE"  # nothing found by either tier - ties keep the first
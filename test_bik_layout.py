@@ -0,0 +1,90 @@
+"""
+Active summary table read from pdfplumber word boxes (parsers.bik_layout)
+versus the text path of the native parser.
+"""
+
+import pytest
+
+from benchmarks.corpus import load_fixture_text, render_pdf, render_text_pdf, synthesize_bik_text
+from parsers.bik_layout import ActiveTableReader
+from parsers.bik_native_parser import parse_bik_native_pages
+from parsers.extraction import iter_page_texts
+from services.bik import analyze_bik
+
+
+def report_head(name, lines=150):
+    """The fixture's first pages (header and active summary) - the rest only costs extraction time."""
+    return "\n".join(load_fixture_text(name).split("\n")[:lines])
+
+
+def read(pdf):
+    reader = ActiveTableReader()
+    pages = list(iter_page_texts(pdf, "pdfplumber", on_page=reader))
+    layout = parse_bik_native_pages(pages, reader)["active_liabilities"]
+    return layout, parse_bik_native_pages(pages)["active_liabilities"]
+
+
+@pytest.mark.parametrize("text", [
+    report_head("debug_pdf_text.txt"),
+    report_head("debug_beata.txt"),
+    synthesize_bik_text(30, 2, seed=5),  # table over two pages, page number inside it
+], ids=["fixture", "beata", "two_pages"])
+def test_layout_rows_match_text_path(text):
+    layout, text_path = read(render_text_pdf(text))
+    assert layout and len(layout) == len(text_path)
+    for row, reference in zip(layout, text_path):
+        # Wrapped lender names are read whole ("MBANK WYDZIAŁ BANKOWOŚCI ELEKTRONICZNEJ")
+        assert row["bank"].startswith(reference["bank"])
+        assert dict(row, bank=None) == dict(reference, bank=None)
+
+
+def test_table_columns_are_read_from_word_positions():
+    def row(x_texts):
+        return [(x, text) for x, text in x_texts if text]
+
+    header = ["Raport BIK", "Zobowiązania finansowe - w trakcie spłaty",
+              row([(220, "Zawarcie"), (280, "Pierwotna"), (350, "Pozostało"), (420, "Kwota"), (470, "Suma"),
+                   (530, "Ostatnia")]),
+              row([(40, "Typ umowy"), (280, "kwota"), (350, "do spłaty"), (420, "raty"), (470, "zaległości"),
+                   (530, "płatność")])]
+    table = [
+        "Kredyt odnawialny",
+        row([(40, "MBANK WYDZIAŁ BANKOWOŚCI"), (220, "21.07.2017"), (280, "20.000 PLN"), (350, "0"), (420, "ND"),
+             (470, "BRAK"), (530, "01.06.2025")]),
+        "ELEKTRONICZNEJ",
+        "Kredyt mieszkaniowy",
+        row([(220, "08.01.2020"), (280, "350.000 PLN"), (350, "301.250 PLN"), (420, "2.316 PLN"), (470, "BRAK")]),
+        "BANK SPÓŁDZIELCZY W RAWIE",  # not a known lender - still the lender column
+        "MAZOWIECKIEJ",
+        "Karta kredytowa",
+        row([(40, "CITI HANDLOWY"), (220, "05.02.2016"), (280, "8.000 PLN"), (350, "1.054 PLN"), (420, "ND"),
+             (470, "BRAK")]),
+        row([(40, "Łącznie"), (280, "378.000 PLN"), (350, "302.304 PLN"), (420, "2.316 PLN"), (470, "BRAK")]),
+    ]
+    layout, _ = read(render_pdf([header + table]))
+    assert [(l["bank"], l["type"], l["original_amount"], l["amount_left"], l["installment"], l["limit"])
+            for l in layout] == [
+        ("MBANK WYDZIAŁ BANKOWOŚCI ELEKTRONICZNEJ", "Kredyt odnawialny", 20000.0, 0.0, 0.0, 20000.0),
+        ("BANK SPÓŁDZIELCZY W RAWIE MAZOWIECKIEJ", "Kredyt hipoteczny", 350000.0, 301250.0, 2316.0, 0),
+        ("CITI HANDLOWY", "Karta kredytowa", 8000.0, 1054.0, 0.0, 8000.0),
+    ]
+
+
+def test_analyze_bik_uses_layout_on_pdfplumber_only():
+    pdf = render_text_pdf(report_head("debug_beata.txt"))
+    banks = {backend: [l["bank"] for l in analyze_bik(pdf, "d", backend=backend)["active_liabilities"]]
+             for backend in ["pdfplumber", "pdfium"]}
+    assert "MBANK WYDZIAŁ BANKOWOŚCI ELEKTRONICZNEJ" in banks["pdfplumber"]
+    assert "MBANK WYDZIAŁ BANKOWOŚCI" in banks["pdfium"]
+
+
+def test_unreadable_pages_leave_the_text_path():
+    class Page:
+        def search(self, pattern):
+            raise ValueError("no text map")
+
+    reader = ActiveTableReader()
+    reader(Page(), "Zobowiązania finansowe - w trakcie spłaty")
+    assert reader.failed and reader.liabilities() is None
+    # Pages before the table are not searched
+    assert ActiveTableReader()(Page(), "Wskaźnik BIK") is None
@@ -0,0 +1,45 @@
+"""
+The native, regex and LLM BIK parsers return the same schema (parsers.bik_models).
+"""
+
+from benchmarks.corpus import load_fixture_text, synthesize_bik_text
+from parsers.bik_llm_parser import _normalize
+from parsers.bik_models import Liability, Report
+from parsers.bik_native_parser import parse_bik_native
+from parsers.bik_parser import parse_bik_text
+
+
+def shape(analysis):
+    """Keys of the report, its nested dicts and of every liability/alert."""
+    keys = {"": sorted(analysis)}
+    for key in ["personal_data", "summary"]:
+        keys[key] = sorted(analysis[key])
+    for key in ["active_liabilities", "closed_liabilities", "statistical_liabilities", "alerts"]:
+        for item in analysis[key]:
+            keys.setdefault(key, sorted(item))
+            assert sorted(item) == keys[key], key
+    return keys
+
+
+def test_parsers_share_one_schema():
+    text = synthesize_bik_text(12, 30, seed=3)
+    native, regex = parse_bik_native(text), parse_bik_text(text)
+    llm = _normalize({
+        "personal_data": {"name": "JAN KOWALSKI", "pesel": "90010112345", "date": "2025-06-11", "score": "52 / 100"},
+        "active_liabilities": [{"bank": "PKO BP", "type": "Kredyt", "installment": "159 PLN", "status": "x"}],
+        "closed_liabilities": [{"bank": "ALIOR BANK", "max_delay_days": 12}],
+    })
+    assert native["active_liabilities"] and native["alerts"] and regex["alerts"]
+    reference = shape(Report(active_liabilities=[Liability()], closed_liabilities=[Liability()],
+                             statistical_liabilities=[Liability()]).to_dict())
+    for analysis in [native, regex, llm, parse_bik_native(load_fixture_text("debug_beata.txt"))]:
+        keys = shape(analysis)
+        assert {k: v for k, v in keys.items() if k != "alerts"} == \
+               {k: v for k, v in reference.items() if k in keys}
+        if "alerts" in keys:
+            assert keys["alerts"] == ["bank", "level", "message", "msg", "severity", "type"]
+
+    assert llm["score"] == 52 and llm["personal_data"]["report_date"] == "2025-06-11"
+    assert llm["active_liabilities"][0]["installment"] == 159.0
+    assert llm["closed_liabilities"][0]["delays"] == ["12 dni"]
+    assert native["parser_type"] == "NATIVE" and llm["parser_type"] == "LLM"
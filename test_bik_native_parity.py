@@ -0,0 +1,296 @@
+"""
+The native BIK parser's lender matcher (parsers.lenders), line tokenizer
+and HistoryIndex replaced per-line name scans, regex section detection and
+windowed history rescans; results must stay identical to that code, kept
+below as the reference.
+"""
+
+import random
+import re
+from itertools import chain, islice
+
+import pytest
+
+from benchmarks.corpus import BANKS, load_fixture_text, synthesize_bik_text
+from parsers.bik_native_parser import (
+    HEADER_LINES, STOP_MARKER, HistoryIndex, _bank_line_in_context, _mentions_active_lender, parse_bik_native
+)
+from parsers.lenders import (
+    ACTIVE_SECTION_LENDERS, CLOSED_SECTION_LENDERS, LENDERS, POZABANKOWE_LENDERS, find_lenders, is_pozabankowe
+)
+
+
+# --- Reference: the parser before the lender matcher, tokenizer and history index ---
+
+def legacy_mentions(names, text):
+    return any(name.upper() in text.upper() for name in names)
+
+
+def legacy_bank_line_in_context(context):
+    for name in CLOSED_SECTION_LENDERS:
+        if name.upper() in context.upper():
+            # Get the full line containing the bank name
+            for line in context.split('\n'):
+                if name.upper() in line.upper():
+                    return line.strip()
+            break
+    return "Nieznany Bank"
+
+
+LEGACY_DELAY_PATTERN = re.compile(r'\d{2}\.\d{2}\.\d{4}\s+[\d.,]+\s*(?:PLN)?\s+[\d.,]+\s*(?:PLN)?\s+(\d+)')
+
+
+def legacy_delays(text, start_pos, size=3000):
+    return [int(m.group(1)) for m in LEGACY_DELAY_PATTERN.finditer(text[start_pos:start_pos + size])]
+
+
+def legacy_extract_max_delay(text, start_pos, size=3000):
+    return max(legacy_delays(text, start_pos, size), default=0)
+
+
+def legacy_sections(lines):
+    section_markers = {
+        "active": r'Zobowiązania finansowe.*w trakcie spłaty',
+        "closed": r'Zobowiązania finansowe.*zamknięte',
+        "statistical": r'Zobowiązania.*przetwarzane w celach statystycznych'
+    }
+    current_section = None
+    section_lines = {"active": [], "closed": [], "statistical": []}
+    for i, line in enumerate(lines):
+        if line.strip() == STOP_MARKER:
+            break
+        if re.search(section_markers["statistical"], line, re.IGNORECASE):
+            current_section = "statistical"
+        elif re.search(section_markers["closed"], line, re.IGNORECASE):
+            current_section = "closed"
+        elif re.search(section_markers["active"], line, re.IGNORECASE):
+            current_section = "active"
+        elif current_section:
+            section_lines[current_section].append((i, line))
+    return section_lines
+
+
+def legacy_active_section(section_lines):
+    limit_based_types = ["kredyt odnawialny", "karta kredytowa", "debet", "limit"]
+    summary_end_idx = len(section_lines)
+    for idx, (line_num, line) in enumerate(section_lines):
+        if line.strip().startswith("Łącznie"):
+            summary_end_idx = idx
+            break
+        if "Informacje szczegółowe" in line or "Historia spłaty" in line:
+            summary_end_idx = idx
+            break
+    lines_list = section_lines[:summary_end_idx]
+
+    def to_float(s):
+        try:
+            return float(s.replace('.', '').replace(',', '.'))
+        except ValueError:
+            return 0.0
+
+    liabilities = []
+    current_type = "Kredyt"
+    pending_bank = None
+    for idx, (line_num, line) in enumerate(lines_list):
+        line_clean = line.strip()
+        if not line_clean:
+            continue
+        if "kredyt odnawialny" in line_clean.lower():
+            current_type = "Kredyt odnawialny"
+            continue
+        elif "karta kredytowa" in line_clean.lower():
+            current_type = "Karta kredytowa"
+            continue
+        elif "kredyt gotówkowy" in line_clean.lower() or "pożyczka" in line_clean.lower():
+            current_type = "Kredyt gotówkowy"
+            continue
+        elif "kredyt mieszkaniowy" in line_clean.lower() or "hipot" in line_clean.lower():
+            current_type = "Kredyt hipoteczny"
+            continue
+        date_match = re.search(r'\d{2}\.\d{2}\.\d{4}', line_clean)
+        amounts = []
+        if date_match:
+            after_date = line_clean[date_match.end():].strip()
+            amounts.extend(re.findall(r'([\d.,]+)\s*PLN', after_date))
+            amounts.extend(re.findall(r'\b(0)\s+(?:ND|BRAK|PLN|\d)', after_date))
+        if date_match and len(amounts) >= 2:
+            original_amount = to_float(amounts[0])
+            amount_left = to_float(amounts[1])
+            installment = to_float(amounts[2]) if len(amounts) > 2 else 0.0
+            bank = "Nieznany Bank"
+            before_date = line_clean[:date_match.start()].strip()
+            if before_date and legacy_mentions(ACTIVE_SECTION_LENDERS, before_date):
+                bank = before_date
+            if bank == "Nieznany Bank" and idx + 1 < len(lines_list):
+                next_line = lines_list[idx + 1][1].strip()
+                if legacy_mentions(ACTIVE_SECTION_LENDERS, next_line):
+                    bank = next_line
+            if bank == "Nieznany Bank" and pending_bank:
+                bank = pending_bank
+            is_limit_based = any(lt in current_type.lower() for lt in limit_based_types)
+            liabilities.append({
+                "bank": bank, "type": current_type, "installment": installment, "amount_left": amount_left,
+                "limit": original_amount if is_limit_based else 0, "original_amount": original_amount,
+                "is_limit_based": is_limit_based, "max_delay_status": "OK", "max_delay_days": 0, "delays": ["OK"]
+            })
+            current_type = "Kredyt"
+            pending_bank = None
+        elif legacy_mentions(ACTIVE_SECTION_LENDERS, line_clean) and not date_match:
+            pending_bank = line_clean
+    if not liabilities:
+        liabilities = legacy_active_alternate(section_lines)
+    return liabilities
+
+
+def legacy_active_alternate(section_lines):
+    liabilities = []
+    full_text = '\n'.join([line for _, line in section_lines])
+    bank_names = re.findall(r'^([A-ZĄĆĘŁŃÓŚŹŻ][A-ZĄĆĘŁŃÓŚŹŻ\s]+(?:BANK|CONSUMER BANK|BANKOWOŚCI))$', full_text,
+                            re.MULTILINE)
+    for bank in bank_names:
+        rata_match = re.search(rf'{re.escape(bank)}.*?(\d+)\s*PLN.*?Kredytobiorca.*?([\d.,]+)\s*PLN\s+([\d.,]+)\s*PLN',
+                               full_text, re.DOTALL)
+        if rata_match:
+            def to_float(s):
+                return float(s.replace('.', '').replace(',', '.'))
+
+            liabilities.append({
+                "bank": bank.strip(), "type": "Kredyt", "installment": to_float(rata_match.group(1)),
+                "amount_left": to_float(rata_match.group(3)), "limit": to_float(rata_match.group(2)),
+                "max_delay_status": "OK", "max_delay_days": 0, "delays": ["OK"]
+            })
+    return liabilities
+
+
+def legacy_ended_section(section_lines, entry_pattern, liability_type, strip_amounts):
+    """parse_closed_section / parse_statistical_section (same body, different entry pattern)."""
+    liabilities = []
+    full_text = '\n'.join([line for _, line in section_lines])
+    for match in entry_pattern.finditer(full_text):
+        context = full_text[max(0, match.start() - 200):match.start()]
+        bank = legacy_bank_line_in_context(context)
+        if strip_amounts:
+            bank = re.sub(r'\s+\d+.*$', '', bank)
+        bank = re.sub(r'\s+(Kredyt|Karta|Pożyczka).*$', '', bank, flags=re.IGNORECASE)
+        max_delay = legacy_extract_max_delay(full_text, match.end())
+        status = f"{max_delay} dni" if max_delay > 0 else "OK"
+        liabilities.append({"bank": bank, "type": liability_type, "closing_date": match.group(match.lastindex),
+                            "max_delay_days": max_delay, "max_delay_status": status, "delays": [status]})
+    return liabilities
+
+
+CLOSED_ENTRY = re.compile(r'z dn\.\s*(\d{2}\.\d{2}\.\d{4})\s*([\d.,]+)\s*PLN\s*'
+                          r'umowa zakończona dn\.\s*(\d{2}\.\d{2}\.\d{4})', re.IGNORECASE)
+STATISTICAL_ENTRY = re.compile(r'([\d.,]+)\s*PLN\s*umowa zakończona dn\.\s*(\d{2}\.\d{2}\.\d{4})', re.IGNORECASE)
+
+
+def legacy_liabilities(text):
+    lines = iter(text.split('\n'))
+    sections = legacy_sections(chain(list(islice(lines, HEADER_LINES)), lines))
+    result = {
+        "active_liabilities": legacy_active_section(sections["active"]),
+        "closed_liabilities": legacy_ended_section(sections["closed"], CLOSED_ENTRY, "Kredyt zamknięty", False),
+        "statistical_liabilities": legacy_ended_section(sections["statistical"], STATISTICAL_ENTRY, "Statystyczny", True),
+    }
+    for key in ("active_liabilities", "closed_liabilities"):
+        for liability in result[key]:
+            if legacy_mentions(POZABANKOWE_LENDERS, liability["bank"]):
+                liability["is_pozabankowe"] = True
+    return result
+
+
+# --- Inputs: fixtures, synthetic reports, and fixtures with lines dropped/repeated ---
+
+def mangled(text, seed):
+    rnd = random.Random(seed)
+    out = []
+    for line in text.split('\n'):
+        roll = rnd.random()
+        if roll < 0.1:
+            continue
+        out.append(line)
+        if roll > 0.95:
+            out.append(rnd.choice([line, "", "Łącznie", rnd.choice(BANKS)]))
+    return '\n'.join(out)
+
+
+FIXTURES = {name: load_fixture_text(name) for name in ["debug_pdf_text.txt", "debug_beata.txt", "debug_new_bik.txt"]}
+
+CORPUS = dict(FIXTURES)
+CORPUS.update({f"synthetic_{seed}": synthesize_bik_text(5 + 7 * seed, 1 + 5 * seed, seed=seed) for seed in range(4)})
+CORPUS.update({f"mangled_{name}_{seed}": mangled(text, seed) for name, text in FIXTURES.items() for seed in range(3)})
+
+
+@pytest.mark.parametrize("name", CORPUS)
+def test_parser_matches_reference(name):
+    text = CORPUS[name]
+    parsed = parse_bik_native(text)
+    for key, reference in legacy_liabilities(text).items():
+        assert len(parsed[key]) == len(reference)
+        for liability, expected in zip(parsed[key], reference):
+            # The shared Liability model adds fields (is_pozabankowe defaults to False); the reference ones must match
+            assert {k: liability[k] for k in expected} == expected
+            assert liability["is_pozabankowe"] == expected.get("is_pozabankowe", False)
+
+
+def lender_texts():
+    lines = [line for text in FIXTURES.values() for line in text.split('\n')]
+    rnd = random.Random(8)
+    fragments = LENDERS + BANKS + ["BANK", "ING", "SP. Z", " ", "-", "pko", "Mbank", "śląski", "x"]
+    generated = []
+    for _ in range(2000):
+        parts = [rnd.choice(fragments) for _ in range(rnd.randint(1, 5))]
+        # Cut names at random points so prefixes and overlaps of names are exercised too
+        generated.append("".join(p[:rnd.randint(0, len(p))] if rnd.random() < 0.3 else p for p in parts))
+    return lines + generated
+
+
+def test_lender_matcher_matches_substring_scans():
+    for text in lender_texts():
+        assert find_lenders(text) == {name for name in LENDERS if name in text.upper()}, text
+        assert is_pozabankowe(text) == legacy_mentions(POZABANKOWE_LENDERS, text)
+        assert _mentions_active_lender(text) == legacy_mentions(ACTIVE_SECTION_LENDERS, text)
+
+
+def test_bank_line_in_context_matches_reference():
+    texts = lender_texts()
+    rnd = random.Random(3)
+    for _ in range(1000):
+        context = "\n".join(rnd.choice(texts) for _ in range(rnd.randint(1, 6)))
+        assert _bank_line_in_context(context) == legacy_bank_line_in_context(context)
+
+
+def history_texts():
+    texts = list(CORPUS.values())
+    rnd = random.Random(5)
+    rows = []
+    for _ in range(400):
+        amounts = " ".join(rnd.choice(["0", "120", "1.054 PLN", "3273 PLN", "9,50"]) for _ in range(2))
+        rows.append(f"{rnd.randint(1, 28):02d}.{rnd.randint(1, 12):02d}.20{rnd.randint(10, 25)} {amounts} "
+                    f"{rnd.choice(['0', '0', '3', '45', '120'])}")
+        if rnd.random() < 0.2:
+            rows.append(rnd.choice(["umowa zakończona dn. 01.02.2020", "Historia spłaty", ""]))
+    texts.append("\n".join(rows))
+    return texts
+
+
+def test_history_index_matches_window_scans():
+    rnd = random.Random(11)
+    for text in history_texts():
+        index = HistoryIndex(text)
+        # Increasing positions (how the section parsers query), then arbitrary ones
+        positions = sorted(rnd.randrange(len(text) + 1) for _ in range(200))
+        positions += [rnd.randrange(len(text) + 1) for _ in range(100)]
+        for pos in positions:
+            assert index.max_delay(pos) == legacy_extract_max_delay(text, pos), pos
+
+
+def test_history_index_windows_cutting_rows():
+    # Every window start and end inside a short history: windows that begin or
+    # end mid-row must see the same (possibly shortened) matches as a plain scan
+    text = history_texts()[-1][:1500]
+    for size in (20, 37, 64, 250):
+        index = HistoryIndex(text)
+        for pos in range(0, len(text), 3):
+            assert index.max_delay(pos, size) == legacy_extract_max_delay(text, pos, size), (pos, size)
+            assert [row.delay_days for row in index.rows_in_window(pos, size)] == legacy_delays(text, pos, size)
@@ -0,0 +1,117 @@
+"""
+Persistent BIK analysis store (services.bik_store) and its query endpoints.
+"""
+
+from datetime import date
+
+import pytest
+
+import app as app_module
+import services.bik as bik
+import services.bik_store as bik_store
+from benchmarks.corpus import render_text_pdf, synthesize_bik_text
+from services.bik import analyze_bik
+from services.bik_store import BikStore, get_bik_store
+
+PESEL = "86080818085"  # synthetic reports all belong to "Jan Testowy"
+TOKEN = "test-token"
+AUTH = {"Authorization": f"Bearer {TOKEN}"}
+
+JUNE = render_text_pdf(synthesize_bik_text(4, 6, seed=1))  # MBANK, PKO BP, TWISTO
+JANUARY = render_text_pdf(synthesize_bik_text(4, 6, seed=2, report_date=date(2025, 1, 5)))  # + PROVIDENT
+
+
+@pytest.fixture
+def store(tmp_path):
+    return BikStore(str(tmp_path / "bik_reports.sqlite3"))
+
+
+@pytest.fixture
+def client(client, store, monkeypatch):
+    monkeypatch.setattr(app_module, "get_bik_store", lambda: store)
+    monkeypatch.setenv("BIK_STORE_API_TOKEN", TOKEN)
+    return client
+
+
+def test_stored_reports_are_not_parsed_again(store, monkeypatch):
+    first = analyze_bik(JUNE, "d-june", backend="pdfium", store=store, filename="june.pdf")
+    assert len(store) == 1
+
+    def no_parsing(*args):
+        raise AssertionError("stored report parsed again")
+
+    monkeypatch.setattr(bik, "_run_cascade", no_parsing)
+    assert analyze_bik(JUNE, "d-june", backend="pdfium", store=store) == first
+    # A parser upgrade (new cascade version) is not served from the store
+    monkeypatch.setattr(bik, "CASCADE_VERSION", "next")
+    with pytest.raises(AssertionError):
+        analyze_bik(JUNE, "d-june", backend="pdfium", store=store)
+
+
+def test_query_endpoints(store, client):
+    june = analyze_bik(JUNE, "d-june", backend="pdfium", store=store, filename="june.pdf")
+    analyze_bik(JANUARY, "d-january", backend="pdfium", store=store, filename="january.pdf")
+
+    latest = client.get(f"/bik/clients/{PESEL}/latest", headers=AUTH)
+    assert latest.status_code == 200
+    assert latest.get_json() == june
+
+    history = client.get(f"/bik/clients/{PESEL}/reports", headers=AUTH).get_json()["reports"]
+    assert [(r["filename"], r["report_date"]) for r in history] == [("june.pdf", "2025-06-11"),
+                                                                     ("january.pdf", "2025-01-05")]
+
+    # Only the latest report of each client counts; lender names match loosely
+    clients = client.get("/bik/lenders/Twisto/clients", headers=AUTH).get_json()["clients"]
+    assert [(c["pesel"], c["file_digest"]) for c in clients] == [(PESEL, "d-june")]
+    assert all("TWISTO" in l["bank"] for l in clients[0]["liabilities"])
+    assert client.get("/bik/lenders/PROVIDENT POLSKA S.A./clients", headers=AUTH).get_json()["clients"] == []
+
+    assert client.get("/bik/clients/123/latest", headers=AUTH).status_code == 400
+    assert client.get("/bik/clients/90010112345/latest", headers=AUTH).status_code == 404
+    assert client.get("/bik/lenders/mBank/clients?section=other", headers=AUTH).status_code == 400
+
+
+def test_queries_need_the_token_and_are_not_cors_exposed(store, client, monkeypatch):
+    analyze_bik(JUNE, "d-june", backend="pdfium", store=store)
+    url = f"/bik/clients/{PESEL}/latest"
+    assert client.get(url).status_code == 401
+    assert client.get(url, headers={"Authorization": "Bearer wrong"}).status_code == 401
+    origin = {"Origin": "https://frontend.example"}
+    response = client.get(url, headers={**AUTH, **origin})
+    assert response.status_code == 200
+    assert "Access-Control-Allow-Origin" not in response.headers
+    # The upload routes keep CORS
+    assert "Access-Control-Allow-Origin" in client.get("/metrics", headers=origin).headers
+
+    monkeypatch.delenv("BIK_STORE_API_TOKEN")
+    assert client.get(url, headers=AUTH).status_code == 403
+
+
+def test_store_is_opt_in(monkeypatch):
+    monkeypatch.setattr(bik_store, "_default_store", None)
+    monkeypatch.delenv("BIK_STORE_PATH", raising=False)
+    assert get_bik_store() is None
+
+
+def test_stored_analyses_are_per_backend(store, monkeypatch):
+    analyze_bik(JUNE, "d-june", backend="pdfium", store=store)
+    assert store.find_file("d-june", bik.CASCADE_VERSION, "pdfium") is not None
+    assert store.find_file("d-june", bik.CASCADE_VERSION, "pdfplumber") is None
+
+    parsed = []
+    run_cascade = bik._run_cascade
+    monkeypatch.setattr(bik, "_run_cascade", lambda source, backend: parsed.append(backend) or run_cascade(source, backend))
+    analyze_bik(JUNE, "d-june", store=store)  # default backend: pdfplumber
+    assert parsed == ["pdfplumber"]
+    assert store.find_file("d-june", bik.CASCADE_VERSION, "pdfplumber") is not None
+    assert len(store) == 1
+
+
+def test_lookups_are_index_seeks(store):
+    conn = store._connection()
+    for query, args in [
+        ("SELECT analysis FROM reports WHERE pesel = ? ORDER BY report_date DESC, id DESC LIMIT 1", ("x",)),
+        ("SELECT report_id FROM liabilities WHERE lender = ? AND section = ?", ("x", "active")),
+    ]:
+        plan = " ".join(row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + query, args))
+        assert "USING INDEX" in plan or "USING COVERING INDEX" in plan, plan
@@ -0,0 +1,68 @@
+"""
+Debug artifact capture (services.debug_capture): off by default, bounded
+queue, background writer and size-capped rotation.
+"""
+
+import os
+
+import services.debug_capture as debug_capture
+from services.debug_capture import DebugCapture, get_debug_capture
+
+
+def test_off_by_default(tmp_path, monkeypatch):
+    assert DebugCapture(str(tmp_path)).begin("bik") is None
+    monkeypatch.setattr(debug_capture, "_default_capture", None)
+    monkeypatch.delenv("DEBUG_CAPTURE_SAMPLE_RATE", raising=False)
+    assert get_debug_capture().sample_rate == 0
+    monkeypatch.setattr(debug_capture, "_default_capture", None)
+    monkeypatch.setenv("DEBUG_CAPTURE_SAMPLE_RATE", "0.25")
+    assert get_debug_capture().sample_rate == 0.25
+
+
+def test_sampled_capture_is_written_in_background(tmp_path):
+    capture = DebugCapture(str(tmp_path / "captures"), sample_rate=1.0)
+    capture_id = capture.begin("bik")
+    assert "-bik-" in capture_id
+    capture.write(capture_id, "text.txt", "Zażółć gęślą jaźń")
+    capture.write(capture_id, "raw.bin", b"\x00\x01")
+    capture.write(None, "ignored.txt", "not sampled")
+    capture.flush()
+    directory = tmp_path / "captures"
+    assert sorted(os.listdir(directory)) == [f"{capture_id}-raw.bin", f"{capture_id}-text.txt"]
+    assert (directory / f"{capture_id}-text.txt").read_text(encoding="utf-8") == "Zażółć gęślą jaźń"
+
+
+def test_hook_writes_into_the_capture(tmp_path):
+    capture = DebugCapture(str(tmp_path), sample_rate=1.0)
+    assert capture.hook(None) is None
+    capture.hook("c")("llm_response.json", "{}")
+    capture.flush()
+    assert os.listdir(tmp_path) == ["c-llm_response.json"]
+
+
+def test_full_queue_drops_instead_of_blocking(tmp_path, monkeypatch):
+    capture = DebugCapture(str(tmp_path), sample_rate=1.0, queue_size=1)
+    # Writer not running yet: the first artifact fills the queue
+    monkeypatch.setattr(capture, "_ensure_writer", lambda: None)
+    for i in range(3):
+        capture.write("c", f"{i}.txt", "x")
+    assert capture.dropped == 2
+
+    monkeypatch.undo()
+    capture.write("c", "3.txt", "x")  # starts the writer, which drains the queue
+    capture.flush()
+    assert sorted(os.listdir(tmp_path)) == ["c-0.txt", "c-3.txt"]
+
+
+def test_rotation_keeps_the_directory_under_the_cap(tmp_path):
+    (tmp_path / "old-from-another-worker.txt").write_bytes(b"o" * 100)
+    os.utime(tmp_path / "old-from-another-worker.txt", (1000, 1000))
+    capture = DebugCapture(str(tmp_path), sample_rate=1.0, max_bytes=350)
+    for i in range(6):
+        capture.write("c", f"{i}.txt", "x" * 100)
+        capture.flush()
+        os.utime(tmp_path / f"c-{i}.txt", (2000 + i, 2000 + i))
+    files = sorted(os.listdir(tmp_path))
+    assert "old-from-another-worker.txt" not in files
+    assert files[-1] == "c-5.txt"
+    assert sum(os.path.getsize(tmp_path / name) for name in files) <= 350
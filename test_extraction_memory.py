@@ -0,0 +1,53 @@
+"""
+Bounded-memory extraction: pages are released as they are read and
+EXTRACT_MEMORY_LIMIT_MB aborts a document that grows RSS past it.
+"""
+
+import itertools
+
+import pytest
+from pdfplumber.page import Page
+
+import parsers.extraction as extraction
+from benchmarks.corpus import render_text_pdf, synthesize_bik_text
+from parsers.extraction import ExtractionMemoryError, iter_page_texts
+from services.bik import analyze_bik
+
+REPORT = render_text_pdf(synthesize_bik_text(10, 24, seed=4))  # 15 pages
+
+
+def test_pdfplumber_pages_are_closed_as_they_are_read(monkeypatch):
+    closed = []
+    original_close = Page.close
+    monkeypatch.setattr(Page, "close", lambda page: (closed.append(page.page_number), original_close(page)))
+    for number, _ in enumerate(iter_page_texts(REPORT, "pdfplumber"), 1):
+        # Every page before the current one is already released
+        assert closed[:number - 1] == list(range(1, number))
+    assert len(closed) >= number
+
+
+def fake_rss(monkeypatch, step):
+    counter = itertools.count()
+    monkeypatch.setattr(extraction, "rss_bytes", lambda: next(counter) * step)
+
+
+def test_memory_limit_aborts_extraction(monkeypatch):
+    fake_rss(monkeypatch, 10 * 1024 * 1024)  # +10 MB per page
+    monkeypatch.setenv("EXTRACT_MEMORY_LIMIT_MB", "25")
+    pages = []
+    with pytest.raises(ExtractionMemoryError, match="page 3"):
+        for text in iter_page_texts(REPORT, "pdfium"):
+            pages.append(text)
+    assert len(pages) == 2
+
+    # 0 (the default) disables the limit
+    monkeypatch.setenv("EXTRACT_MEMORY_LIMIT_MB", "0")
+    assert len(list(iter_page_texts(REPORT, "pdfium"))) == 15
+
+
+def test_analysis_fails_instead_of_parsing_partial_text(monkeypatch):
+    fake_rss(monkeypatch, 10 * 1024 * 1024)
+    monkeypatch.setenv("EXTRACT_MEMORY_LIMIT_MB", "25")
+    analysis = analyze_bik(REPORT, "digest", backend="pdfium")
+    assert analysis["status"] == "error"
+    assert "memory limit" in analysis["error"]
@@ -0,0 +1,101 @@
+"""
+Parity harness for the text extraction backends (parsers.extraction.BACKENDS).
+Renders the fixture texts into PDFs and diffs every backend's page text
+against pdfplumber's, then checks the parsers give the same results.
+
+    python test_extraction_parity.py     # prints a per-backend diff summary
+"""
+
+import difflib
+import time
+from functools import lru_cache
+
+from benchmarks.corpus import (
+    FIXTURE_TEXTS, load_fixture_text, split_pages, render_pdf,
+    synthesize_bik_text, synthesize_confirmation_text
+)
+from parsers.bik_native_parser import parse_bik_native
+from parsers.extraction import BACKENDS, extract_text, iter_page_texts
+from parsers.pdf_parser import parse_pdf
+
+# pdfplumber needs a few seconds per fixture report - the summary tables are on the first pages
+MAX_PAGES = 15
+
+# Every backend is diffed against pdfplumber (the reference layout analysis)
+CANDIDATES = [name for name in BACKENDS if name != "pdfplumber"]
+
+TABLE_PAGE = [
+    [(40, "Kredyt gotówkowy, pożyczka bankowa")],
+    [(40, "ALIOR BANK"), (200, "16.10.2024"), (300, "6.143 PLN"), (380, "6.174 PLN"), (460, "159 PLN BRAK")],
+    [(40, "Karta kredytowa"), (250, "x")],
+    [(40, "ŚLĄSKI ąę"), (120, "gjp ŻÓŁ")],
+    [(40, "Kwota:"), (71, "12,00 PLN")],
+    "Łącznie 54.799 PLN 39.118 PLN 1.391 PLN BRAK",
+]
+
+
+@lru_cache(maxsize=None)
+def corpus():
+    docs = {}
+    for name in FIXTURE_TEXTS + ["debug_new_bik.txt"]:
+        pages = split_pages(load_fixture_text(name))[:MAX_PAGES]
+        docs[name] = render_pdf([page.split("\n") for page in pages])
+    docs["synthetic_bik"] = render_pdf([page.split("\n") for page in split_pages(synthesize_bik_text(8, 12, seed=5))])
+    docs["table_layout"] = render_pdf([TABLE_PAGE])
+    for i, bank in enumerate(["mBank", "Pekao"]):
+        docs[f"confirmation_{bank}"] = render_pdf([synthesize_confirmation_text(i, bank).split("\n")])
+    return docs
+
+
+@lru_cache(maxsize=None)
+def reference_pages(name):
+    return list(iter_page_texts(corpus()[name], "pdfplumber"))
+
+
+def page_diffs(reference, pages):
+    diffs = []
+    if len(reference) != len(pages):
+        diffs.append(f"page count {len(pages)} != {len(reference)}")
+    for number, (expected, actual) in enumerate(zip(reference, pages), 1):
+        if expected != actual:
+            diff = difflib.unified_diff(expected.split("\n"), actual.split("\n"), lineterm="", n=0)
+            diffs.append(f"page {number}:\n" + "\n".join(list(diff)[2:]))
+    return diffs
+
+
+def test_backends_match_pdfplumber_text():
+    for name, pdf in corpus().items():
+        reference = reference_pages(name)
+        for backend in CANDIDATES:
+            diffs = page_diffs(reference, list(iter_page_texts(pdf, backend)))
+            assert not diffs, f"{backend} differs on {name}:\n" + "\n".join(diffs)
+
+
+def test_parsers_match_across_backends():
+    docs = corpus()
+    for backend in CANDIDATES:
+        for name in ["confirmation_mBank", "confirmation_Pekao"]:
+            assert parse_pdf(docs[name], name, backend=backend) == parse_pdf(docs[name], name, backend="pdfplumber")
+        for name in FIXTURE_TEXTS:
+            reference = "".join(text + "\n" for text in reference_pages(name))
+            assert parse_bik_native(extract_text(docs[name], backend)) == parse_bik_native(reference)
+
+
+def main():
+    for name, pdf in corpus().items():
+        start = time.perf_counter()
+        reference = list(iter_page_texts(pdf, "pdfplumber"))
+        reference_time = time.perf_counter() - start
+        for backend in CANDIDATES:
+            start = time.perf_counter()
+            pages = list(iter_page_texts(pdf, backend))
+            elapsed = time.perf_counter() - start
+            diffs = page_diffs(reference, pages)
+            status = "identical" if not diffs else f"{len(diffs)} page(s) differ"
+            print(f"{name:<28} {backend:<12} {elapsed:>8.3f}s ({reference_time / elapsed:>5.1f}x) {status}")
+            for diff in diffs:
+                print("    " + diff.replace("\n", "\n    "))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Background jobs (services.jobs): JobManager lifecycle, the /jobs API and the SSE stream.
+"""
+
+import io
+import json
+import threading
+import time
+
+import services.jobs as jobs
+from conftest import confirmation_pdf
+from services.jobs import Job, JobManager, sse_events
+
+
+def wait_finished(job, timeout=30):
+    deadline = time.time() + timeout
+    while not job.finished and time.time() < deadline:
+        job.wait_for_change(-1, 0.1)
+    assert job.finished
+
+
+def parse_sse(chunks):
+    events = []
+    for chunk in chunks:
+        event, data = chunk.strip().split("\n")
+        events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+def test_submit_poll_done():
+    manager = JobManager(max_workers=1)
+    release = threading.Event()
+
+    def work(job):
+        job.add_partial({"n": 1})
+        release.wait(5)
+        job.add_partial({"n": 2})
+        return "result"
+
+    job = manager.submit("test", 2, work)
+    assert manager.get(job.id) is job
+    first = job.to_dict()
+    assert first["status"] in ("queued", "running") and "result" not in first
+
+    release.set()
+    wait_finished(job)
+    data = job.to_dict(since=1)
+    assert data["status"] == "done" and data["result"] == "result"
+    assert data["partial_results"] == [{"n": 2}] and data["next"] == 2
+    assert data["progress"] == {"done": 2, "total": 2}
+
+
+def test_failing_work_ends_in_error():
+    manager = JobManager(max_workers=1)
+
+    def work(job):
+        job.add_partial({"n": 1})
+        raise ValueError("broken report")
+
+    job = manager.submit("test", 1, work)
+    wait_finished(job)
+    data = job.to_dict()
+    assert data["status"] == "error" and data["error"] == "broken report"
+    assert "result" not in data
+    assert parse_sse(sse_events(job))[-1] == ("error", {"error": "broken report"})
+
+
+def test_expired_jobs_are_dropped():
+    manager = JobManager(max_workers=1, ttl_seconds=0)
+    job = manager.submit("test", 0, lambda job: None)
+    wait_finished(job)
+    job.finished_at -= 1
+    manager.submit("test", 0, lambda job: None)
+    assert manager.get(job.id) is None
+
+
+class FinishingJob(Job):
+    """Finishes right after the stream took its snapshot - the race sse_events must survive."""
+
+    def to_dict(self, since=0):
+        data = super().to_dict(since)
+        if not self.finished:
+            self.add_partial({"n": 2})
+            self.finish("result")
+        return data
+
+
+def test_sse_stream_of_a_job_finishing_during_the_loop():
+    job = FinishingJob("test", 2)
+    job.set_running()
+    job.add_partial({"n": 1})
+    events = parse_sse(sse_events(job, keepalive=1))
+    assert events == [
+        ("partial", {"n": 1}),
+        ("progress", {"status": "running", "done": 1, "total": 2}),
+        ("partial", {"n": 2}),
+        ("progress", {"status": "done", "done": 2, "total": 2}),
+        ("done", "result"),
+    ]
+
+
+def test_sse_stream_follows_a_background_job():
+    manager = JobManager(max_workers=1)
+    steps = [threading.Event() for _ in range(2)]
+
+    def work(job):
+        for i, step in enumerate(steps):
+            step.wait(5)
+            job.add_partial({"n": i})
+        return {"count": 2}
+
+    job = manager.submit("test", 2, work)
+    stream = sse_events(job, keepalive=0.2)
+    for step in steps:
+        step.set()
+    events = parse_sse(stream)
+    assert [payload for event, payload in events if event == "partial"] == [{"n": 0}, {"n": 1}]
+    assert events[-1] == ("done", {"count": 2})
+
+
+def test_jobs_api(client):
+    files = [(io.BytesIO(confirmation_pdf(i)), f"{i}.pdf") for i in range(3)]
+    accepted = client.post("/jobs/upload_pdfs", content_type="multipart/form-data", data={"files[]": files})
+    assert accepted.status_code == 202
+    body = accepted.get_json()
+    assert body["status_url"] == f"/jobs/{body['job_id']}"
+
+    wait_finished(jobs.get_job_manager().get(body["job_id"]))
+    status = client.get(body["status_url"]).get_json()
+    assert status["status"] == "done" and status["progress"] == {"done": 3, "total": 3}
+    assert len(status["partial_results"]) == 3
+    assert client.get(body["status_url"] + "?since=3").get_json()["partial_results"] == []
+
+    events = parse_sse(client.get(body["events_url"]).get_data(as_text=True).split("\n\n")[:-1])
+    assert [event for event, _ in events] == ["partial"] * 3 + ["progress", "done"]
+    assert events[-1][1] == status["result"]
+
+    assert client.get("/jobs/unknown").status_code == 404
+    assert client.get("/jobs/unknown/events").status_code == 404
+    assert client.post("/jobs/upload_pdfs", data={}).status_code == 400
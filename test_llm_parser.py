@@ -0,0 +1,193 @@
+"""
+LLM BIK parser against a local OpenAI-compatible stub server (OPENAI_BASE_URL):
+response cache, section-parallel mode, async variant and the retrying
+client (parsers.llm_client). No API key or network needed.
+"""
+
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from parsers import llm_client
+from parsers.bik_llm_parser import parse_bik_with_llm, parse_bik_with_llm_async
+from services.parse_cache import ParseCache
+
+
+# What a model would answer for the whole report; in section mode every
+# request gets the same answer and the parser must keep only its part
+REPORT = {
+    "personal_data": {"name": "SZYMON MACKIEWICZ", "pesel": "93110207830", "report_date": "2025-12-04"},
+    "score": "53/ 100",
+    "inquiries_12m": 3,
+    "active_liabilities": [
+        {"bank": "ALIOR BANK", "type": "Kredyt gotówkowy", "installment": "159 PLN", "amount_left": "6174",
+         "limit": 0, "max_delay_status": "OK"},
+    ],
+    "closed_liabilities": [{"bank": "MBANK", "type": "Karta kredytowa", "closing_date": "01.02.2024",
+                            "max_delay_days": 12, "arrears_amount": "40,50"}],
+    "statistical_liabilities": [{"bank": "SANTANDER", "max_delay_days": 0}],
+}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server = self.server
+        with server.lock:
+            server.requests.append(body)
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        time.sleep(server.delay)
+        with server.lock:
+            server.in_flight -= 1
+            status = server.failures.pop(0) if server.failures else 200
+
+        if status != 200:
+            payload = json.dumps({"error": {"message": f"stub {status}", "type": "stub"}}).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.send_header("Retry-After", "0")
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+
+        payload = json.dumps({
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": 0,
+            "model": body["model"],
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": json.dumps(REPORT)}}],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.lock = threading.Lock()
+    server.requests = []
+    server.in_flight = server.max_in_flight = 0
+    server.delay = 0.2
+    server.failures = []  # status codes to answer the next requests with
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("OPENAI_BASE_URL", f"http://127.0.0.1:{server.server_port}/v1")
+    monkeypatch.setenv("OPENAI_MODEL_NAME", "stub-model")
+    monkeypatch.setattr(llm_client, "BACKOFF_BASE", 0.01)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def report_text():
+    with open("debug_pdf_text.txt", encoding="utf-8") as f:
+        return f.read()
+
+
+def test_full_mode_is_cached_by_normalized_text(stub, monkeypatch):
+    cache = ParseCache(None)
+    text = report_text()
+    first = parse_bik_with_llm(text, cache=cache, mode="full")
+    assert "error" not in first
+    assert first["score"] == 53
+    assert first["active_liabilities"][0]["installment"] == 159.0
+    assert len(stub.requests) == 1
+    # The model gets the report as extracted; only the cache key is normalized
+    assert stub.requests[0]["messages"][1]["content"] == f"Analyze this BIK Report:\n\n{text}"
+
+    # Same report with different extraction whitespace: served from the cache
+    assert parse_bik_with_llm(text.replace("\n", "\n\n  "), cache=cache, mode="full") == first
+    assert len(stub.requests) == 1
+
+    # The model name is part of the key
+    monkeypatch.setenv("OPENAI_MODEL_NAME", "other-model")
+    parse_bik_with_llm(text, cache=cache, mode="full")
+    assert len(stub.requests) == 2
+
+
+def test_sections_mode_runs_concurrently_and_merges(stub):
+    cache = ParseCache(None)
+    text = report_text()
+    full = parse_bik_with_llm(text, mode="full")
+    stub.requests.clear()
+
+    sections = parse_bik_with_llm(text, cache=cache, mode="sections")
+    assert len(stub.requests) == 4
+    assert stub.max_in_flight > 1
+    # Every request carries only its own part of the report
+    assert all(len(r["messages"][1]["content"]) < len(text) for r in stub.requests)
+
+    for key in ["personal_data", "score", "inquiries_12m",
+                "active_liabilities", "closed_liabilities", "statistical_liabilities"]:
+        assert sections[key] == full[key]
+    assert sections["summary"]["total_installment"] == 159.0
+
+    assert parse_bik_with_llm(text, cache=cache, mode="sections") == sections
+    assert len(stub.requests) == 4
+
+
+def test_raw_responses_go_to_the_capture_hook(stub):
+    captured = []
+    cache = ParseCache(None)
+    text = report_text()
+    parse_bik_with_llm(text, cache=cache, mode="full", capture=lambda name, content: captured.append((name, content)))
+    assert [name for name, _ in captured] == ["llm_response.json"]
+    assert json.loads(captured[0][1]) == REPORT
+    # Cache hits make no request, so there is nothing to capture
+    parse_bik_with_llm(text, cache=cache, mode="full", capture=lambda name, content: captured.append((name, content)))
+    assert len(captured) == 1
+
+
+def test_unknown_mode(stub):
+    assert parse_bik_with_llm("x", mode="pages")["status"] == "error"
+
+
+def test_async_variant_bounds_concurrency(stub, monkeypatch):
+    monkeypatch.setenv("LLM_MAX_CONCURRENCY", "2")
+    text = report_text()
+    result = asyncio.run(parse_bik_with_llm_async(text, mode="sections"))
+    assert len(stub.requests) == 4
+    assert stub.max_in_flight == 2
+    assert result == parse_bik_with_llm(text, mode="sections")
+
+
+def test_retries_throttling_and_server_errors(stub):
+    stub.delay = 0
+    stub.failures = [429, 503]
+    result = parse_bik_with_llm(report_text(), mode="full")
+    assert "error" not in result
+    assert len(stub.requests) == 3
+
+
+def test_client_errors_are_not_retried(stub):
+    stub.delay = 0
+    stub.failures = [400]
+    assert parse_bik_with_llm(report_text(), mode="full")["status"] == "error"
+    assert len(stub.requests) == 1
+
+
+def test_deadline_covers_all_attempts(stub, monkeypatch):
+    monkeypatch.setenv("LLM_TIMEOUT", "0.3")
+    stub.delay = 0.5
+    start = time.monotonic()
+    assert parse_bik_with_llm(report_text(), mode="full")["status"] == "error"
+    assert time.monotonic() - start < 0.5
+
+
+def test_client_is_pooled_per_process(stub):
+    assert llm_client.get_llm_client() is llm_client.get_llm_client()
@@ -0,0 +1,75 @@
+"""
+Metrics registry (metrics): Prometheus rendering, and observations
+captured in parse pool workers then replayed in the web process.
+"""
+
+import threading
+
+from conftest import confirmation_pdf, upload
+from metrics import (
+    CONFIRMATIONS, STAGE_SECONDS, Counter, Histogram, capture_observations, render_metrics, replay_observations
+)
+from services.parse_pool import parse_many
+from services.transactions import parse_confirmations
+
+
+def test_render_counter_and_histogram():
+    counter = Counter("test_events_total", "Events.", ["kind"])
+    counter.inc(kind='a"b')
+    counter.inc(2, kind='a"b')
+    histogram = Histogram("test_seconds", "Durations.", ["stage"], buckets=(0.1, 1))
+    for value in (0.05, 0.5, 3):
+        histogram.observe(value, stage="x")
+    text = render_metrics()
+    assert '# TYPE test_events_total counter\ntest_events_total{kind="a\\"b"} 3\n' in text
+    assert "\n".join([
+        'test_seconds_bucket{stage="x",le="0.1"} 1',
+        'test_seconds_bucket{stage="x",le="1"} 2',
+        'test_seconds_bucket{stage="x",le="+Inf"} 3',
+        'test_seconds_sum{stage="x"} 3.55',
+        'test_seconds_count{stage="x"} 3',
+    ]) in text
+
+
+def test_capture_buffers_until_replayed():
+    counter = Counter("test_captured_total", "Captured.")
+    with capture_observations() as observed:
+        counter.inc()
+        # Other threads are not captured
+        thread = threading.Thread(target=counter.inc)
+        thread.start()
+        thread.join()
+    assert counter._series == {(): 1}
+    assert observed == [("test_captured_total", (), 1)]
+    replay_observations(observed)
+    assert counter._series == {(): 2}
+
+
+def work_in_worker(n):
+    with capture_observations() as observed:
+        CONFIRMATIONS.inc(n, status="test_worker")
+    return observed
+
+
+def test_observations_cross_processes():
+    before = CONFIRMATIONS._series.get(("test_worker",), 0)
+    results = list(parse_many(work_in_worker, [1, 2, 3], workers=2))
+    # Recorded in the worker processes only
+    assert CONFIRMATIONS._series.get(("test_worker",), 0) == before
+    for observed in results:
+        replay_observations(observed)
+    assert CONFIRMATIONS._series.get(("test_worker",), 0) == before + 6
+
+
+def test_pooled_confirmations_are_counted_in_the_web_process():
+    def counts():
+        stages = {stage: STAGE_SECONDS._series.get(("confirmation", stage), [None, 0, 0])[2]
+                  for stage in ("extract", "detect", "fields")}
+        return CONFIRMATIONS._series.get(("success",), 0), stages
+
+    uploads = []
+    for i in range(4):
+        uploads.append((f"{i}.pdf", upload(confirmation_pdf(100 + i))))
+    success, stages = counts()
+    assert [r["status"] for r in parse_confirmations(uploads, workers=2)] == ["success"] * 4
+    assert counts() == (success + 4, {stage: count + 4 for stage, count in stages.items()})
@@ -0,0 +1,91 @@
+"""
+Content-addressed parse cache (services.parse_cache): keys, the memory and
+disk tiers, disk eviction, and errors never being cached.
+"""
+
+import json
+import os
+
+from services.parse_cache import ParseCache, backend_namespace, sha256_bytes
+
+
+RESULT = {"status": "success", "amount": 12.5, "title": "Zażółć"}
+
+
+def files(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith(".json"))
+
+
+def test_round_trip_and_keys(tmp_path):
+    cache = ParseCache(str(tmp_path))
+    digest = sha256_bytes(b"%PDF")
+    cache.set("pdf", digest, "1", RESULT)
+    hit = cache.get("pdf", digest, "1")
+    assert hit == RESULT
+    hit["amount"] = 0  # callers get a copy
+    assert cache.get("pdf", digest, "1") == RESULT
+    # Other parser version / namespace / backend: miss
+    assert cache.get("pdf", digest, "2") is None
+    assert cache.get("bik", digest, "1") is None
+    assert cache.get(backend_namespace("pdf", "pdfium"), digest, "1") is None
+    assert backend_namespace("pdf", "pdfplumber") == backend_namespace("pdf") == "pdf"
+    assert files(tmp_path) == [f"pdf-v1-{digest}.json"]
+    # Another process (a fresh instance on the same directory) reads the disk tier
+    assert ParseCache(str(tmp_path)).get("pdf", digest, "1") == RESULT
+
+
+def test_errors_are_not_cached(tmp_path):
+    cache = ParseCache(str(tmp_path))
+    cache.set("pdf", "d", "1", {"filename": "a.pdf", "error": "No text extracted"})
+    cache.set("pdf", "d", "1", None)
+    assert cache.get("pdf", "d", "1") is None
+    assert files(tmp_path) == []
+
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"error": "transient"}
+
+    for _ in range(2):
+        assert cache.get_or_compute("pdf", "d", "1", compute) == {"error": "transient"}
+    assert len(calls) == 2
+    assert cache.get_or_compute("pdf", "d", "1", lambda: RESULT) == RESULT
+    assert cache.get_or_compute("pdf", "d", "1", compute) == RESULT and len(calls) == 2
+
+
+def test_memory_tier_is_lru():
+    cache = ParseCache(None, memory_items=2)
+    for digest in "abc":
+        cache.set("pdf", digest, "1", dict(RESULT, digest=digest))
+        if digest == "b":
+            cache.get("pdf", "a", "1")  # "a" used more recently than "b"
+    assert cache.get("pdf", "b", "1") is None
+    assert cache.get("pdf", "a", "1")["digest"] == "a"
+    assert cache.get("pdf", "c", "1")["digest"] == "c"
+
+
+def test_disk_eviction_drops_least_recently_used(tmp_path):
+    entry = dict(RESULT, padding="x" * 1000)
+    size = len(json.dumps(entry, ensure_ascii=False).encode("utf-8"))
+    cache = ParseCache(str(tmp_path), max_bytes=3 * size + 500, memory_items=0)
+    for i, digest in enumerate("abc"):
+        cache.set("pdf", digest, "1", entry)
+        os.utime(tmp_path / f"pdf-v1-{digest}.json", (1000 + i, 1000 + i))
+    # Reading "a" marks it as used now, so "b" is the oldest
+    assert cache.get("pdf", "a", "1") == entry
+
+    cache.set("pdf", "d", "1", entry)
+    remaining = files(tmp_path)
+    assert "pdf-v1-b.json" not in remaining
+    assert {"pdf-v1-a.json", "pdf-v1-d.json"} <= set(remaining)
+    assert sum(os.path.getsize(tmp_path / name) for name in remaining) <= cache.max_bytes * 0.9
+
+
+def test_disk_size_counts_existing_files(tmp_path):
+    ParseCache(str(tmp_path)).set("pdf", "old", "1", dict(RESULT, padding="x" * 2000))
+    os.utime(tmp_path / "pdf-v1-old.json", (1000, 1000))
+    # A new process only knows the directory: the first write scans it and evicts
+    cache = ParseCache(str(tmp_path), max_bytes=2100)
+    cache.set("pdf", "new", "1", dict(RESULT, padding="y" * 100))
+    assert files(tmp_path) == ["pdf-v1-new.json"]
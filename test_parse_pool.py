@@ -0,0 +1,126 @@
+"""
+Process pool for batch parsing (services.parse_pool): pooled batches give
+the same results, in the same order, as parsing in-process.
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+
+import pytest
+
+import services.parse_pool as parse_pool
+from conftest import confirmation_pdf, upload
+from services.parse_pool import START_METHOD, get_executor, parse_as_completed, parse_many
+from services.transactions import group_transactions, parse_confirmations
+from services.uploads import SpooledUpload
+
+
+def batch():
+    pdfs = [("a.pdf", confirmation_pdf(0, "mBank")), ("b.pdf", confirmation_pdf(1, "Pekao")),
+            ("broken.pdf", b"not a pdf"), ("a_again.pdf", confirmation_pdf(0, "mBank"))]
+    pdfs += [(f"{i}.pdf", confirmation_pdf(i, ["mBank", "Pekao"][i % 2])) for i in range(2, 8)]
+    return [(name, upload(data)) for name, data in pdfs]
+
+
+def square(n):
+    return n * n
+
+
+def square_or_die(n):
+    if n == 3 and multiprocessing.parent_process() is not None:
+        os._exit(1)  # a worker killed mid-batch (e.g. OOM)
+    return n * n
+
+
+def test_parse_many_keeps_input_order():
+    assert list(parse_many(square, range(20), workers=2)) == [n * n for n in range(20)]
+
+
+def test_parse_many_pulls_items_as_workers_free_up():
+    pulled = []
+
+    def items():
+        for n in range(20):
+            pulled.append(n)
+            yield n
+
+    results = parse_many(square, items(), workers=2, window=3)
+    assert next(results) == 0
+    assert len(pulled) <= 4
+    assert list(results) == [n * n for n in range(1, 20)]
+
+
+def test_parse_many_finishes_in_process_when_the_pool_breaks():
+    assert list(parse_many(square_or_die, range(10), workers=2)) == [n * n for n in range(10)]
+
+
+def test_confirmation_sources_are_read_lazily():
+    reads = []
+
+    class CountedUpload(SpooledUpload):
+        @property
+        def source(self):
+            reads.append(self.digest)
+            return SpooledUpload.source.fget(self)
+
+    uploads = []
+    for i in range(10):
+        spooled = CountedUpload()
+        spooled.write(confirmation_pdf(i))
+        uploads.append((f"{i}.pdf", spooled))
+    results = parse_confirmations(uploads, workers=2)
+    assert next(results)["status"] == "success"
+    # Only the files in flight (2 per worker) and the next one have been loaded
+    assert len(reads) <= 5
+    assert len(list(results)) == 9
+    assert len(reads) == 10
+
+
+def test_parse_as_completed_reports_positions():
+    results = dict(parse_as_completed(square, range(20), workers=2, window=3))
+    assert results == {n: n * n for n in range(20)}
+
+
+def test_workers_are_not_forked():
+    assert START_METHOD in ("forkserver", "spawn")
+    assert get_executor(2)._mp_context.get_start_method() == START_METHOD
+
+
+def test_concurrent_first_use_creates_one_pool(monkeypatch):
+    created = []
+
+    class SlowPool:
+        def __init__(self, **kwargs):
+            time.sleep(0.05)  # widens the window between the check and the assignment
+            created.append(self)
+
+    monkeypatch.setattr(parse_pool, "ProcessPoolExecutor", SlowPool)
+    monkeypatch.setattr(parse_pool, "_executor", None)
+    monkeypatch.setattr(parse_pool, "_executor_workers", 0)
+    start = threading.Barrier(8)
+    seen = []
+
+    def first_request():
+        start.wait()
+        seen.append(get_executor(3))
+
+    threads = [threading.Thread(target=first_request) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(created) == 1
+    assert seen == created * 8
+
+
+@pytest.mark.parametrize("backend", ["pdfplumber", "pdfium"])
+def test_pooled_batch_groups_like_in_process(backend):
+    def grouped(workers):
+        results = list(parse_confirmations(batch(), workers=workers, backend=backend))
+        return results, group_transactions(results)
+
+    in_process, pooled = grouped(1), grouped(2)
+    assert [r["status"] for r in in_process[0]] == ["success"] * 2 + ["error", "duplicate"] + ["success"] * 6
+    assert pooled == in_process
@@ -0,0 +1,137 @@
+"""
+Cross-batch dedup with the persistent transaction index (services.transaction_index).
+"""
+
+import io
+
+import pytest
+
+import app as app_module
+import services.transaction_index as transaction_index
+import services.transactions as transactions
+from benchmarks.corpus import render_pdf, synthesize_confirmation_text
+from conftest import upload
+from services.transaction_index import TransactionIndex, get_transaction_index, transaction_signature
+from services.transactions import parse_confirmations, group_transactions
+
+
+def text_pdf(text):
+    return render_pdf([text.split("\n")])
+
+
+def batch(texts):
+    return [(f"c{i}.pdf", upload(text_pdf(text))) for i, text in enumerate(texts)]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return TransactionIndex(str(tmp_path / "transactions.sqlite3"))
+
+
+@pytest.fixture
+def index(store):
+    return store.for_owner("client-1")
+
+
+FIELDS = ["date", "amount", "title", "sender", "recipient", "account"]
+
+
+def without_flags(grouped):
+    return {recipient: {month: [{k: item[k] for k in FIELDS} for item in items] for month, items in months.items()}
+            for recipient, months in grouped.items()}
+
+
+TEXTS = [synthesize_confirmation_text(i, bank) for i, bank in enumerate(["mBank", "Pekao", "mBank"])]
+
+
+def test_reuploaded_files_are_not_parsed_again(index, monkeypatch):
+    first = list(parse_confirmations(batch(TEXTS), index=index))
+    assert [r["status"] for r in first] == ["success"] * 3
+    assert len(index.index) == 3
+
+    def no_parsing(*args, **kwargs):
+        raise AssertionError("known file parsed again")
+
+    monkeypatch.setattr(transactions, "parse_pdf", no_parsing)
+    second = list(parse_confirmations(batch(TEXTS), index=index))
+    assert [r["status"] for r in second] == ["success"] * 3
+    assert all(r["previously_uploaded"] for r in second)
+    for old, new in zip(first, second):
+        assert {k: new[k] for k in FIELDS} == {k: old[k] for k in FIELDS}
+        assert new["first_filename"] == old["filename"]
+    assert not any("previously_uploaded" in r for r in first)
+
+
+def test_reupload_keeps_the_same_groups(index):
+    first = group_transactions(list(parse_confirmations(batch(TEXTS), index=index)))
+    second = group_transactions(list(parse_confirmations(batch(TEXTS), index=index)))
+    assert sorted(first) == ["JAN KOWALSKI", "JULIA LATKO"]
+    assert without_flags(second) == without_flags(first)
+    assert all(item["previously_uploaded"] for months in second.values() for items in months.values()
+               for item in items)
+
+
+def test_same_transaction_in_another_file(index, store):
+    list(parse_confirmations(batch(TEXTS[:1]), index=index))
+    # Same transfer, different PDF bytes (e.g. exported again)
+    results = list(parse_confirmations(batch([TEXTS[0] + "\nWygenerowano ponownie"]), index=index))
+    assert results[0]["status"] == "success" and results[0]["previously_uploaded"]
+    assert len(store) == 1
+
+
+def test_lookups_are_scoped_by_owner(index, store):
+    list(parse_confirmations(batch(TEXTS), index=index))
+    # A colleague checking another client's case with the same files: nothing is flagged
+    results = list(parse_confirmations(batch(TEXTS), index=store.for_owner("client-2")))
+    assert not any("previously_uploaded" in r for r in results)
+    assert len(store) == 6
+
+
+def test_off_unless_configured(tmp_path, monkeypatch):
+    monkeypatch.setattr(transaction_index, "_default_index", None)
+    monkeypatch.delenv("TRANSACTION_INDEX_PATH", raising=False)
+    assert get_transaction_index() is None
+    monkeypatch.setenv("TRANSACTION_INDEX_PATH", str(tmp_path / "t.sqlite3"))
+    assert isinstance(get_transaction_index(), TransactionIndex)
+
+
+def test_upload_pdfs_reupload(client, store, monkeypatch):
+    monkeypatch.setattr(app_module, "get_transaction_index", lambda: store)
+    pdfs = [text_pdf(text) for text in TEXTS]
+
+    def post(**data):
+        files = [(io.BytesIO(pdf), f"c{i}.pdf") for i, pdf in enumerate(pdfs)]
+        return client.post("/upload_pdfs", content_type="multipart/form-data",
+                           data={"files[]": files, **data}).get_json()
+
+    first = post(client_id="client-1")
+    second = post(client_id="client-1")
+    assert sorted(first) == ["JAN KOWALSKI", "JULIA LATKO"]
+    assert without_flags(second) == without_flags(first)
+    # Without a client the batch is checked on its own and nothing is stored
+    assert len(store) == 3
+    assert post() == first
+    assert len(store) == 3
+
+
+def test_new_batch_is_unaffected(index):
+    list(parse_confirmations(batch(TEXTS[:1]), index=index))
+    results = list(parse_confirmations(batch(TEXTS[1:]), index=index))
+    assert [r["status"] for r in results] == ["success"] * 2
+
+
+def test_lookups_are_index_seeks(index):
+    rows = [(f"{i:064x}", f"f{i}.pdf", {"date": f"2024-01-{i % 28 + 1:02d}", "amount": float(i),
+                                         "title": f"T{i}", "sender": "S", "status": "success"})
+            for i in range(100000)]
+    index.record(rows)
+    assert len(index.index) == 100000
+    assert index.find_file(f"{4242:064x}")["amount"] == 4242.0
+    assert index.find_signature(transaction_signature(rows[4242][2]))["filename"] == "f4242.pdf"
+
+    conn = index.index._connection()
+    for query, args in [("SELECT * FROM transactions WHERE owner = ? AND file_digest = ?", ("o", "x")),
+                        ("SELECT * FROM transactions WHERE owner = ? AND signature = ? AND file_digest != ?",
+                         ("o", "x", "y"))]:
+        plan = " ".join(row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + query, args))
+        assert "USING INDEX" in plan or "USING COVERING INDEX" in plan, plan
@@ -0,0 +1,40 @@
+"""
+/upload_bik_batch: several BIK reports in, one NDJSON analysis line per report out.
+"""
+
+import io
+import json
+
+import pytest
+
+import app as app_module
+from benchmarks.corpus import load_fixture_text, render_pdf, split_pages
+from services.bik import analyze_bik
+
+
+def report_pdf(name, pages=6):
+    return render_pdf([page.split("\n") for page in split_pages(load_fixture_text(name))[:pages]])
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_streams_one_record_per_report(client, workers, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, "PDF_PARSE_WORKERS", workers)
+    reports = [("a.pdf", report_pdf("debug_pdf_text.txt")), ("b.pdf", report_pdf("debug_beata.txt")),
+               ("broken.pdf", b"not a pdf"), ("a_again.pdf", report_pdf("debug_pdf_text.txt"))]
+    response = client.post("/upload_bik_batch", content_type="multipart/form-data",
+                           data={"files[]": [(io.BytesIO(data), name) for name, data in reports]})
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.mimetype == "application/x-ndjson"
+
+    records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert sorted(r["index"] for r in records) == [0, 1, 2, 3]
+    by_index = {r["index"]: r for r in records}
+    for position, (name, data) in enumerate(reports):
+        assert by_index[position]["filename"] == name
+        assert by_index[position]["analysis"] == analyze_bik(data, name, backend="pdfium")
+    assert by_index[2]["analysis"]["status"] == "error"
+
+
+def test_no_files(client):
+    assert client.post("/upload_bik_batch", data={}).status_code == 400
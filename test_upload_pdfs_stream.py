@@ -0,0 +1,49 @@
+"""
+/upload_pdfs?stream=1: one NDJSON line per confirmation as it is parsed, then the grouped summary.
+"""
+
+import io
+import json
+
+import pytest
+
+import app as app_module
+from conftest import confirmation_pdf
+
+
+FILES = [("a.pdf", confirmation_pdf(0, "mBank")), ("b.pdf", confirmation_pdf(1, "Pekao")),
+         ("broken.pdf", b"not a pdf"), ("a_again.pdf", confirmation_pdf(0, "mBank")),
+         ("c.pdf", confirmation_pdf(2, "mBank"))]
+
+
+def post(client, url, **kwargs):
+    return client.post(url, content_type="multipart/form-data",
+                       data={"files[]": [(io.BytesIO(data), name) for name, data in FILES]}, **kwargs)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_streams_transactions_then_summary(client, workers, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, "PDF_PARSE_WORKERS", workers)
+    response = post(client, "/upload_pdfs?stream=1")
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.mimetype == "application/x-ndjson"
+
+    records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    transactions, summary = records[:-1], records[-1]
+    assert [r["type"] for r in transactions] == ["transaction"] * len(FILES)
+    assert sorted(r["index"] for r in transactions) == list(range(len(FILES)))
+    for record in transactions:
+        assert record["result"]["filename"] == FILES[record["index"]][0]
+    by_index = {r["index"]: r["result"] for r in transactions}
+    assert by_index[2]["status"] == "error"
+    assert by_index[0]["date"] == by_index[3]["date"]
+
+    assert summary["type"] == "summary"
+    assert summary["result"] == post(client, "/upload_pdfs").get_json()
+
+
+def test_accept_header_selects_stream(client):
+    response = post(client, "/upload_pdfs", headers={"Accept": "application/x-ndjson"})
+    assert response.mimetype == "application/x-ndjson"
+    assert json.loads(response.get_data(as_text=True).splitlines()[-1])["type"] == "summary"
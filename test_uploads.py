@@ -0,0 +1,80 @@
+"""
+In-memory uploads (services.uploads): SpooledUpload hashing, spilling to a
+temp file above the memory limit, and cleanup.
+"""
+
+import hashlib
+import io
+import os
+
+from flask import Flask, jsonify, request
+
+from services.uploads import SpooledUpload, UploadRequest, spool_max_bytes
+
+
+def write_chunks(upload, data, chunk=7):
+    for i in range(0, len(data), chunk):
+        upload.write(data[i:i + chunk])
+    return upload
+
+
+def test_small_upload_stays_in_memory():
+    data = b"%PDF-1.4 small"
+    upload = write_chunks(SpooledUpload(max_memory=1024), data)
+    assert upload.path is None
+    assert upload.digest == hashlib.sha256(data).hexdigest()
+    assert upload.source == data
+    upload.seek(0)
+    assert upload.read() == data  # file methods go to the buffer
+
+
+def test_large_upload_spills_to_a_temp_file():
+    data = bytes(range(256)) * 40
+    upload = write_chunks(SpooledUpload(max_memory=1000), data, chunk=300)
+    assert upload.path and os.path.exists(upload.path)
+    assert upload.digest == hashlib.sha256(data).hexdigest()
+    # Parsers (and pool workers) get the path, with everything written flushed
+    assert upload.source == upload.path
+    with open(upload.path, "rb") as f:
+        assert f.read() == data
+    upload.close()
+    assert not os.path.exists(upload.path)
+
+
+def test_kept_uploads_survive_close_until_discarded():
+    upload = write_chunks(SpooledUpload(max_memory=10), b"x" * 50)
+    upload.keep_open()
+    upload.close()  # what Flask does at the end of the request
+    assert os.path.exists(upload.path) and upload.source == upload.path
+    upload.discard()
+    assert not os.path.exists(upload.path)
+
+
+def test_spool_max_bytes_from_env(monkeypatch):
+    monkeypatch.setenv("UPLOAD_SPOOL_MAX_BYTES", "2048")
+    assert spool_max_bytes() == 2048
+    monkeypatch.setenv("UPLOAD_SPOOL_MAX_BYTES", "lots")
+    assert spool_max_bytes() == 16 * 1024 * 1024
+
+
+def test_request_files_are_spooled():
+    app = Flask(__name__)
+    app.request_class = UploadRequest
+    app.config["UPLOAD_SPOOL_MAX_BYTES"] = 100
+    seen = {}
+
+    @app.post("/upload")
+    def upload():
+        for f in request.files.getlist("files[]"):
+            seen[f.filename] = f.stream
+        return jsonify({name: [stream.digest, stream.path is not None] for name, stream in seen.items()})
+
+    small, large = b"a" * 10, b"b" * 500
+    response = app.test_client().post("/upload", content_type="multipart/form-data", data={
+        "files[]": [(io.BytesIO(small), "small.pdf"), (io.BytesIO(large), "large.pdf")]})
+    assert response.get_json() == {
+        "small.pdf": [hashlib.sha256(small).hexdigest(), False],
+        "large.pdf": [hashlib.sha256(large).hexdigest(), True],
+    }
+    # Request teardown closed the files, removing the spill file
+    assert not os.path.exists(seen["large.pdf"].path)